@@ -0,0 +1,100 @@
+"""
+Замер задержки цикла событий при параллельной обработке сообщений об аренде.
+
+Сравнивает синхронные вызовы Database внутри корутин с AsyncDatabase.
+Пока обрабатываются сообщения, отдельная корутина "тикает" раз в 1 мс и
+фиксирует, насколько поздно она просыпается. Дополнительно база на время
+теста блокируется сторонней транзакцией записи, как при медленном запросе.
+
+Запуск: python -m benchmarks.event_loop_latency [количество_сообщений]
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from database.models import Database
+from database.async_db import AsyncDatabase
+
+TICK = 0.001
+LOCK_HOLD = 0.2
+
+
+def make_rental(i: int) -> dict:
+    return {
+        'server': f'Server {i % 5}',
+        'character': f'Character_{i}',
+        'transport': f'Car {i % 20}',
+        'license_plate': f'BN{i % 20:04d}',
+        'price': 1000.0 + i,
+        'duration': '2 ч.',
+        'renter': f'Renter_{i}'
+    }
+
+
+def hold_write_lock(db_path: str, started: threading.Event):
+    """Удерживает блокировку записи, имитируя медленную транзакцию"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('BEGIN IMMEDIATE')
+    started.set()
+    time.sleep(LOCK_HOLD)
+    conn.rollback()
+    conn.close()
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run_case(name: str, handler, db_path: str, count: int):
+    lags = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0.01)
+
+    started = threading.Event()
+    locker = threading.Thread(target=hold_write_lock, args=(db_path, started))
+    locker.start()
+    started.wait()
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(handler(make_rental(i)) for i in range(count)))
+    elapsed = time.perf_counter() - begin
+
+    stop.set()
+    await tick_task
+    locker.join()
+
+    lags.sort()
+    p50 = lags[len(lags) // 2] * 1000 if lags else 0.0
+    p99 = lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0
+    worst = lags[-1] * 1000 if lags else 0.0
+    print(f"{name:<14} сообщений: {count:<5} время: {elapsed:6.3f} с  "
+          f"тиков: {len(lags):<5} задержка p50: {p50:7.2f} мс  p99: {p99:7.2f} мс  макс: {worst:7.2f} мс")
+
+
+async def main(count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        database = Database(db_path)
+        async_database = AsyncDatabase(database)
+
+        async def sync_handler(rental):
+            database.add_rental(rental)
+
+        async def async_handler(rental):
+            await async_database.add_rental(rental)
+
+        await run_case('sync Database', sync_handler, db_path, count)
+        await run_case('AsyncDatabase', async_handler, db_path, count)
+        async_database.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
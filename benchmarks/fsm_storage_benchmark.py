@@ -0,0 +1,97 @@
+"""
+Задержка операций хранилища состояний FSM: MemoryStorage против SQLiteStorage.
+
+Для каждого хранилища прогоняется типичный диалог (get_state, set_state,
+update_data, get_data) для заданного числа пользователей. Отдельно замеряются
+первое обращение к ключу (для SQLiteStorage - чтение из базы), повторные
+обращения и время пакетной записи накопленных изменений. В конце SQLiteStorage
+открывается заново на той же базе и проверяется, что состояния сохранились.
+
+Запуск: python -m benchmarks.fsm_storage_benchmark [пользователей] [повторы]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from database.models import Database
+from database.async_db import AsyncDatabase
+from database.fsm_storage import SQLiteStorage
+
+BOT_ID = 1
+
+
+def make_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+
+
+def percentile(samples: list, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1e6
+
+
+async def dialog_step(storage, key: StorageKey, step: int):
+    await storage.get_state(key)
+    await storage.set_state(key, f'CarStates:step_{step}')
+    await storage.update_data(key, {f'field_{step}': step, 'car_id': key.user_id})
+    await storage.get_data(key)
+
+
+async def run_case(name: str, storage, users: int, repeats: int):
+    keys = [make_key(user_id) for user_id in range(1, users + 1)]
+
+    cold = []
+    for key in keys:
+        begin = time.perf_counter()
+        await storage.get_state(key)
+        cold.append(time.perf_counter() - begin)
+
+    warm = []
+    for step in range(repeats):
+        for key in keys:
+            begin = time.perf_counter()
+            await dialog_step(storage, key, step)
+            warm.append(time.perf_counter() - begin)
+
+    flush_time = 0.0
+    if isinstance(storage, SQLiteStorage):
+        begin = time.perf_counter()
+        await storage.flush()
+        flush_time = (time.perf_counter() - begin) * 1000
+
+    cold.sort()
+    warm.sort()
+    print(f"{name:<14} первое обращение p50: {percentile(cold, 0.5):8.1f} мкс  p99: {percentile(cold, 0.99):8.1f} мкс | "
+          f"шаг диалога p50: {percentile(warm, 0.5):7.1f} мкс  p99: {percentile(warm, 0.99):7.1f} мкс | "
+          f"запись пакета: {flush_time:6.1f} мс")
+
+
+async def main(users: int, repeats: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(os.path.join(tmp, 'bench.db'))
+        async_database = AsyncDatabase(database)
+
+        await run_case('MemoryStorage', MemoryStorage(), users, repeats)
+
+        # Большой интервал: изменения записываются только явным flush()
+        storage = SQLiteStorage(async_database, flush_interval=3600)
+        await run_case('SQLiteStorage', storage, users, repeats)
+        await storage.close()
+
+        # Состояния переживают "перезапуск"
+        restored = SQLiteStorage(async_database)
+        state = await restored.get_state(make_key(users))
+        data = await restored.get_data(make_key(users))
+        print(f"После перезапуска: состояние {state}, полей данных: {len(data)}")
+        await restored.close()
+        async_database.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    ))
@@ -0,0 +1,141 @@
+"""
+Бенчмарк индексов: планы запросов и время выполнения до и после миграций.
+
+Генерирует базу с заданным количеством аренд (по умолчанию 1 000 000),
+удаляет индексы и сбрасывает user_version, замеряет типичные запросы Database,
+затем применяет миграции и повторяет замеры.
+
+Запуск: python -m benchmarks.indexes_benchmark [количество_аренд] [путь_к_базе]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from database.models import Database
+from database.migrations import apply_migrations
+
+CARS = 500
+SERVERS = [f'Server {i}' for i in range(1, 21)]
+MAINTENANCE_PER_CAR = 40
+
+QUERIES = [
+    ('get_rentals_by_car',
+     'SELECT * FROM rentals WHERE license_plate = ? ORDER BY created_at DESC',
+     ('BN0042',)),
+    ('get_recent_rentals',
+     'SELECT * FROM rentals ORDER BY created_at DESC LIMIT ?',
+     (10,)),
+    ('get_server_stats',
+     'SELECT server, COUNT(*) as count, SUM(price) as income FROM rentals '
+     'GROUP BY server ORDER BY income DESC',
+     ()),
+    ('get_transport_stats',
+     'SELECT transport, COUNT(*) as count, SUM(price) as income FROM rentals '
+     'GROUP BY transport ORDER BY income DESC',
+     ()),
+    ('get_maintenance_by_car',
+     'SELECT m.*, c.name as car_name, c.license_plate FROM maintenance m '
+     'JOIN cars c ON m.car_id = c.id WHERE m.car_id = ? ORDER BY m.maintenance_date DESC',
+     (42,)),
+    ('get_all_maintenance',
+     'SELECT m.*, c.name as car_name, c.license_plate FROM maintenance m '
+     'JOIN cars c ON m.car_id = c.id ORDER BY m.maintenance_date DESC',
+     ()),
+]
+
+
+def generate(conn: sqlite3.Connection, rentals: int):
+    """Заполнение базы синтетическими данными"""
+    rnd = random.Random(42)
+    start = datetime(2024, 1, 1)
+
+    conn.executemany(
+        'INSERT INTO cars (name, license_plate, purchase_price, purchase_date) VALUES (?, ?, ?, ?)',
+        ((f'Car {i % 60}', f'BN{i:04d}', 100000, start.strftime('%Y-%m-%d %H:%M:%S')) for i in range(CARS))
+    )
+
+    def rental_rows():
+        for i in range(rentals):
+            car = rnd.randrange(CARS)
+            created = start + timedelta(seconds=rnd.randrange(365 * 24 * 3600))
+            yield (
+                rnd.choice(SERVERS), f'Character_{rnd.randrange(50000)}', f'Car {car % 60}',
+                f'BN{car:04d}', float(rnd.randrange(500, 20000)), '2 ч.',
+                f'Renter_{rnd.randrange(50000)}', created.strftime('%Y-%m-%d %H:%M:%S')
+            )
+
+    conn.executemany('''
+        INSERT INTO rentals (server, character, transport, license_plate, price, duration, renter, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rental_rows())
+
+    def maintenance_rows():
+        for car_id in range(1, CARS + 1):
+            for _ in range(MAINTENANCE_PER_CAR):
+                date = start + timedelta(seconds=rnd.randrange(365 * 24 * 3600))
+                yield car_id, float(rnd.randrange(100, 5000)), 'Ремонт', date.strftime('%Y-%m-%d %H:%M:%S')
+
+    conn.executemany(
+        'INSERT INTO maintenance (car_id, amount, description, maintenance_date) VALUES (?, ?, ?, ?)',
+        maintenance_rows()
+    )
+    conn.commit()
+
+
+def drop_indexes(conn: sqlite3.Connection):
+    """Возврат базы к состоянию до миграций"""
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+    )]
+    for name in names:
+        conn.execute(f'DROP INDEX {name}')
+    conn.execute('PRAGMA user_version = 0')
+    conn.commit()
+
+
+def measure(conn: sqlite3.Connection, title: str, repeat: int = 3):
+    print(f"\n=== {title} ===")
+    for name, sql, params in QUERIES:
+        plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:<24} {best * 1000:10.2f} мс")
+        for step in plan:
+            print(f"    {step}")
+
+
+def main(rentals: int, db_path: str):
+    Database(db_path).close()
+
+    conn = sqlite3.connect(db_path)
+    drop_indexes(conn)
+
+    started = time.perf_counter()
+    generate(conn, rentals)
+    print(f"Сгенерировано {rentals} аренд за {time.perf_counter() - started:.1f} с")
+
+    measure(conn, 'До миграций (без индексов)')
+
+    started = time.perf_counter()
+    version = apply_migrations(conn)
+    print(f"\nМиграции до версии {version} применены за {time.perf_counter() - started:.1f} с")
+
+    measure(conn, 'После миграций')
+    conn.close()
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    if len(sys.argv) > 2:
+        main(count, sys.argv[2])
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            main(count, os.path.join(tmp, 'bench.db'))
@@ -0,0 +1,118 @@
+"""
+Микробенчмарк парсера сообщений об аренде.
+
+Прогоняет корпус из корректных и битых сообщений через прежнюю реализацию
+(семь отдельных re.search на сообщение) и через текущий однопроходный
+parse_rental_message, проверяет совпадение результатов и печатает
+количество сообщений в секунду.
+
+Запуск: python -m benchmarks.parser_benchmark [размер_корпуса] [повторы]
+"""
+import random
+import re
+import sys
+import time
+
+from utils.parser import parse_rental_message
+
+VALID_TEMPLATE = (
+    "🚗 Транспорт сдан в аренду\n"
+    "Сервер: {server}\n"
+    "Персонаж: {character}\n"
+    "Транспорт: {transport}\n"
+    "Номер транспорта: {plate}\n"
+    "Цена: {price}\n"
+    "Длительность: {duration}\n"
+    "Арендатор: {renter}"
+)
+
+PRICES = ['$2 000', '$15,500', '2 000$', '$ 750', '$1 200', '$', '$12 345 678']
+DURATIONS = ['1 ч.', '2 ч.', '12 ч.', '1 д.', '3 д.']
+
+
+def legacy_parse(text):
+    """Прежняя реализация: шаблоны строятся и применяются по одному на каждое сообщение"""
+    patterns = {
+        'server': r'Сервер:\s*(.+)',
+        'character': r'Персонаж:\s*(.+)',
+        'transport': r'Транспорт:\s*(.+)',
+        'license_plate': r'Номер транспорта:\s*([A-Z0-9]+)',
+        'price': r'Цена:\s*\$?\s*([\d\s,]+)',
+        'duration': r'Длительность:\s*(.+)',
+        'renter': r'Арендатор:\s*(.+)'
+    }
+    result = {}
+    for key, pattern in patterns.items():
+        match = re.search(pattern, text)
+        if match:
+            result[key] = match.group(1).strip()
+    if 'price' in result:
+        price_cleaned = result['price'].replace(' ', '').replace(',', '')
+        try:
+            result['price'] = float(price_cleaned)
+        except ValueError:
+            numbers = re.findall(r'\d+', result['price'])
+            result['price'] = float(''.join(numbers)) if numbers else 0
+    required_fields = ['server', 'character', 'transport', 'license_plate', 'price', 'duration', 'renter']
+    if all(field in result for field in required_fields):
+        return result
+    return None
+
+
+def make_corpus(size: int):
+    rnd = random.Random(7)
+    corpus = []
+    for i in range(size):
+        text = VALID_TEMPLATE.format(
+            server=f'Server {rnd.randrange(1, 21)}',
+            character=f'Ivan_{rnd.randrange(10000)}',
+            transport=rnd.choice(['Mercedes-Benz G63', 'BMW M5 F90', 'Lada 2107', 'Audi RS6']),
+            plate=f'{rnd.choice("ABEKMHOPCTYX")}{rnd.randrange(1000):03d}{rnd.choice("ABEKMHOPCTYX")}',
+            price=rnd.choice(PRICES),
+            duration=rnd.choice(DURATIONS),
+            renter=f'Petr_{rnd.randrange(10000)}'
+        )
+        kind = i % 10
+        if kind == 7:
+            # Нет обязательного поля
+            text = text.replace('Арендатор', 'Арендатель')
+        elif kind == 8:
+            # Номер в нижнем регистре не распознается
+            text = text.replace('Номер транспорта: ', 'Номер транспорта: x')
+        elif kind == 9:
+            # Посторонний текст
+            text = 'Просто сообщение в чате без данных об аренде ' * rnd.randrange(1, 5)
+        corpus.append(text)
+    return corpus
+
+
+def run(name, parse, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            parse(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(corpus) / best
+    print(f"{name:<22} {rate:12,.0f} сообщений/с")
+    return rate
+
+
+def main(size: int, repeat: int):
+    corpus = make_corpus(size)
+
+    mismatches = sum(1 for text in corpus if legacy_parse(text) != parse_rental_message(text))
+    parsed = sum(1 for text in corpus if parse_rental_message(text))
+    print(f"Корпус: {len(corpus)} сообщений, распознано: {parsed}, расхождений с прежним парсером: {mismatches}")
+
+    legacy = run('прежний парсер', legacy_parse, corpus, repeat)
+    current = run('однопроходный парсер', parse_rental_message, corpus, repeat)
+    print(f"Ускорение: x{current / legacy:.2f}")
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    )
@@ -0,0 +1,165 @@
+"""
+Нагрузочный тест режима вебхука.
+
+Поднимает локальную заглушку Bot API (отвечает на sendMessage и прочие методы),
+WebhookServer с роутерами бота и отправляет на эндпоинт вебхука синтетические
+обновления с сообщениями об аренде из корпуса parser_benchmark. Печатает
+p50 и p99 задержки подтверждения HTTP-запроса (прием в очередь UpdateScheduler),
+времени ожидания в очереди чата и времени обработки обновления обработчиками.
+
+База создается во временном каталоге, рабочая база бота не затрагивается.
+
+Запуск: python -m benchmarks.webhook_load_test [обновлений] [параллельных_запросов] [задержка_api_мс]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Tuple
+
+from aiohttp import ClientSession, TCPConnector, web
+
+TOKEN = '123456:load-test-token'
+SECRET = 'load-test-secret'
+WEBHOOK_PATH = '/webhook'
+CHAT_ID = 1000
+# Пауза перед повторной отправкой отклоненного (503) обновления, секунды
+RETRY_DELAY = 0.05
+
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000 if samples else 0.0
+
+
+def make_update(update_id: int, text: str) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': CHAT_ID + update_id % 50, 'type': 'group', 'title': 'Аренды'},
+            'from': {'id': CHAT_ID + update_id % 50, 'is_bot': False, 'first_name': 'Load'},
+            'text': text
+        }
+    }
+
+
+def create_fake_api(api_delay: float, calls: dict) -> web.Application:
+    """Заглушка Bot API: на любой метод возвращает успешный ответ"""
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        calls[method] = calls.get(method, 0) + 1
+        form = await request.post()
+        if api_delay:
+            await asyncio.sleep(api_delay)
+        if method.lower() == 'sendmessage':
+            result = {
+                'message_id': calls[method],
+                'date': int(time.time()),
+                'chat': {'id': int(form.get('chat_id', 0)), 'type': 'group', 'title': 'Аренды'},
+                'text': form.get('text', '')
+            }
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    app = web.Application()
+    app.router.add_post('/bot{token}/{method}', handle)
+    return app
+
+
+async def start_app(app: web.Application) -> Tuple[web.AppRunner, int]:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+async def main(count: int, concurrency: int, api_delay_ms: float):
+    # Модули бота создают базу rentals.db в текущем каталоге при импорте
+    os.chdir(tempfile.mkdtemp(prefix='webhook_load_'))
+
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.fsm.storage.memory import MemoryStorage
+
+    from benchmarks.parser_benchmark import make_corpus
+    from database.async_db import async_db
+    from database.write_queue import rental_queue
+    from handlers.rental_handler import router as rental_router
+    from handlers.admin_handler import router as admin_router
+    from utils.scheduler import UpdateScheduler, ScheduledDispatcher
+    from utils.webhook import WebhookServer, SECRET_HEADER
+
+    calls = {}
+    api_runner, api_port = await start_app(create_fake_api(api_delay_ms / 1000, calls))
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f'http://127.0.0.1:{api_port}'))
+    bot = Bot(token=TOKEN, session=session)
+
+    scheduler = UpdateScheduler(max_concurrency=concurrency, max_pending=concurrency * 8)
+    dp = ScheduledDispatcher(storage=MemoryStorage(), scheduler=scheduler)
+    dp.include_router(rental_router)
+    dp.include_router(admin_router)
+
+    server = WebhookServer(dp, bot, WEBHOOK_PATH, SECRET)
+    webhook_runner, webhook_port = await start_app(server.create_app())
+    url = f'http://127.0.0.1:{webhook_port}{WEBHOOK_PATH}'
+
+    corpus = make_corpus(count)
+    acks = []
+    statuses = {}
+    limit = asyncio.Semaphore(concurrency)
+
+    async def send(client: ClientSession, update_id: int, text: str):
+        # Как и Telegram, повторяем доставку, пока сервер отвечает 503
+        while True:
+            async with limit:
+                started = time.perf_counter()
+                async with client.post(url, json=make_update(update_id, text),
+                                       headers={SECRET_HEADER: SECRET}) as response:
+                    await response.read()
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+                acks.append(time.perf_counter() - started)
+            if response.status != 503:
+                return
+            await asyncio.sleep(RETRY_DELAY)
+
+    begin = time.perf_counter()
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as client:
+        await asyncio.gather(*(send(client, i + 1, text) for i, text in enumerate(corpus)))
+
+    # Ждем, пока будут обработаны все принятые обновления
+    await scheduler.close(timeout=600)
+    elapsed = time.perf_counter() - begin
+
+    stats = server.get_stats()
+    queue = scheduler.get_stats()
+    print(f"обновлений: {count}  параллельно: {concurrency}  задержка API: {api_delay_ms:.0f} мс")
+    print(f"HTTP статусы: {statuses}  вызовы API: {calls}")
+    print(f"время: {elapsed:.2f} с  пропускная способность: {count / elapsed:.0f} обновлений/с")
+    print(f"подтверждение запроса  p50: {percentile(acks, 0.5):7.2f} мс  p99: {percentile(acks, 0.99):7.2f} мс")
+    print(f"ожидание в очереди чата p50: {queue['wait_p50_ms']:7.2f} мс  p99: {queue['wait_p99_ms']:7.2f} мс  "
+          f"отклонено (503): {stats['rejected']}")
+    print(f"обработка обновления   p50: {queue['processing_p50_ms']:7.2f} мс  "
+          f"p99: {queue['processing_p99_ms']:7.2f} мс  обработано: {queue['completed']}  ошибок: {queue['failures']}")
+
+    await server.close()
+    await webhook_runner.cleanup()
+    await bot.session.close()
+    await api_runner.cleanup()
+    await rental_queue.close()
+    async_db.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 64,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 20
+    ))
@@ -7,4 +7,51 @@ class Settings:
     BOT_TOKEN = os.getenv('BOT_TOKEN')
     ADMIN_IDS = [int(x.strip()) for x in os.getenv('ADMIN_IDS', '').split(',')]
     
+    # Хранилище HTML отчетов
+    REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+    REPORTS_MAX_COUNT = int(os.getenv('REPORTS_MAX_COUNT', '20'))
+    REPORTS_MAX_SIZE_MB = float(os.getenv('REPORTS_MAX_SIZE_MB', '100'))
+    REPORTS_MAX_AGE_HOURS = float(os.getenv('REPORTS_MAX_AGE_HOURS', '168'))
+    REPORTS_CLEANUP_INTERVAL = float(os.getenv('REPORTS_CLEANUP_INTERVAL', '3600'))
+    # Сжимать сохраненные отчеты в .html.gz
+    REPORTS_GZIP = os.getenv('REPORTS_GZIP', '0').lower() in ('1', 'true', 'yes')
+    # Процессов для построения отчетов и одновременно строящихся отчетов
+    REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+    
+    # Хранилище состояний FSM: sqlite (в базе бота, переживает перезапуск) или memory
+    FSM_STORAGE = os.getenv('FSM_STORAGE', 'sqlite').lower()
+    # Через сколько часов без изменений незавершенный диалог сбрасывается
+    FSM_STATE_TTL_HOURS = float(os.getenv('FSM_STATE_TTL_HOURS', '24'))
+    # Интервал пакетной записи изменений состояний, секунды
+    FSM_FLUSH_INTERVAL = float(os.getenv('FSM_FLUSH_INTERVAL', '1'))
+    
+    # Режим получения обновлений: polling или webhook
+    BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+    # Публичный адрес сервера (https://example.com), на который Telegram отправляет обновления
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or None
+    WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+    # Очередь входящих соединений сокета (listen backlog)
+    WEBHOOK_BACKLOG = int(os.getenv('WEBHOOK_BACKLOG', '1024'))
+    # Сколько соединений Telegram одновременно открывает к вебхуку (не больше 100).
+    # Параллелизм обработки задают UPDATE_MAX_CONCURRENCY и UPDATE_MAX_PENDING
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', os.getenv('WEBHOOK_MAX_CONCURRENCY', '64')))
+    
+    # Сколько обновлений разных чатов обрабатывается одновременно (сообщения одного чата - по очереди)
+    UPDATE_MAX_CONCURRENCY = int(os.getenv('UPDATE_MAX_CONCURRENCY', '32'))
+    # Сколько принятых, но не обработанных обновлений допускается, прежде чем прием приостановится
+    UPDATE_MAX_PENDING = int(os.getenv('UPDATE_MAX_PENDING', '1000'))
+    
+    # Эндпоинт /metrics в формате Prometheus; METRICS_PORT=0 отключает его
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+    
+    # Логирование: уровень и формат (json - по записи JSON на строку, text - для чтения глазами)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+    # Прореживание частых записей ниже WARNING: логгер=доля сохраняемых записей через запятую
+    LOG_SAMPLING = os.getenv('LOG_SAMPLING', 'database.models.rentals=0.1,handlers.rental_handler=0.1,aiogram.event=0.1')
+    
 settings = Settings()
\ No newline at end of file
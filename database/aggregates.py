@@ -0,0 +1,264 @@
+"""
+Сводные таблицы статистики.
+
+Проверка сводных таблиц и временных рядов по исходным данным:
+python -m database.aggregates --verify [--repair] [--db rentals.db]
+"""
+import argparse
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+# Сводные таблицы для дашбордов. Обновляются триггерами в той же транзакции,
+# что и запись в исходные таблицы, поэтому чтение статистики стоит O(групп), а не O(аренд).
+# Счетчики аренд по каждому автомобилю уже хранятся в cars (total_income, total_rentals),
+# в stats_car ведутся расходы на обслуживание автомобиля, в stats_expenses - расходы
+# по статьям и дням. Доходы и аренды по дням и месяцам ведутся во временных рядах
+# (database.rollups).
+TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS stats_server (
+        server TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        income REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS stats_transport (
+        transport TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        income REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS stats_car (
+        car_id INTEGER PRIMARY KEY,
+        maintenance_count INTEGER NOT NULL DEFAULT 0,
+        maintenance_total REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS stats_expenses (
+        category TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (category, day)
+    ) WITHOUT ROWID
+    ''',
+]
+
+# Статьи расходов: категория в stats_expenses -> (таблица, колонка даты)
+EXPENSE_SOURCES = {
+    'maintenance': ('maintenance', 'maintenance_date'),
+    'advertisement': ('advertisement_costs', 'advertisement_date'),
+    'other_costs': ('other_costs', 'cost_date'),
+}
+
+
+def _expense_triggers(category: str, table: str, column: str) -> List[str]:
+    """Триггеры вставки и удаления расхода, обновляющие сумму статьи за день"""
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_expenses_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO stats_expenses (category, day, count, amount)
+                VALUES ('{category}', date(NEW.{column}), 1, NEW.amount)
+                ON CONFLICT(category, day) DO UPDATE SET count = count + 1, amount = amount + excluded.amount;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_expenses_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE stats_expenses SET count = count - 1, amount = amount - OLD.amount
+                WHERE category = '{category}' AND day = date(OLD.{column});
+        END
+        ''',
+    ]
+
+
+TRIGGERS = [
+    # === АРЕНДЫ ===
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_rentals_stats_insert AFTER INSERT ON rentals
+    BEGIN
+        INSERT INTO stats_server (server, count, income) VALUES (NEW.server, 1, NEW.price)
+            ON CONFLICT(server) DO UPDATE SET count = count + 1, income = income + excluded.income;
+        INSERT INTO stats_transport (transport, count, income) VALUES (NEW.transport, 1, NEW.price)
+            ON CONFLICT(transport) DO UPDATE SET count = count + 1, income = income + excluded.income;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_rentals_stats_delete AFTER DELETE ON rentals
+    BEGIN
+        UPDATE stats_server SET count = count - 1, income = income - OLD.price WHERE server = OLD.server;
+        UPDATE stats_transport SET count = count - 1, income = income - OLD.price WHERE transport = OLD.transport;
+    END
+    ''',
+    # === ОБСЛУЖИВАНИЕ ===
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_maintenance_stats_insert AFTER INSERT ON maintenance
+    BEGIN
+        INSERT INTO stats_car (car_id, maintenance_count, maintenance_total) VALUES (NEW.car_id, 1, NEW.amount)
+            ON CONFLICT(car_id) DO UPDATE SET maintenance_count = maintenance_count + 1,
+                                              maintenance_total = maintenance_total + excluded.maintenance_total;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_maintenance_stats_delete AFTER DELETE ON maintenance
+    BEGIN
+        UPDATE stats_car SET maintenance_count = maintenance_count - 1,
+                             maintenance_total = maintenance_total - OLD.amount
+            WHERE car_id = OLD.car_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_cars_stats_delete AFTER DELETE ON cars
+    BEGIN
+        DELETE FROM stats_car WHERE car_id = OLD.id;
+    END
+    ''',
+] + [
+    # === РАСХОДЫ ПО СТАТЬЯМ И ДНЯМ ===
+    trigger
+    for category, (table, column) in EXPENSE_SOURCES.items()
+    for trigger in _expense_triggers(category, table, column)
+]
+
+# Эталонный расчет каждой сводной таблицы по исходным данным:
+# (таблица, ключевая колонка или кортеж колонок, колонки значений, запрос)
+SOURCES = [
+    ('stats_server', 'server', ['count', 'income'], '''
+        SELECT server, COUNT(*), SUM(price) FROM rentals GROUP BY server
+    '''),
+    ('stats_transport', 'transport', ['count', 'income'], '''
+        SELECT transport, COUNT(*), SUM(price) FROM rentals GROUP BY transport
+    '''),
+    ('stats_car', 'car_id', ['maintenance_count', 'maintenance_total'], '''
+        SELECT car_id, COUNT(*), SUM(amount) FROM maintenance GROUP BY car_id
+    '''),
+    ('stats_expenses', ('category', 'day'), ['count', 'amount'], '\n        UNION ALL '.join(
+        f"SELECT '{category}', date({column}) AS day, COUNT(*), SUM(amount) FROM {table} GROUP BY day"
+        for category, (table, column) in EXPENSE_SOURCES.items()
+    )),
+]
+
+TOLERANCE = 1e-6
+
+
+def create_aggregates(conn: sqlite3.Connection):
+    """Создание сводных таблиц и триггеров с заполнением по текущим данным"""
+    for statement in TABLES + TRIGGERS:
+        conn.execute(statement)
+    rebuild_aggregates(conn)
+
+
+# Триггеры миграции 2, которые обновляли удаленную таблицу stats_daily
+DAILY_TRIGGERS = [
+    'trg_rentals_stats_insert',
+    'trg_rentals_stats_delete',
+    'trg_maintenance_stats_insert',
+    'trg_maintenance_stats_delete',
+    'trg_advertisement_stats_insert',
+    'trg_advertisement_stats_delete',
+    'trg_other_costs_stats_insert',
+    'trg_other_costs_stats_delete',
+]
+
+
+def drop_daily_aggregates(conn: sqlite3.Connection):
+    """
+    Удаление stats_daily: таблица дублировала дневные временные ряды и не читалась.
+    Триггеры пересоздаются без обновления stats_daily.
+    """
+    for trigger in DAILY_TRIGGERS:
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('DROP TABLE IF EXISTS stats_daily')
+    for statement in TABLES + TRIGGERS:
+        conn.execute(statement)
+
+
+def _key_columns(key) -> tuple:
+    return key if isinstance(key, tuple) else (key,)
+
+
+def rebuild_aggregates(conn: sqlite3.Connection, sources: Sequence[tuple] = SOURCES):
+    """Полный пересчет сводных таблиц по исходным данным"""
+    for table, key, columns, query in sources:
+        keys = _key_columns(key)
+        conn.execute(f'DELETE FROM {table}')
+        placeholders = ', '.join('?' * (len(keys) + len(columns)))
+        conn.executemany(
+            f'INSERT INTO {table} ({", ".join(keys + tuple(columns))}) VALUES ({placeholders})',
+            conn.execute(query).fetchall()
+        )
+
+
+def check_aggregates(conn: sqlite3.Connection, sources: Sequence[tuple] = SOURCES) -> List[Dict[str, Any]]:
+    """
+    Сравнение сводных таблиц с эталонным расчетом.
+    Возвращает список расхождений; отсутствующая строка считается нулевой.
+    """
+    drift = []
+    for table, key, columns, query in sources:
+        keys = _key_columns(key)
+        size = len(keys)
+
+        def split(row):
+            group = row[0] if size == 1 else tuple(row[:size])
+            return group, tuple(row[size:])
+
+        expected = dict(split(row) for row in conn.execute(query))
+        actual = dict(
+            split(row)
+            for row in conn.execute(f'SELECT {", ".join(keys + tuple(columns))} FROM {table}')
+        )
+        zero = (0,) * len(columns)
+
+        for group in expected.keys() | actual.keys():
+            want = expected.get(group, zero)
+            have = actual.get(group, zero)
+            if any(abs((w or 0) - (h or 0)) > TOLERANCE for w, h in zip(want, have)):
+                drift.append({
+                    'table': table,
+                    'key': group,
+                    'expected': dict(zip(columns, want)),
+                    'actual': dict(zip(columns, have))
+                })
+    return drift
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Проверка сводных таблиц статистики')
+    parser.add_argument('--verify', action='store_true', required=True,
+                        help='Сравнить сводные таблицы и временные ряды с исходными данными')
+    parser.add_argument('--repair', action='store_true', help='Пересчитать таблицы при расхождениях')
+    parser.add_argument('--db', default='rentals.db', help='Файл базы данных')
+    args = parser.parse_args(argv)
+
+    # Импорт здесь: database.models сам импортирует этот модуль
+    from database.models import Database
+
+    database = Database(args.db, pool_size=1, cache_ttl=0)
+    try:
+        result = database.verify_aggregates(repair=args.repair)
+    finally:
+        database.close()
+
+    if 'error' in result:
+        print(f"Ошибка проверки: {result['error']}")
+        return 2
+    for item in result['drift']:
+        print(f"{item['table']} {item['key']}: ожидалось {item['expected']}, в таблице {item['actual']}")
+    if not result['drift']:
+        print("Расхождений нет")
+        return 0
+    if result['repaired']:
+        print(f"Расхождений: {len(result['drift'])}, сводные таблицы пересчитаны")
+        return 0
+    print(f"Расхождений: {len(result['drift'])}. Для пересчета запустите с --repair")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
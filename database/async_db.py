@@ -0,0 +1,61 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from database.models import Database
+
+
+class AsyncDatabase:
+    """
+    Асинхронный фасад над Database.
+    Запросы выполняются в отдельном ограниченном пуле потоков, поэтому
+    обработчики aiogram не блокируют цикл событий. Набор методов совпадает с Database.
+    """
+
+    def __init__(self, database: Database, max_workers: int = None):
+        self.database = database
+        # По одному потоку на соединение пула: потоки не ждут свободного соединения
+        self.max_workers = max_workers or database.pool.max_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='db'
+        )
+        self._methods: Dict[str, Callable] = {}
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполнение произвольной синхронной функции в пуле потоков БД"""
+        loop = asyncio.get_running_loop()
+        # Контекст (в том числе поля логирования) переносится в поток пула
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(context.run, func, *args, **kwargs)
+        )
+
+    def __getattr__(self, name: str) -> Callable:
+        method = getattr(self.database, name)
+        if name.startswith('_') or not callable(method):
+            return method
+
+        wrapper = self._methods.get(name)
+        if wrapper is None:
+            @functools.wraps(method)
+            async def wrapper(*args, **kwargs):
+                return await self.run(method, *args, **kwargs)
+            self._methods[name] = wrapper
+        return wrapper
+
+    def close(self):
+        """Остановка пула потоков и закрытие соединений"""
+        self._executor.shutdown(wait=True)
+        self.database.close()
+
+
+# Глобальный экземпляр базы данных. Создается здесь, а не в database.models,
+# чтобы процессы пула отчетов импортировали Database без подключения к базе бота
+db = Database()
+
+# Глобальный асинхронный экземпляр базы данных
+async_db = AsyncDatabase(db)
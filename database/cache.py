@@ -0,0 +1,144 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+
+# Теги кэша соответствуют таблицам, от которых зависит результат чтения
+RENTALS = 'rentals'
+CARS = 'cars'
+MAINTENANCE = 'maintenance'
+ADVERTISEMENT = 'advertisement'
+OTHER_COSTS = 'other_costs'
+ALL_TAGS = (RENTALS, CARS, MAINTENANCE, ADVERTISEMENT, OTHER_COSTS)
+
+_MISSING = object()
+
+
+class QueryCache:
+    """
+    Потокобезопасный LRU-кэш результатов чтения с TTL и инвалидацией по тегам.
+    Результаты отдаются всем вызывающим как есть, поэтому их нельзя изменять.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # Метрики
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, key: Hashable) -> Tuple[Any, int]:
+        """Возвращает (значение или _MISSING, поколение кэша на момент чтения)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, self._generation
+                self._remove(key)
+            self.misses += 1
+            return _MISSING, self._generation
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str], generation: int):
+        """
+        Сохраняет значение, если с момента чтения не было инвалидаций.
+        Иначе результат мог быть посчитан до конкурентной записи и устареть.
+        """
+        tags = tuple(tags)
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, *tags: str):
+        """Удаляет все записи, зависящие от указанных таблиц"""
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        """Полная очистка кэша"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики кэша: попадания, промахи, вытеснения и инвалидации"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def cached(*tags: str) -> Callable:
+    """Кэширует результат метода Database; tags - таблицы, от которых он зависит"""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache: QueryCache = self.cache
+            if not cache.enabled:
+                return method(self, *args, **kwargs)
+
+            key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            value, generation = cache.get(key)
+            if value is _MISSING:
+                value = method(self, *args, **kwargs)
+                cache.set(key, value, tags, generation)
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidates(*tags: str) -> Callable:
+    """Сбрасывает кэш по указанным таблицам после выполнения метода записи"""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.cache.invalidate(*tags)
+        return wrapper
+    return decorator
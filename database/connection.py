@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from queue import Queue, Empty, Full
+from typing import Dict, Any, Iterator
+
+
+class ConnectionPool:
+    """Пул долгоживущих соединений SQLite с единой настройкой PRAGMA"""
+
+    def __init__(self, db_path: str, max_size: int = 5, timeout: float = 30.0,
+                 cached_statements: int = 256, read_only: bool = False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+
+        self._idle: Queue = Queue(maxsize=max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+        # Статистика пула
+        self._opened = 0
+        self._reused = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    def _open(self) -> sqlite3.Connection:
+        """Открытие и настройка нового соединения"""
+        if self.read_only:
+            # Режим только для чтения: режим журнала задает пишущий процесс
+            conn = sqlite3.connect(
+                f'file:{self.db_path}?mode=ro',
+                uri=True,
+                timeout=self.timeout,
+                check_same_thread=False,
+                cached_statements=self.cached_statements
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA query_only=ON')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            return conn
+
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Получение соединения из пула (или открытие нового)"""
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._reused += 1
+            return conn
+        except Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.max_size:
+                conn = self._open()
+                self._all.append(conn)
+                self._opened += 1
+                return conn
+
+        # Все соединения заняты - ждем освобождения
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError(
+                f"Нет свободного соединения с базой {self.db_path} за {self.timeout:g} с "
+                f"(все {self.max_size} заняты)"
+            ) from None
+        with self._lock:
+            self._waits += 1
+            self._wait_time += time.perf_counter() - started
+            self._reused += 1
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        """Возврат соединения в пул"""
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Выдает соединение на время блока with.
+        Фиксирует транзакцию при успехе и откатывает при ошибке, как sqlite3.connect().
+        Вложенные вызовы в том же потоке используют то же соединение и ту же транзакцию.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика использования пула"""
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'opened': self._opened,
+                'reused': self._reused,
+                'idle': self._idle.qsize(),
+                'in_use': len(self._all) - self._idle.qsize(),
+                'waits': self._waits,
+                'wait_time': self._wait_time,
+                'timeouts': self._timeouts
+            }
+
+    def close(self):
+        """Закрытие всех соединений пула"""
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all.clear()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except Empty:
+                break
@@ -0,0 +1,40 @@
+import sqlite3
+
+# Счетчик версии данных. Любая запись в исходные таблицы увеличивает его триггером
+# в той же транзакции, поэтому по версии можно определить, изменилось ли что-то
+# с момента построения кэшированного результата, в том числе из другого процесса.
+# PRAGMA data_version для этого не подходит: он не видит изменений, сделанных
+# тем же соединением, а соединения берутся из пула.
+VERSIONED_TABLES = ('rentals', 'cars', 'maintenance', 'advertisement_costs', 'other_costs')
+
+TABLE = '''
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END
+    '''
+    for table in VERSIONED_TABLES
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+
+def create_data_version(conn: sqlite3.Connection):
+    """Создание счетчика версии данных и триггеров"""
+    conn.execute(TABLE)
+    conn.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+    for statement in TRIGGERS:
+        conn.execute(statement)
+
+
+def get_data_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия данных"""
+    row = conn.execute('SELECT version FROM data_version WHERE id = 1').fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from database.async_db import AsyncDatabase
+
+
+@dataclass
+class FSMRecord:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    # Время последнего изменения (unix time), по нему истекает TTL
+    updated_at: float = 0.0
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище состояний FSM в базе бота (таблица fsm_states).
+    Незавершенные диалоги добавления автомобилей, обслуживания и расходов
+    переживают перезапуск. Чтение идет из памяти (с диска - только при первом
+    обращении к ключу), изменения накапливаются и записываются одной транзакцией
+    раз в flush_interval секунд. Состояния, не менявшиеся дольше state_ttl,
+    удаляются из памяти и базы, поэтому брошенные диалоги не накапливаются.
+    """
+
+    def __init__(self, database: AsyncDatabase, state_ttl: float = 24 * 3600,
+                 flush_interval: float = 1.0, purge_interval: float = 600):
+        self.database = database
+        self.state_ttl = state_ttl
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+
+        self._records: Dict[str, FSMRecord] = {}
+        self._dirty: Set[str] = set()
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._last_purge = time.time()
+
+        # Метрики
+        self.loads = 0
+        self.flushes = 0
+        self.written = 0
+        self.purged = 0
+
+    @staticmethod
+    def _storage_key(key: StorageKey) -> str:
+        return f'{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or 0}:{key.destiny}'
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._stopping = asyncio.Event()
+            # Фоновая задача обслуживает все чаты: контекст вызвавшего обработчика ей не передается
+            self._worker = asyncio.create_task(self._run(self._stopping), context=contextvars.Context())
+
+    async def _run(self, stopping: asyncio.Event):
+        # Задача не отменяется: при остановке она завершает текущий сброс и выполняет последний
+        while not stopping.is_set():
+            try:
+                await asyncio.wait_for(stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+            if not stopping.is_set() and time.time() - self._last_purge >= self.purge_interval:
+                await self.purge()
+
+    async def _get_record(self, key: StorageKey) -> FSMRecord:
+        name = self._storage_key(key)
+        record = self._records.get(name)
+        if record is not None:
+            if record.updated_at >= time.time() - self.state_ttl:
+                return record
+            # Состояние истекло, но еще не удалено очисткой: диалог начинается заново
+            record = self._records[name] = FSMRecord(updated_at=time.time())
+            return record
+
+        row = await self.database.get_fsm_record(name)
+        self.loads += 1
+        if row is not None and row['updated_at'] >= time.time() - self.state_ttl:
+            loaded = FSMRecord(row['state'], json.loads(row['data']), row['updated_at'])
+        else:
+            loaded = FSMRecord(updated_at=time.time())
+        # Пока шло чтение, ключ мог быть загружен или изменен другим обработчиком
+        return self._records.setdefault(name, loaded)
+
+    def _mark_dirty(self, key: StorageKey, record: FSMRecord):
+        record.updated_at = time.time()
+        self._dirty.add(self._storage_key(key))
+        self._ensure_worker()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get_record(key)
+        record.data = data.copy()
+        self._mark_dirty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get_record(key)).data.copy()
+
+    async def flush(self):
+        """Запись накопленных изменений одной транзакцией"""
+        if not self._dirty:
+            return
+
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            names, self._dirty = self._dirty, set()
+            rows = []
+            deleted = []
+            for name in names:
+                record = self._records.get(name)
+                if record is None:
+                    continue
+                if record.state is None and not record.data:
+                    # Диалог завершен: строка больше не нужна
+                    deleted.append(name)
+                else:
+                    rows.append((name, record.state, json.dumps(record.data, ensure_ascii=False),
+                                 record.updated_at))
+
+            try:
+                saved = await self.database.save_fsm_records(rows, deleted)
+            except asyncio.CancelledError:
+                # Изменения не должны теряться при отмене во время записи
+                self._dirty |= names
+                raise
+            if saved:
+                self.flushes += 1
+                self.written += len(rows) + len(deleted)
+            else:
+                # Не удалось записать - повторим при следующем сбросе
+                self._dirty |= names
+
+    async def purge(self):
+        """Удаление состояний, не менявшихся дольше state_ttl, и пустых записей из памяти"""
+        self._last_purge = time.time()
+        cutoff = self._last_purge - self.state_ttl
+        # Пустые записи (чаты без диалога) нужны только как кэш отсутствия состояния
+        empty_cutoff = self._last_purge - self.purge_interval
+        for name, record in list(self._records.items()):
+            if name in self._dirty:
+                continue
+            empty = record.state is None and not record.data
+            if record.updated_at < cutoff or (empty and record.updated_at < empty_cutoff):
+                del self._records[name]
+        self.purged += await self.database.purge_fsm_records(cutoff)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика хранилища: ключи в памяти, ожидающие записи, загрузки и сбросы"""
+        return {
+            'records': len(self._records),
+            'dirty': len(self._dirty),
+            'loads': self.loads,
+            'flushes': self.flushes,
+            'written': self.written,
+            'purged': self.purged
+        }
+
+    async def close(self) -> None:
+        """Остановка фоновой записи и сохранение оставшихся изменений"""
+        if self._worker is not None:
+            self._stopping.set()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._dirty:
+            await self.flush()
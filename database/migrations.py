@@ -0,0 +1,133 @@
+import logging
+import sqlite3
+from typing import Callable, List, Tuple, Union
+
+from database.aggregates import create_aggregates, drop_daily_aggregates, rebuild_aggregates
+from database.data_version import create_data_version
+from database.rollups import create_rollups, rebuild_rollups
+from database.search import create_search
+
+logger = logging.getLogger(__name__)
+
+# Шаг миграции: SQL-выражение или функция, принимающая соединение
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+# Версионированные миграции схемы. Текущая версия хранится в PRAGMA user_version.
+# Новые миграции добавляются только в конец списка с увеличением номера версии.
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, 'Индексы для аренд, автомобилей, обслуживания и расходов', [
+        # Аренды конкретного автомобиля по дате (get_rentals_by_car)
+        'CREATE INDEX IF NOT EXISTS idx_rentals_plate_created ON rentals(license_plate, created_at)',
+        # Последние аренды (ORDER BY created_at DESC)
+        'CREATE INDEX IF NOT EXISTS idx_rentals_created ON rentals(created_at)',
+        # Покрывающие индексы для статистики по серверам и транспорту
+        'CREATE INDEX IF NOT EXISTS idx_rentals_server ON rentals(server, price)',
+        'CREATE INDEX IF NOT EXISTS idx_rentals_transport ON rentals(transport, price)',
+        # История обслуживания (JOIN по car_id и сортировка по дате)
+        'CREATE INDEX IF NOT EXISTS idx_maintenance_car_date ON maintenance(car_id, maintenance_date)',
+        'CREATE INDEX IF NOT EXISTS idx_maintenance_date ON maintenance(maintenance_date)',
+        # Списки автомобилей и расходов
+        'CREATE INDEX IF NOT EXISTS idx_cars_created ON cars(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_cars_status_created ON cars(status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_advertisement_costs_date ON advertisement_costs(advertisement_date)',
+        'CREATE INDEX IF NOT EXISTS idx_other_costs_date ON other_costs(cost_date)',
+    ]),
+    (2, 'Сводные таблицы статистики с триггерами', [
+        create_aggregates,
+    ]),
+    (3, 'Индексы для keyset-пагинации по (created_at, id)', [
+        'CREATE INDEX IF NOT EXISTS idx_maintenance_created ON maintenance(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_advertisement_costs_created ON advertisement_costs(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_other_costs_created ON other_costs(created_at)',
+    ]),
+    (4, 'Журнал импортированных сообщений для дедупликации', [
+        '''CREATE TABLE IF NOT EXISTS imported_messages (
+            message_hash TEXT PRIMARY KEY,
+            imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID''',
+    ]),
+    (5, 'Счетчик версии данных для кэширования отчетов', [
+        create_data_version,
+    ]),
+    (6, 'Индексы дат продажи и покупки для отчетов за период', [
+        'CREATE INDEX IF NOT EXISTS idx_cars_sale_date ON cars(sale_date)',
+        'CREATE INDEX IF NOT EXISTS idx_cars_purchase_date ON cars(purchase_date)',
+    ]),
+    (7, 'Временные ряды доходов, аренд и расходов', [
+        create_rollups,
+    ]),
+    (8, 'Полнотекстовый поиск по автомобилям и арендам', [
+        create_search,
+    ]),
+    (9, 'Хранилище состояний FSM', [
+        '''CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID''',
+        # Удаление устаревших состояний по TTL
+        'CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states(updated_at)',
+    ]),
+    (10, 'Удаление неиспользуемой дневной сводной таблицы stats_daily', [
+        drop_daily_aggregates,
+    ]),
+    (11, 'Сводная таблица расходов по статьям и дням', [
+        create_aggregates,
+    ]),
+    (12, 'Даты покупки, продажи, обслуживания и расходов в UTC, как даты аренд', [
+        # Раньше эти даты записывались по местному времени сервера (datetime.now()).
+        # Перевод выполняется по часовому поясу сервера, на котором применяется миграция
+        *(
+            f"UPDATE {table} SET {column} = datetime({column}, 'utc') WHERE datetime({column}, 'utc') IS NOT NULL"
+            for table, column in (
+                ('cars', 'purchase_date'),
+                ('cars', 'sale_date'),
+                ('maintenance', 'maintenance_date'),
+                ('advertisement_costs', 'advertisement_date'),
+                ('other_costs', 'cost_date'),
+            )
+        ),
+        # Триггеры не следят за изменением дат: корзины пересчитываются заново
+        rebuild_aggregates,
+        rebuild_rollups,
+    ]),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы базы данных"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Применяет все миграции, версия которых выше текущей.
+    Каждая миграция выполняется в отдельной транзакции вместе с обновлением user_version.
+    Возвращает итоговую версию схемы.
+    """
+    current = get_schema_version(conn)
+
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN')
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        current = version
+        logger.info("Применена миграция %s: %s", version, description)
+
+    return current
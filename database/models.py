@@ -1,16 +1,166 @@
 import sqlite3
 import os
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import json
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+from database.connection import ConnectionPool
+from database.migrations import apply_migrations, get_schema_version
+from database.data_version import get_data_version
+from database.aggregates import check_aggregates, rebuild_aggregates
+from database.pagination import fetch_page, empty_page, NEXT
+from database.periods import day_range, range_condition
+from database.search import search_cars, search_rentals
+from utils.periods import db_now
+from database.rollups import (
+    BUCKET_FORMATS, DIMENSIONS, check_rollups, rebuild_rollups, iter_buckets, bucket_start, dense_series
+)
+from database.cache import (
+    QueryCache, cached, invalidates,
+    RENTALS, CARS, MAINTENANCE, ADVERTISEMENT, OTHER_COSTS, ALL_TAGS
+)
+from utils.metrics import instrumented, DB_QUERY_SECONDS
 
+logger = logging.getLogger(__name__)
+# Успешные записи аренд - самый частый путь, его логгер прореживается отдельно
+rental_logger = logging.getLogger(__name__ + '.rentals')
+
+# Суммы статей расходов из сводной таблицы stats_expenses (колонки как в FinancialSnapshot)
+EXPENSES_BY_CATEGORY = '''
+    SELECT COALESCE(SUM(CASE WHEN category = 'maintenance' THEN amount END), 0.0) AS maintenance,
+           COALESCE(SUM(CASE WHEN category = 'advertisement' THEN amount END), 0.0) AS advertisement,
+           COALESCE(SUM(CASE WHEN category = 'other_costs' THEN amount END), 0.0) AS other_costs
+'''
+
+@dataclass(frozen=True)
+class FinancialSnapshot:
+    """Финансовые показатели и расходы, посчитанные одним запросом"""
+    rental_income: float = 0.0
+    sales_income: float = 0.0
+    maintenance: float = 0.0
+    advertisement: float = 0.0
+    other_costs: float = 0.0
+    car_costs: float = 0.0
+    total_rentals: int = 0
+    total_cars: int = 0
+    
+    @property
+    def total_income(self) -> float:
+        return self.rental_income + self.sales_income
+    
+    @property
+    def total_expenses(self) -> float:
+        return self.maintenance + self.advertisement + self.other_costs + self.car_costs
+    
+    @property
+    def net_profit(self) -> float:
+        return self.total_income - self.total_expenses
+    
+    @property
+    def profitability(self) -> float:
+        return (self.net_profit / self.total_income * 100) if self.total_income > 0 else 0
+    
+    @property
+    def expense_income_ratio(self) -> float:
+        return (self.total_expenses / self.total_income * 100) if self.total_income > 0 else 0
+    
+    def expense_percent(self, amount: float) -> float:
+        """Доля статьи расходов в общих расходах, %"""
+        return (amount / self.total_expenses * 100) if self.total_expenses > 0 else 0
+    
+    @property
+    def expenses(self) -> Dict[str, float]:
+        return {
+            'maintenance': self.maintenance,
+            'advertisement': self.advertisement,
+            'other_costs': self.other_costs,
+            'car_costs': self.car_costs,
+            'total': self.total_expenses
+        }
+    
+    def to_financial_stats(self) -> Dict[str, Any]:
+        """Представление в формате get_financial_stats"""
+        return {
+            'rental_income': self.rental_income,
+            'sales_income': self.sales_income,
+            'total_income': self.total_income,
+            'expenses': self.expenses,
+            'net_profit': self.net_profit,
+            'profitability': self.profitability,
+            'total_rentals': self.total_rentals,
+            'total_cars': self.total_cars
+        }
+    
+    def to_expense_stats(self) -> Dict[str, Any]:
+        """Представление в формате get_expense_stats"""
+        return {
+            'expenses': self.expenses,
+            'maintenance_percent': self.expense_percent(self.maintenance),
+            'advertisement_percent': self.expense_percent(self.advertisement),
+            'other_costs_percent': self.expense_percent(self.other_costs),
+            'car_costs_percent': self.expense_percent(self.car_costs),
+            'expense_income_ratio': self.expense_income_ratio,
+            'total_income': self.total_income
+        }
+
+@dataclass(frozen=True)
+class CarProfile:
+    """Карточка автомобиля: поля cars и сводка по арендам и обслуживанию"""
+    car: Dict[str, Any]
+    maintenance_count: int = 0
+    maintenance_total: float = 0.0
+    last_maintenance_at: Optional[str] = None
+    rentals_30d: int = 0
+    income_30d: float = 0.0
+    last_rental_at: Optional[str] = None
+    # Часы простоя с последней аренды (None - аренд не было)
+    idle_hours: Optional[float] = None
+    # Последние аренды, с интервалом до предыдущей аренды в gap_hours
+    recent_rentals: Tuple[Dict[str, Any], ...] = ()
+    
+    @property
+    def investment(self) -> float:
+        """Вложения в автомобиль: покупка и обслуживание"""
+        return (self.car.get('purchase_price') or 0) + self.maintenance_total
+    
+    @property
+    def net_result(self) -> float:
+        """Доход от аренд и продажи за вычетом вложений"""
+        return (self.car.get('total_income') or 0) + (self.car.get('sale_price') or 0) - self.investment
+    
+    @property
+    def roi(self) -> Optional[float]:
+        """Окупаемость вложений, %; None, если вложений не было"""
+        return (self.net_result / self.investment * 100) if self.investment > 0 else None
+
+@instrumented(DB_QUERY_SECONDS)
 class Database:
-    def __init__(self, db_path="rentals.db"):
+    def __init__(self, db_path="rentals.db", pool_size: int = 5,
+                 cache_ttl: float = 30.0, cache_size: int = 256, read_only: bool = False):
         self.db_path = db_path
-        self.init_db()
+        self.read_only = read_only
+        self.pool = ConnectionPool(db_path, max_size=pool_size, read_only=read_only)
+        # Кэш чтения; cache_ttl=0 отключает кэширование
+        self.cache = QueryCache(ttl=cache_ttl, max_size=cache_size)
+        # Схему создает и мигрирует только экземпляр с правом записи
+        if not read_only:
+            self.init_db()
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Метрики кэша чтения (попадания, промахи, вытеснения)"""
+        return self.cache.get_stats()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений (открыто, переиспользовано, ожидания)"""
+        return self.pool.get_stats()
+    
+    def close(self):
+        """Закрытие всех соединений с базой данных"""
+        self.pool.close()
     
     def init_db(self):
         """Инициализация базы данных"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             # Таблица аренд
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS rentals (
@@ -78,14 +228,30 @@ class Database:
                 )
             ''')
             conn.commit()
+            
+            # Индексы и последующие изменения схемы
+            apply_migrations(conn)
+    
+    def get_schema_version(self) -> int:
+        """Получение текущей версии схемы базы данных"""
+        with self.pool.connection() as conn:
+            return get_schema_version(conn)
+    
+    def get_data_version(self) -> int:
+        """
+        Версия данных: меняется при любой записи в аренды, автомобили и расходы.
+        Не кэшируется, чтобы видеть и изменения из других процессов.
+        """
+        with self.pool.connection() as conn:
+            return get_data_version(conn)
     
     # === МЕТОДЫ ДЛЯ АРЕНД ===
     
+    @invalidates(RENTALS, CARS)
     def add_rental(self, rental_data: Dict[str, Any]) -> bool:
         """Добавление записи об аренде с автоматическим созданием автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Приводим license_plate к верхнему регистру
@@ -106,10 +272,10 @@ class Database:
                         rental_data['transport'],
                         license_plate,
                         0,  # Цена покупки неизвестна
-                        datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                        db_now()
                     ))
                     car_id = cursor.lastrowid
-                    print(f"Создан новый автомобиль: {rental_data['transport']} ({license_plate})")
+                    logger.info("Создан новый автомобиль: %s (%s)", rental_data['transport'], license_plate)
                 
                 # Обновляем статистику автомобиля
                 cursor.execute('''
@@ -136,18 +302,158 @@ class Database:
                 ))
                 
                 conn.commit()
-                print(f"Аренда успешно сохранена: {rental_data['transport']} ({license_plate}) - ${rental_data['price']}")
+                rental_logger.info("Аренда успешно сохранена: %s (%s) - $%s", rental_data['transport'], license_plate,
+                                   rental_data['price'], extra={'plate': license_plate})
                 return True
                 
         except Exception as e:
-            print(f"Ошибка базы данных в add_rental: {e}")
+            logger.error("Ошибка базы данных в add_rental: %s", e)
             return False
-    
+
+    @invalidates(RENTALS, CARS)
+    def add_rentals(self, rentals_data: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Пакетное добавление аренд в одной транзакции.
+        Семантика та же, что у add_rental: недостающие автомобили создаются,
+        счетчики доходов и аренд обновляются. Транзакция фиксируется с
+        synchronous=FULL, поэтому после возврата записи гарантированно на диске.
+        При ошибке пакет откатывается и записи сохраняются по одной,
+        чтобы результат был известен для каждой аренды отдельно.
+        """
+        if not rentals_data:
+            return []
+
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('PRAGMA synchronous=FULL')
+                try:
+                    with conn:
+                        created = self._insert_rentals(conn, rentals_data)
+                finally:
+                    conn.execute('PRAGMA synchronous=NORMAL')
+
+            if created:
+                logger.info("Создано новых автомобилей: %s", created)
+            rental_logger.info("Пакет аренд успешно сохранен: %s шт.", len(rentals_data),
+                               extra={'count': len(rentals_data)})
+            return [True] * len(rentals_data)
+
+        except Exception as e:
+            logger.error("Ошибка базы данных в add_rentals: %s. Сохраняем аренды по одной", e)
+            return self._add_rentals_one_by_one(rentals_data)
+
+    def _add_rentals_one_by_one(self, rentals_data: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Повторное сохранение пакета по одной аренде через add_rental.
+        Все вызовы идут через одно соединение с synchronous=FULL, поэтому
+        каждая сохраненная аренда, как и пакет, фиксируется на диске.
+        """
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('PRAGMA synchronous=FULL')
+                try:
+                    results = []
+                    for rental_data in rentals_data:
+                        saved = self.add_rental(rental_data)
+                        if not saved:
+                            # Вложенное соединение пула не откатывает транзакцию само
+                            conn.rollback()
+                        results.append(saved)
+                    return results
+                finally:
+                    conn.execute('PRAGMA synchronous=NORMAL')
+        except Exception as e:
+            logger.error("Ошибка базы данных в add_rentals: %s", e)
+            return [False] * len(rentals_data)
+
+    def _insert_rentals(self, conn, rentals_data: List[Dict[str, Any]]) -> int:
+        """
+        Вставка пачки аренд через executemany в рамках текущей транзакции.
+        Необязательное поле created_at сохраняет исходную дату аренды.
+        Возвращает количество созданных автомобилей.
+        """
+        now = db_now()
+        rental_rows = []
+        new_cars = {}
+        car_totals = {}
+
+        for rental_data in rentals_data:
+            license_plate = rental_data['license_plate'].upper()
+            rental_rows.append((
+                rental_data['server'],
+                rental_data['character'],
+                rental_data['transport'],
+                license_plate,
+                rental_data['price'],
+                rental_data['duration'],
+                rental_data['renter'],
+                rental_data.get('created_at')
+            ))
+
+            # Название нового автомобиля берется из первой аренды, как в add_rental
+            new_cars.setdefault(license_plate, rental_data['transport'])
+            income, count = car_totals.get(license_plate, (0, 0))
+            car_totals[license_plate] = (income + rental_data['price'], count + 1)
+
+        cursor = conn.cursor()
+
+        # Создаем отсутствующие автомобили (цена покупки неизвестна)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO cars (name, license_plate, purchase_price, purchase_date)
+            VALUES (?, ?, 0, ?)
+        ''', [(name, license_plate, now) for license_plate, name in new_cars.items()])
+        created = cursor.rowcount
+
+        # Обновляем статистику автомобилей одним запросом на номер
+        cursor.executemany('''
+            UPDATE cars
+            SET total_income = total_income + ?,
+                total_rentals = total_rentals + ?,
+                status = 'rented'
+            WHERE license_plate = ?
+        ''', [(income, count, license_plate) for license_plate, (income, count) in car_totals.items()])
+
+        # Добавляем записи об арендах
+        cursor.executemany('''
+            INSERT INTO rentals
+            (server, character, transport, license_plate, price, duration, renter, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', rental_rows)
+
+        return created
+
+    @invalidates(RENTALS, CARS)
+    def import_rentals(self, messages: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Импорт пачки исторических аренд в одной транзакции.
+        messages - пары (хэш сообщения, данные аренды). Сообщения, хэш которых
+        уже есть в imported_messages, пропускаются, поэтому повторный импорт
+        того же файла не дублирует аренды. Ошибка откатывает всю пачку.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            new_rentals = []
+            for message_hash, rental_data in messages:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO imported_messages (message_hash) VALUES (?)',
+                    (message_hash,)
+                )
+                if cursor.rowcount:
+                    new_rentals.append(rental_data)
+
+            created = self._insert_rentals(conn, new_rentals) if new_rentals else 0
+
+        return {
+            'imported': len(new_rentals),
+            'duplicates': len(messages) - len(new_rentals),
+            'cars_created': created
+        }
+
+    @cached(RENTALS)
     def get_all_rentals(self) -> List[Dict[str, Any]]:
         """Получение всех записей об арендах"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM rentals ORDER BY created_at DESC
@@ -155,14 +461,14 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_all_rentals: {e}")
+            logger.error("Ошибка базы данных в get_all_rentals: %s", e)
             return []
     
+    @cached(RENTALS)
     def get_rentals_by_car(self, license_plate: str) -> List[Dict[str, Any]]:
         """Получение аренд по номеру автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM rentals 
@@ -172,123 +478,215 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_rentals_by_car: {e}")
+            logger.error("Ошибка базы данных в get_rentals_by_car: %s", e)
             return []
     
-    def get_rentals_count(self) -> int:
-        """Получение общего количества аренд"""
+    @cached(RENTALS)
+    def get_rentals_count(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Получение количества аренд (за период [start, end), если он задан)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT COUNT(*) FROM rentals')
+                if start is None and end is None:
+                    cursor.execute('SELECT COALESCE(SUM(count), 0) FROM stats_server')
+                else:
+                    where, params = range_condition('created_at', start, end)
+                    cursor.execute(f'SELECT COUNT(*) FROM rentals WHERE {where}', params)
                 return cursor.fetchone()[0]
         except Exception as e:
-            print(f"Ошибка базы данных в get_rentals_count: {e}")
+            logger.error("Ошибка базы данных в get_rentals_count: %s", e)
             return 0
     
     # === МЕТОДЫ ДЛЯ АВТОМОБИЛЕЙ ===
     
+    @invalidates(CARS)
     def add_car(self, name: str, license_plate: str, purchase_price: float = 0) -> bool:
         """Добавление автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO cars (name, license_plate, purchase_price, purchase_date)
                     VALUES (?, ?, ?, ?)
-                ''', (name, license_plate.upper(), purchase_price, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                ''', (name, license_plate.upper(), purchase_price, db_now()))
                 conn.commit()
-                print(f"Автомобиль добавлен: {name} ({license_plate})")
+                logger.info("Автомобиль добавлен: %s (%s)", name, license_plate, extra={'plate': license_plate})
                 return True
         except sqlite3.IntegrityError:
-            print(f"Автомобиль с номером {license_plate} уже существует")
+            logger.warning("Автомобиль с номером %s уже существует", license_plate, extra={'plate': license_plate})
             return False
         except Exception as e:
-            print(f"Ошибка базы данных в add_car: {e}")
+            logger.error("Ошибка базы данных в add_car: %s", e)
             return False
     
+    @cached(CARS)
     def get_car(self, license_plate: str) -> Optional[Dict[str, Any]]:
         """Получение автомобиля по номеру"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cars WHERE license_plate = ?', (license_plate.upper(),))
                 row = cursor.fetchone()
                 return dict(row) if row else None
         except Exception as e:
-            print(f"Ошибка базы данных в get_car: {e}")
+            logger.error("Ошибка базы данных в get_car: %s", e)
             return None
     
+    @cached(CARS)
     def get_car_by_id(self, car_id: int) -> Optional[Dict[str, Any]]:
         """Получение автомобиля по ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cars WHERE id = ?', (car_id,))
                 row = cursor.fetchone()
                 return dict(row) if row else None
         except Exception as e:
-            print(f"Ошибка базы данных в get_car_by_id: {e}")
+            logger.error("Ошибка базы данных в get_car_by_id: %s", e)
             return None
     
+    @cached(CARS, RENTALS, MAINTENANCE)
+    def get_car_profile(self, car_id: int, recent_limit: int = 5) -> Optional[CarProfile]:
+        """
+        Карточка автомобиля одним запросом: поля cars, сумма обслуживания (stats_car),
+        последние аренды, доход за 30 дней и простой с последней аренды.
+        Аренды читаются по индексу (license_plate, created_at): последние recent_limit + 1
+        строк для интервалов между арендами и диапазон за 30 дней, без полной истории.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    WITH car AS (
+                        SELECT * FROM cars WHERE id = :car_id
+                    ),
+                    latest AS (
+                        SELECT r.id, r.server, r.character, r.renter, r.price, r.duration, r.created_at
+                        FROM rentals r
+                        WHERE r.license_plate = (SELECT license_plate FROM car)
+                        ORDER BY r.created_at DESC
+                        LIMIT :limit + 1
+                    ),
+                    recent AS (
+                        SELECT * FROM (
+                            SELECT latest.*,
+                                   ROUND((julianday(created_at) -
+                                          julianday(LAG(created_at) OVER (ORDER BY created_at))) * 24, 1) AS gap_hours
+                            FROM latest
+                        )
+                        ORDER BY created_at DESC
+                        LIMIT :limit
+                    ),
+                    month AS (
+                        SELECT COUNT(*) AS rentals_30d, COALESCE(SUM(r.price), 0) AS income_30d
+                        FROM rentals r
+                        WHERE r.license_plate = (SELECT license_plate FROM car)
+                        AND r.created_at >= datetime('now', '-30 days')
+                    )
+                    SELECT
+                        car.*,
+                        COALESCE(s.maintenance_count, 0) AS profile_maintenance_count,
+                        COALESCE(s.maintenance_total, 0) AS profile_maintenance_total,
+                        (SELECT MAX(m.maintenance_date) FROM maintenance m
+                         WHERE m.car_id = car.id) AS profile_last_maintenance_at,
+                        month.rentals_30d AS profile_rentals_30d,
+                        month.income_30d AS profile_income_30d,
+                        (SELECT MAX(created_at) FROM latest) AS profile_last_rental_at,
+                        ROUND((julianday('now') - julianday((SELECT MAX(created_at) FROM latest))) * 24, 1)
+                            AS profile_idle_hours,
+                        (SELECT json_group_array(json_object(
+                            'id', id, 'server', server, 'character', character, 'renter', renter,
+                            'price', price, 'duration', duration, 'created_at', created_at,
+                            'gap_hours', gap_hours
+                        )) FROM recent) AS profile_recent_rentals
+                    FROM car
+                    LEFT JOIN stats_car s ON s.car_id = car.id
+                    CROSS JOIN month
+                ''', {'car_id': car_id, 'limit': recent_limit})
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                
+                data = dict(row)
+                profile = {
+                    key[len('profile_'):]: data.pop(key)
+                    for key in list(data) if key.startswith('profile_')
+                }
+                profile['recent_rentals'] = tuple(json.loads(profile['recent_rentals']))
+                return CarProfile(car=data, **profile)
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_car_profile: %s", e)
+            return None
+    
+    @cached(CARS)
     def get_all_cars(self) -> List[Dict[str, Any]]:
         """Получение всех автомобилей"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cars ORDER BY created_at DESC')
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_all_cars: {e}")
+            logger.error("Ошибка базы данных в get_all_cars: %s", e)
             return []
     
+    @cached(CARS)
+    def get_cars_page(self, cursor: Optional[str] = None, direction: str = NEXT,
+                      per_page: int = 5) -> Dict[str, Any]:
+        """Страница списка автомобилей (keyset-пагинация)"""
+        try:
+            with self.pool.connection() as conn:
+                return fetch_page(conn, 'SELECT c.* FROM cars c', 'c',
+                                  cursor=cursor, direction=direction, per_page=per_page)
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_cars_page: %s", e)
+            return empty_page()
+    
+    @cached(CARS)
     def get_available_cars(self) -> List[Dict[str, Any]]:
         """Получение доступных автомобилей"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cars WHERE status = "available" ORDER BY created_at DESC')
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_available_cars: {e}")
+            logger.error("Ошибка базы данных в get_available_cars: %s", e)
             return []
     
+    @cached(CARS)
     def get_rented_cars(self) -> List[Dict[str, Any]]:
         """Получение арендованных автомобилей"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cars WHERE status = "rented" ORDER BY created_at DESC')
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_rented_cars: {e}")
+            logger.error("Ошибка базы данных в get_rented_cars: %s", e)
             return []
     
+    @cached(CARS)
     def get_sold_cars(self) -> List[Dict[str, Any]]:
         """Получение проданных автомобилей"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cars WHERE status = "sold" ORDER BY created_at DESC')
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_sold_cars: {e}")
+            logger.error("Ошибка базы данных в get_sold_cars: %s", e)
             return []
     
+    @invalidates(CARS)
     def update_car_status(self, license_plate: str, status: str) -> bool:
         """Обновление статуса автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE cars SET status = ? WHERE license_plate = ?
@@ -296,13 +694,14 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в update_car_status: {e}")
+            logger.error("Ошибка базы данных в update_car_status: %s", e)
             return False
     
+    @invalidates(CARS)
     def update_car(self, license_plate: str, name: str = None, purchase_price: float = None) -> bool:
         """Обновление информации об автомобиле"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 updates = []
                 params = []
                 
@@ -322,28 +721,30 @@ class Database:
             
             return True
         except Exception as e:
-            print(f"Ошибка базы данных в update_car: {e}")
+            logger.error("Ошибка базы данных в update_car: %s", e)
             return False
     
+    @invalidates(CARS)
     def sell_car(self, license_plate: str, sale_price: float) -> bool:
         """Продажа автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE cars SET status = 'sold', sale_price = ?, sale_date = ?
                     WHERE license_plate = ?
-                ''', (sale_price, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), license_plate.upper()))
+                ''', (sale_price, db_now(), license_plate.upper()))
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в sell_car: {e}")
+            logger.error("Ошибка базы данных в sell_car: %s", e)
             return False
     
+    @invalidates(CARS, MAINTENANCE)
     def delete_car(self, license_plate: str) -> bool:
         """Удаление автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Сначала удаляем связанные записи обслуживания
@@ -356,24 +757,26 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в delete_car: {e}")
+            logger.error("Ошибка базы данных в delete_car: %s", e)
             return False
     
+    @cached(CARS)
     def get_cars_count(self) -> int:
         """Получение общего количества автомобилей"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT COUNT(*) FROM cars')
                 return cursor.fetchone()[0]
         except Exception as e:
-            print(f"Ошибка базы данных в get_cars_count: {e}")
+            logger.error("Ошибка базы данных в get_cars_count: %s", e)
             return 0
     
+    @cached(CARS)
     def get_cars_stats(self) -> Dict[str, Any]:
         """Получение статистики по автомобилям"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Общее количество автомобилей
@@ -399,31 +802,54 @@ class Database:
                     'total_rentals': total_rentals
                 }
         except Exception as e:
-            print(f"Ошибка базы данных в get_cars_stats: {e}")
+            logger.error("Ошибка базы данных в get_cars_stats: %s", e)
             return {}
     
+    # === ПОИСК ===
+    
+    def search(self, query: str, limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Поиск автомобилей по названию и номеру, аренд - по арендатору, персонажу и транспорту.
+        Не кэшируется: inline-запросы приходят на каждый введенный символ и вытесняли бы
+        из кэша результаты остальных запросов, а поиск по индексу и так занимает миллисекунды.
+        """
+        query = query.strip()
+        if not query:
+            return {'cars': [], 'rentals': []}
+        
+        try:
+            with self.pool.connection() as conn:
+                return {
+                    'cars': search_cars(conn, query, limit),
+                    'rentals': search_rentals(conn, query, limit)
+                }
+        except Exception as e:
+            logger.error("Ошибка базы данных в search: %s", e)
+            return {'cars': [], 'rentals': []}
+    
     # === МЕТОДЫ ДЛЯ ОБСЛУЖИВАНИЯ ===
     
+    @invalidates(MAINTENANCE)
     def add_maintenance(self, car_id: int, amount: float, description: str) -> bool:
         """Добавление записи об обслуживании"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO maintenance (car_id, amount, description, maintenance_date)
                     VALUES (?, ?, ?, ?)
-                ''', (car_id, amount, description, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                ''', (car_id, amount, description, db_now()))
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в add_maintenance: {e}")
+            logger.error("Ошибка базы данных в add_maintenance: %s", e)
             return False
     
+    @cached(MAINTENANCE)
     def get_car_maintenance(self, car_id: int) -> List[Dict[str, Any]]:
         """Получение истории обслуживания автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM maintenance 
@@ -433,14 +859,14 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_car_maintenance: {e}")
+            logger.error("Ошибка базы данных в get_car_maintenance: %s", e)
             return []
     
+    @cached(MAINTENANCE, CARS)
     def get_all_maintenance(self) -> List[Dict[str, Any]]:
         """Получение всей истории обслуживания"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT m.*, c.name as car_name, c.license_plate 
@@ -451,26 +877,77 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_all_maintenance: {e}")
+            logger.error("Ошибка базы данных в get_all_maintenance: %s", e)
             return []
     
+    @cached(MAINTENANCE, CARS)
+    def get_maintenance_page(self, cursor: Optional[str] = None, direction: str = NEXT,
+                             per_page: int = 5) -> Dict[str, Any]:
+        """Страница истории обслуживания (keyset-пагинация)"""
+        try:
+            with self.pool.connection() as conn:
+                return fetch_page(conn, '''
+                    SELECT m.*, c.name as car_name, c.license_plate
+                    FROM maintenance m
+                    JOIN cars c ON m.car_id = c.id
+                ''', 'm', cursor=cursor, direction=direction, per_page=per_page)
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_maintenance_page: %s", e)
+            return empty_page()
+    
+    @cached(MAINTENANCE)
     def get_maintenance_total(self) -> float:
         """Получение общей суммы расходов на обслуживание"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT SUM(amount) FROM maintenance')
+                cursor.execute('SELECT SUM(amount) FROM stats_expenses WHERE category = ?', ('maintenance',))
                 result = cursor.fetchone()[0]
                 return result if result else 0.0
         except Exception as e:
-            print(f"Ошибка базы данных в get_maintenance_total: {e}")
+            logger.error("Ошибка базы данных в get_maintenance_total: %s", e)
             return 0.0
     
+    @cached(MAINTENANCE)
+    def get_maintenance_count(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Получение количества записей об обслуживании (за период, если он задан)"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                where, params = range_condition('maintenance_date', start, end)
+                cursor.execute(f'SELECT COUNT(*) FROM maintenance WHERE {where}', params)
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_maintenance_count: %s", e)
+            return 0
+    
+    @cached(MAINTENANCE, CARS)
+    def get_recent_maintenance(self, limit: int = 10, start: Optional[str] = None,
+                               end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Получение последних записей об обслуживании (за период, если он задан)"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                where, params = range_condition('m.maintenance_date', start, end)
+                cursor.execute(f'''
+                    SELECT m.*, c.name as car_name, c.license_plate
+                    FROM maintenance m
+                    JOIN cars c ON m.car_id = c.id
+                    WHERE {where}
+                    ORDER BY m.maintenance_date DESC
+                    LIMIT ?
+                ''', (*params, limit))
+                rows = cursor.fetchall()
+                return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_recent_maintenance: %s", e)
+            return []
+    
+    @cached(MAINTENANCE, CARS)
     def get_maintenance_by_car(self, car_id: int) -> List[Dict[str, Any]]:
         """Получение обслуживания по ID автомобиля"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT m.*, c.name as car_name, c.license_plate 
@@ -482,31 +959,32 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_maintenance_by_car: {e}")
+            logger.error("Ошибка базы данных в get_maintenance_by_car: %s", e)
             return []
     
     # === МЕТОДЫ ДЛЯ РАСХОДОВ НА РЕКЛАМУ ===
     
+    @invalidates(ADVERTISEMENT)
     def add_advertisement_cost(self, amount: float, description: str) -> bool:
         """Добавление расхода на рекламу"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO advertisement_costs (amount, description, advertisement_date)
                     VALUES (?, ?, ?)
-                ''', (amount, description, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                ''', (amount, description, db_now()))
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в add_advertisement_cost: {e}")
+            logger.error("Ошибка базы данных в add_advertisement_cost: %s", e)
             return False
     
+    @cached(ADVERTISEMENT)
     def get_all_advertisement_costs(self) -> List[Dict[str, Any]]:
         """Получение всех расходов на рекламу"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM advertisement_costs 
@@ -515,55 +993,70 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_all_advertisement_costs: {e}")
+            logger.error("Ошибка базы данных в get_all_advertisement_costs: %s", e)
             return []
     
+    @cached(ADVERTISEMENT)
+    def get_advertisement_costs_page(self, cursor: Optional[str] = None, direction: str = NEXT,
+                                     per_page: int = 5) -> Dict[str, Any]:
+        """Страница расходов на рекламу (keyset-пагинация)"""
+        try:
+            with self.pool.connection() as conn:
+                return fetch_page(conn, 'SELECT a.* FROM advertisement_costs a', 'a',
+                                  cursor=cursor, direction=direction, per_page=per_page)
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_advertisement_costs_page: %s", e)
+            return empty_page()
+    
+    @cached(ADVERTISEMENT)
     def get_advertisement_costs_total(self) -> float:
         """Получение общей суммы расходов на рекламу"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT SUM(amount) FROM advertisement_costs')
+                cursor.execute('SELECT SUM(amount) FROM stats_expenses WHERE category = ?', ('advertisement',))
                 result = cursor.fetchone()[0]
                 return result if result else 0.0
         except Exception as e:
-            print(f"Ошибка базы данных в get_advertisement_costs_total: {e}")
+            logger.error("Ошибка базы данных в get_advertisement_costs_total: %s", e)
             return 0.0
     
+    @invalidates(ADVERTISEMENT)
     def delete_advertisement_cost(self, cost_id: int) -> bool:
         """Удаление расхода на рекламу"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM advertisement_costs WHERE id = ?', (cost_id,))
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в delete_advertisement_cost: {e}")
+            logger.error("Ошибка базы данных в delete_advertisement_cost: %s", e)
             return False
     
     # === МЕТОДЫ ДЛЯ ПРОЧИХ РАСХОДОВ ===
     
+    @invalidates(OTHER_COSTS)
     def add_other_cost(self, amount: float, description: str) -> bool:
         """Добавление прочего расхода"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO other_costs (amount, description, cost_date)
                     VALUES (?, ?, ?)
-                ''', (amount, description, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                ''', (amount, description, db_now()))
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в add_other_cost: {e}")
+            logger.error("Ошибка базы данных в add_other_cost: %s", e)
             return False
     
+    @cached(OTHER_COSTS)
     def get_all_other_costs(self) -> List[Dict[str, Any]]:
         """Получение всех прочих расходов"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM other_costs 
@@ -572,69 +1065,86 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_all_other_costs: {e}")
+            logger.error("Ошибка базы данных в get_all_other_costs: %s", e)
             return []
     
+    @cached(OTHER_COSTS)
+    def get_other_costs_page(self, cursor: Optional[str] = None, direction: str = NEXT,
+                             per_page: int = 5) -> Dict[str, Any]:
+        """Страница прочих расходов (keyset-пагинация)"""
+        try:
+            with self.pool.connection() as conn:
+                return fetch_page(conn, 'SELECT o.* FROM other_costs o', 'o',
+                                  cursor=cursor, direction=direction, per_page=per_page)
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_other_costs_page: %s", e)
+            return empty_page()
+    
+    @cached(OTHER_COSTS)
     def get_other_costs_total(self) -> float:
         """Получение общей суммы прочих расходов"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT SUM(amount) FROM other_costs')
+                cursor.execute('SELECT SUM(amount) FROM stats_expenses WHERE category = ?', ('other_costs',))
                 result = cursor.fetchone()[0]
                 return result if result else 0.0
         except Exception as e:
-            print(f"Ошибка базы данных в get_other_costs_total: {e}")
+            logger.error("Ошибка базы данных в get_other_costs_total: %s", e)
             return 0.0
     
+    @invalidates(OTHER_COSTS)
     def delete_other_cost(self, cost_id: int) -> bool:
         """Удаление прочего расхода"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM other_costs WHERE id = ?', (cost_id,))
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"Ошибка базы данных в delete_other_cost: {e}")
+            logger.error("Ошибка базы данных в delete_other_cost: %s", e)
             return False
     
     # === ФИНАНСОВЫЕ МЕТОДЫ ===
     
+    @cached(RENTALS)
     def get_total_income(self) -> float:
         """Получение общего дохода от аренд"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT SUM(price) FROM rentals')
+                cursor.execute('SELECT SUM(income) FROM stats_server')
                 result = cursor.fetchone()[0]
                 return result if result else 0.0
         except Exception as e:
-            print(f"Ошибка базы данных в get_total_income: {e}")
+            logger.error("Ошибка базы данных в get_total_income: %s", e)
             return 0.0
     
+    @cached(CARS)
     def get_total_car_costs(self) -> float:
         """Получение общей стоимости автомобилей"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT SUM(purchase_price) FROM cars')
                 result = cursor.fetchone()[0]
                 return result if result else 0.0
         except Exception as e:
-            print(f"Ошибка базы данных в get_total_car_costs: {e}")
+            logger.error("Ошибка базы данных в get_total_car_costs: %s", e)
             return 0.0
     
+    @cached(CARS)
     def get_total_sales_income(self) -> float:
         """Получение общего дохода от продаж"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT SUM(sale_price) FROM cars WHERE sale_price IS NOT NULL')
                 result = cursor.fetchone()[0]
                 return result if result else 0.0
         except Exception as e:
-            print(f"Ошибка базы данных в get_total_sales_income: {e}")
+            logger.error("Ошибка базы данных в get_total_sales_income: %s", e)
             return 0.0
     
     def get_total_expenses(self) -> Dict[str, float]:
@@ -655,7 +1165,7 @@ class Database:
                 'total': total_expenses
             }
         except Exception as e:
-            print(f"Ошибка базы данных в get_total_expenses: {e}")
+            logger.error("Ошибка базы данных в get_total_expenses: %s", e)
             return {
                 'maintenance': 0.0,
                 'advertisement': 0.0,
@@ -664,47 +1174,169 @@ class Database:
                 'total': 0.0
             }
     
+    @cached(*ALL_TAGS)
+    def get_financial_snapshot(self, start: Optional[str] = None,
+                               end: Optional[str] = None) -> FinancialSnapshot:
+        """
+        Получение всех финансовых показателей и расходов одним составным запросом.
+        Если задан период [start, end), доходы и расходы считаются только по его
+        строкам, а total_cars - весь автопарк. Доходы от аренд и расходы читаются
+        из сводных таблиц (временные ряды и stats_expenses); по исходным таблицам
+        считается только период, границы которого не выровнены по суткам.
+        """
+        try:
+            with self.pool.connection() as conn:
+                days = day_range(start, end)
+                if start is None and end is None:
+                    row = conn.execute(f'''
+                        WITH r AS (
+                            SELECT COALESCE(SUM(income), 0.0) AS rental_income,
+                                   COALESCE(SUM(count), 0) AS total_rentals
+                            FROM stats_server
+                        ),
+                        c AS (
+                            SELECT COALESCE(SUM(sale_price), 0.0) AS sales_income,
+                                   COALESCE(SUM(purchase_price), 0.0) AS car_costs,
+                                   COUNT(*) AS total_cars
+                            FROM cars
+                        ),
+                        e AS ({EXPENSES_BY_CATEGORY} FROM stats_expenses)
+                        SELECT * FROM r, c, e
+                    ''').fetchone()
+                elif days is not None:
+                    buckets, bucket_params = range_condition('bucket', *days)
+                    expense_days, expense_params = range_condition('day', *days)
+                    sales, sales_params = range_condition('sale_date', start, end)
+                    purchases, purchase_params = range_condition('purchase_date', start, end)
+                    row = conn.execute(f'''
+                        WITH r AS (
+                            SELECT COALESCE(SUM(income), 0.0) AS rental_income,
+                                   COALESCE(SUM(rentals), 0) AS total_rentals
+                            FROM rollups
+                            WHERE granularity = 'day' AND dimension = 'all' AND dim_key = '' AND {buckets}
+                        ),
+                        s AS (SELECT COALESCE(SUM(sale_price), 0.0) AS sales_income FROM cars WHERE {sales}),
+                        p AS (SELECT COALESCE(SUM(purchase_price), 0.0) AS car_costs FROM cars WHERE {purchases}),
+                        e AS ({EXPENSES_BY_CATEGORY} FROM stats_expenses WHERE {expense_days}),
+                        c AS (SELECT COUNT(*) AS total_cars FROM cars)
+                        SELECT * FROM r, s, p, e, c
+                    ''', bucket_params + sales_params + purchase_params + expense_params).fetchone()
+                else:
+                    conditions = [
+                        range_condition(column, start, end)
+                        for column in ('created_at', 'sale_date', 'purchase_date',
+                                       'maintenance_date', 'advertisement_date', 'cost_date')
+                    ]
+                    params = tuple(param for _, condition_params in conditions for param in condition_params)
+                    rentals, sales, purchases, maintenance, advertisement, other = (
+                        where for where, _ in conditions
+                    )
+                    row = conn.execute(f'''
+                        WITH r AS (
+                            SELECT COALESCE(SUM(price), 0.0) AS rental_income,
+                                   COUNT(*) AS total_rentals
+                            FROM rentals WHERE {rentals}
+                        ),
+                        s AS (SELECT COALESCE(SUM(sale_price), 0.0) AS sales_income FROM cars WHERE {sales}),
+                        p AS (SELECT COALESCE(SUM(purchase_price), 0.0) AS car_costs FROM cars WHERE {purchases}),
+                        m AS (SELECT COALESCE(SUM(amount), 0.0) AS maintenance FROM maintenance WHERE {maintenance}),
+                        a AS (SELECT COALESCE(SUM(amount), 0.0) AS advertisement FROM advertisement_costs
+                              WHERE {advertisement}),
+                        o AS (SELECT COALESCE(SUM(amount), 0.0) AS other_costs FROM other_costs WHERE {other}),
+                        c AS (SELECT COUNT(*) AS total_cars FROM cars)
+                        SELECT * FROM r, s, p, m, a, o, c
+                    ''', params).fetchone()
+                return FinancialSnapshot(
+                    rental_income=row['rental_income'],
+                    sales_income=row['sales_income'],
+                    maintenance=row['maintenance'],
+                    advertisement=row['advertisement'],
+                    other_costs=row['other_costs'],
+                    car_costs=row['car_costs'],
+                    total_rentals=row['total_rentals'],
+                    total_cars=row['total_cars']
+                )
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_financial_snapshot: %s", e)
+            return FinancialSnapshot()
+    
     def get_financial_stats(self) -> Dict[str, Any]:
         """Получение полной финансовой статистики"""
+        return self.get_financial_snapshot().to_financial_stats()
+    
+    # === ХРАНИЛИЩЕ СОСТОЯНИЙ FSM ===
+    
+    def get_fsm_record(self, key: str) -> Optional[Dict[str, Any]]:
+        """Состояние и данные диалога по ключу хранилища FSM"""
         try:
-            rental_income = self.get_total_income()
-            sales_income = self.get_total_sales_income()
-            expenses = self.get_total_expenses()
-            
-            total_income = rental_income + sales_income
-            total_expenses = expenses['total']
-            net_profit = total_income - total_expenses
-            
-            profitability = (net_profit / total_income * 100) if total_income > 0 else 0
-            
-            return {
-                'rental_income': rental_income,
-                'sales_income': sales_income,
-                'total_income': total_income,
-                'expenses': expenses,
-                'net_profit': net_profit,
-                'profitability': profitability,
-                'total_rentals': self.get_rentals_count(),
-                'total_cars': self.get_cars_count()
-            }
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT state, data, updated_at FROM fsm_states WHERE key = ?', (key,)
+                )
+                row = cursor.fetchone()
+                return dict(row) if row else None
         except Exception as e:
-            print(f"Ошибка базы данных в get_financial_stats: {e}")
-            return {}
+            logger.error("Ошибка базы данных в get_fsm_record: %s", e)
+            return None
+    
+    def save_fsm_records(self, records: List[Tuple[str, Optional[str], str, float]],
+                         deleted: List[str]) -> bool:
+        """
+        Пакетное сохранение состояний FSM одной транзакцией.
+        records - строки (key, state, data в JSON, updated_at), deleted - ключи завершенных диалогов.
+        """
+        try:
+            with self.pool.connection() as conn:
+                with conn:
+                    conn.executemany('''
+                        INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data,
+                                                       updated_at = excluded.updated_at
+                    ''', records)
+                    conn.executemany('DELETE FROM fsm_states WHERE key = ?', [(key,) for key in deleted])
+                return True
+        except Exception as e:
+            logger.error("Ошибка базы данных в save_fsm_records: %s", e)
+            return False
+    
+    def purge_fsm_records(self, updated_before: float) -> int:
+        """Удаление состояний FSM, не менявшихся с updated_before (unix time)"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM fsm_states WHERE updated_at < ?', (updated_before,))
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error("Ошибка базы данных в purge_fsm_records: %s", e)
+            return 0
     
     # === СТАТИСТИЧЕСКИЕ МЕТОДЫ ===
     
-    def get_server_stats(self) -> Dict[str, Dict[str, Any]]:
-        """Получение статистики по серверам"""
+    @cached(RENTALS)
+    def get_server_stats(self, start: Optional[str] = None,
+                         end: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Получение статистики по серверам (за период [start, end), если он задан)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT server, COUNT(*) as count, SUM(price) as income
-                    FROM rentals 
-                    GROUP BY server
-                    ORDER BY income DESC
-                ''')
+                if start is None and end is None:
+                    cursor.execute('''
+                        SELECT server, count, income
+                        FROM stats_server
+                        WHERE count > 0
+                        ORDER BY income DESC
+                    ''')
+                else:
+                    where, params = range_condition('created_at', start, end)
+                    cursor.execute(f'''
+                        SELECT server, COUNT(*) AS count, SUM(price) AS income
+                        FROM rentals
+                        WHERE {where}
+                        GROUP BY server
+                        ORDER BY income DESC
+                    ''', params)
                 rows = cursor.fetchall()
                 
                 stats = {}
@@ -715,21 +1347,32 @@ class Database:
                     }
                 return stats
         except Exception as e:
-            print(f"Ошибка базы данных в get_server_stats: {e}")
+            logger.error("Ошибка базы данных в get_server_stats: %s", e)
             return {}
     
-    def get_transport_stats(self) -> Dict[str, Dict[str, Any]]:
-        """Получение статистики по типам транспорта"""
+    @cached(RENTALS)
+    def get_transport_stats(self, start: Optional[str] = None,
+                            end: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Получение статистики по типам транспорта (за период [start, end), если он задан)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT transport, COUNT(*) as count, SUM(price) as income
-                    FROM rentals 
-                    GROUP BY transport
-                    ORDER BY income DESC
-                ''')
+                if start is None and end is None:
+                    cursor.execute('''
+                        SELECT transport, count, income
+                        FROM stats_transport
+                        WHERE count > 0
+                        ORDER BY income DESC
+                    ''')
+                else:
+                    where, params = range_condition('created_at', start, end)
+                    cursor.execute(f'''
+                        SELECT transport, COUNT(*) AS count, SUM(price) AS income
+                        FROM rentals
+                        WHERE {where}
+                        GROUP BY transport
+                        ORDER BY income DESC
+                    ''', params)
                 rows = cursor.fetchall()
                 
                 stats = {}
@@ -740,31 +1383,102 @@ class Database:
                     }
                 return stats
         except Exception as e:
-            print(f"Ошибка базы данных в get_transport_stats: {e}")
+            logger.error("Ошибка базы данных в get_transport_stats: %s", e)
             return {}
     
-    def get_recent_rentals(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Получение последних аренд"""
+    @invalidates(*ALL_TAGS)
+    def verify_aggregates(self, repair: bool = False) -> Dict[str, Any]:
+        """
+        Проверка сводных таблиц статистики на расхождение с исходными данными.
+        При repair=True сводные таблицы пересчитываются заново.
+        """
+        try:
+            with self.pool.connection() as conn:
+                drift = check_aggregates(conn) + check_rollups(conn)
+                if drift:
+                    logger.warning("Обнаружено расхождений в сводных таблицах: %s", len(drift))
+                    if repair:
+                        rebuild_aggregates(conn)
+                        rebuild_rollups(conn)
+                        conn.commit()
+                        logger.info("Сводные таблицы пересчитаны")
+                return {
+                    'drift': drift,
+                    'repaired': bool(drift) and repair
+                }
+        except Exception as e:
+            logger.error("Ошибка базы данных в verify_aggregates: %s", e)
+            return {'drift': [], 'repaired': False, 'error': str(e)}
+    
+    @cached(*ALL_TAGS)
+    def get_rollup_series(self, granularity: str = 'day', dimension: str = 'all', key: str = '',
+                          start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Временной ряд аренд, доходов и расходов по корзинам granularity (hour, day, month)
+        за период [start, end) без пропусков: корзины без операций заполняются нулями.
+        dimension - срез ряда (all, server, car), key - сервер или номер автомобиля.
+        Без start ряд начинается с первой корзины с данными, без end - заканчивается текущей.
+        """
+        if granularity not in BUCKET_FORMATS or dimension not in DIMENSIONS:
+            raise ValueError(f"Неизвестный ряд: {granularity}/{dimension}")
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
+                if start is None:
+                    cursor.execute('''
+                        SELECT MIN(bucket) FROM rollups
+                        WHERE granularity = ? AND dimension = ? AND dim_key = ?
+                    ''', (granularity, dimension, key))
+                    first = cursor.fetchone()[0]
+                    if first is None:
+                        return []
+                    start = bucket_start(first, granularity)
+                if end is None:
+                    # Корзины строятся по датам UTC (CURRENT_TIMESTAMP и db_now())
+                    end = db_now()
+                
+                buckets = list(iter_buckets(granularity, start, end))
+                if not buckets:
+                    return []
+                
+                # Диапазон по первичному ключу (granularity, dimension, dim_key, bucket)
                 cursor.execute('''
+                    SELECT bucket, rentals, income, expenses FROM rollups
+                    WHERE granularity = ? AND dimension = ? AND dim_key = ?
+                    AND bucket BETWEEN ? AND ?
+                ''', (granularity, dimension, key, buckets[0], buckets[-1]))
+                rows = {row['bucket']: dict(row) for row in cursor.fetchall()}
+                return dense_series(rows, buckets)
+        except Exception as e:
+            logger.error("Ошибка базы данных в get_rollup_series: %s", e)
+            return []
+    
+    @cached(RENTALS)
+    def get_recent_rentals(self, limit: int = 10, start: Optional[str] = None,
+                           end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Получение последних аренд (за период [start, end), если он задан)"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                where, params = range_condition('created_at', start, end)
+                cursor.execute(f'''
                     SELECT * FROM rentals 
+                    WHERE {where}
                     ORDER BY created_at DESC 
                     LIMIT ?
-                ''', (limit,))
+                ''', (*params, limit))
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_recent_rentals: {e}")
+            logger.error("Ошибка базы данных в get_recent_rentals: %s", e)
             return []
     
+    @cached(CARS)
     def get_top_cars_by_income(self, limit: int = 5) -> List[Dict[str, Any]]:
         """Получение топ автомобилей по доходу"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM cars 
@@ -774,39 +1488,9 @@ class Database:
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
-            print(f"Ошибка базы данных в get_top_cars_by_income: {e}")
+            logger.error("Ошибка базы данных в get_top_cars_by_income: %s", e)
             return []
     
     def get_expense_stats(self) -> Dict[str, Any]:
         """Получение статистики по расходам"""
-        try:
-            expenses = self.get_total_expenses()
-            total_income = self.get_total_income() + self.get_total_sales_income()
-            
-            # Расчет процентов от общих расходов
-            if expenses['total'] > 0:
-                maintenance_percent = (expenses['maintenance'] / expenses['total']) * 100
-                advertisement_percent = (expenses['advertisement'] / expenses['total']) * 100
-                other_costs_percent = (expenses['other_costs'] / expenses['total']) * 100
-                car_costs_percent = (expenses['car_costs'] / expenses['total']) * 100
-            else:
-                maintenance_percent = advertisement_percent = other_costs_percent = car_costs_percent = 0
-            
-            # Процент расходов от доходов
-            expense_income_ratio = (expenses['total'] / total_income * 100) if total_income > 0 else 0
-            
-            return {
-                'expenses': expenses,
-                'maintenance_percent': maintenance_percent,
-                'advertisement_percent': advertisement_percent,
-                'other_costs_percent': other_costs_percent,
-                'car_costs_percent': car_costs_percent,
-                'expense_income_ratio': expense_income_ratio,
-                'total_income': total_income
-            }
-        except Exception as e:
-            print(f"Ошибка базы данных в get_expense_stats: {e}")
-            return {}
-
-# Глобальный экземпляр базы данных
-db = Database()
\ No newline at end of file
+        return self.get_financial_snapshot().to_expense_stats()
\ No newline at end of file
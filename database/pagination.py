@@ -0,0 +1,64 @@
+import sqlite3
+from typing import Any, Dict, Optional, Tuple
+
+# Разделитель между датой создания и id внутри курсора
+CURSOR_SEPARATOR = '|'
+
+NEXT = 'n'
+PREV = 'p'
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Курсор строки: позиция в порядке (created_at, id)"""
+    return f"{row['created_at']}{CURSOR_SEPARATOR}{row['id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Разбор курсора обратно в (created_at, id)"""
+    created_at, _, row_id = cursor.rpartition(CURSOR_SEPARATOR)
+    return created_at, int(row_id)
+
+
+def fetch_page(conn: sqlite3.Connection, query: str, alias: str, params: tuple = (),
+               cursor: Optional[str] = None, direction: str = NEXT,
+               per_page: int = 5) -> Dict[str, Any]:
+    """
+    Keyset-пагинация по (created_at, id) от новых записей к старым.
+    query - SELECT без WHERE/ORDER BY/LIMIT, alias - псевдоним таблицы с ключом.
+    Курсор указывает на крайнюю запись соседней страницы, поэтому стоимость
+    запроса не зависит от номера страницы. Возвращает одну страницу и флаги навигации.
+    """
+    key = f'({alias}.created_at, {alias}.id)'
+    where = ''
+    args = list(params)
+
+    if cursor is not None:
+        where = f'WHERE {key} {"<" if direction == NEXT else ">"} (?, ?)'
+        args.extend(decode_cursor(cursor))
+
+    order = 'DESC' if direction == NEXT else 'ASC'
+    rows = conn.execute(
+        f'{query} {where} ORDER BY {alias}.created_at {order}, {alias}.id {order} LIMIT ?',
+        (*args, per_page + 1)
+    ).fetchall()
+
+    more = len(rows) > per_page
+    items = [dict(row) for row in rows[:per_page]]
+
+    if direction == NEXT:
+        has_next, has_prev = more, cursor is not None
+    else:
+        items.reverse()
+        has_next, has_prev = True, more
+
+    return {
+        'items': items,
+        'has_next': has_next and bool(items),
+        'has_prev': has_prev and bool(items),
+        'next_cursor': encode_cursor(items[-1]) if has_next and items else None,
+        'prev_cursor': encode_cursor(items[0]) if has_prev and items else None
+    }
+
+
+def empty_page() -> Dict[str, Any]:
+    return {'items': [], 'has_next': False, 'has_prev': False, 'next_cursor': None, 'prev_cursor': None}
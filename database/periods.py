@@ -0,0 +1,38 @@
+from typing import Optional, Tuple
+
+
+def range_condition(column: str, start: Optional[str] = None,
+                    end: Optional[str] = None) -> Tuple[str, tuple]:
+    """
+    Условие WHERE для полуинтервала [start, end) по колонке с датой.
+    Колонка сравнивается без функций вроде date(), поэтому SQLite
+    использует индекс по ней и читает только строки периода.
+    Без границ возвращает условие, истинное для всех строк.
+    """
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append(f'{column} >= ?')
+        params.append(start)
+    if end is not None:
+        conditions.append(f'{column} < ?')
+        params.append(end)
+    return ' AND '.join(conditions) or '1', tuple(params)
+
+
+def day_range(start: Optional[str] = None,
+              end: Optional[str] = None) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """
+    Границы [start, end) в виде дат 'ГГГГ-ММ-ДД', если каждая заданная граница
+    приходится на начало суток. Такой период считается по дневным сводным
+    таблицам; для остальных возвращается None.
+    """
+    days = []
+    for value in (start, end):
+        if value is None:
+            days.append(None)
+        elif len(value) == 19 and value.endswith(' 00:00:00'):
+            days.append(value[:10])
+        else:
+            return None
+    return days[0], days[1]
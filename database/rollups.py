@@ -0,0 +1,226 @@
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from database.aggregates import check_aggregates, rebuild_aggregates
+
+# Временные ряды доходов, аренд и расходов с разбивкой по часам, дням и месяцам.
+# Как и сводные таблицы статистики, ведутся триггерами в транзакции записи,
+# поэтому ряд за период читается диапазоном первичного ключа, без GROUP BY по арендам.
+#
+# Корзина (bucket) - начало интервала в формате BUCKET_FORMATS, срез (dimension):
+#   all       - итог, dim_key = ''
+#   server    - по серверу аренды
+#   car       - по номеру автомобиля (аренды и обслуживание)
+BUCKET_FORMATS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+    'month': '%Y-%m'
+}
+
+DIMENSIONS = ('all', 'server', 'car')
+
+TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS rollups (
+        granularity TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        dim_key TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        rentals INTEGER NOT NULL DEFAULT 0,
+        income REAL NOT NULL DEFAULT 0,
+        expenses REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, dimension, dim_key, bucket)
+    ) WITHOUT ROWID
+    ''',
+]
+
+# Номер автомобиля для записи обслуживания
+_MAINTENANCE_PLATE = "COALESCE((SELECT license_plate FROM cars WHERE id = {row}.car_id), '')"
+
+
+def _bucket(granularity: str, column: str) -> str:
+    """SQL-выражение корзины для колонки с датой"""
+    return f"strftime('{BUCKET_FORMATS[granularity]}', {column})"
+
+
+def _targets(row: str, timestamp: str, dimensions: Dict[str, str]) -> str:
+    """Строки VALUES (granularity, dimension, dim_key, bucket) для всех гранулярностей"""
+    return ',\n            '.join(
+        f"('{granularity}', '{dimension}', {key.format(row=row)}, {_bucket(granularity, f'{row}.{timestamp}')})"
+        for granularity in BUCKET_FORMATS
+        for dimension, key in dimensions.items()
+    )
+
+
+def _triggers(table: str, timestamp: str, dimensions: Dict[str, str],
+              values: str, old_values: str, updates: str) -> List[str]:
+    """Триггеры вставки и удаления, обновляющие все затронутые корзины"""
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_rollups_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO rollups (granularity, dimension, dim_key, bucket, rentals, income, expenses)
+            SELECT column1, column2, column3, column4, {values} FROM (VALUES
+            {_targets('NEW', timestamp, dimensions)}
+            ) WHERE 1
+            ON CONFLICT(granularity, dimension, dim_key, bucket) DO UPDATE SET {updates};
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_rollups_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE rollups SET {old_values}
+            WHERE (granularity, dimension, dim_key, bucket) IN (VALUES
+            {_targets('OLD', timestamp, dimensions)}
+            );
+        END
+        ''',
+    ]
+
+
+_ALL = {'all': "''"}
+
+TRIGGERS = (
+    _triggers(
+        'rentals', 'created_at',
+        {'all': "''", 'server': '{row}.server', 'car': '{row}.license_plate'},
+        values='1, NEW.price, 0',
+        old_values='rentals = rentals - 1, income = income - OLD.price',
+        updates='rentals = rentals + excluded.rentals, income = income + excluded.income'
+    )
+    + _triggers(
+        'maintenance', 'maintenance_date',
+        {'all': "''", 'car': _MAINTENANCE_PLATE},
+        values='0, 0, NEW.amount',
+        old_values='expenses = expenses - OLD.amount',
+        updates='expenses = expenses + excluded.expenses'
+    )
+    + _triggers(
+        'advertisement_costs', 'advertisement_date', _ALL,
+        values='0, 0, NEW.amount',
+        old_values='expenses = expenses - OLD.amount',
+        updates='expenses = expenses + excluded.expenses'
+    )
+    + _triggers(
+        'other_costs', 'cost_date', _ALL,
+        values='0, 0, NEW.amount',
+        old_values='expenses = expenses - OLD.amount',
+        updates='expenses = expenses + excluded.expenses'
+    )
+)
+
+
+def _reference_query() -> str:
+    """Эталонный расчет rollups по исходным таблицам"""
+    parts = []
+    for granularity in BUCKET_FORMATS:
+        for dimension, key in (('all', "''"), ('server', 'server'), ('car', 'license_plate')):
+            parts.append(
+                f"SELECT '{granularity}' AS g, '{dimension}' AS d, {key} AS k, "
+                f"{_bucket(granularity, 'created_at')} AS b, COUNT(*) AS r, SUM(price) AS i, 0 AS e "
+                f"FROM rentals GROUP BY k, b"
+            )
+        for dimension, key in (('all', "''"), ('car', "COALESCE(c.license_plate, '')")):
+            parts.append(
+                f"SELECT '{granularity}', '{dimension}', {key} AS k, "
+                f"{_bucket(granularity, 'm.maintenance_date')} AS b, 0, 0, SUM(m.amount) "
+                f"FROM maintenance m LEFT JOIN cars c ON c.id = m.car_id GROUP BY k, b"
+            )
+        for table, column in (('advertisement_costs', 'advertisement_date'), ('other_costs', 'cost_date')):
+            parts.append(
+                f"SELECT '{granularity}', 'all', '', {_bucket(granularity, column)} AS b, 0, 0, SUM(amount) "
+                f"FROM {table} GROUP BY b"
+            )
+    union = '\n            UNION ALL '.join(parts)
+    return f'''
+        SELECT g, d, k, b, SUM(r), SUM(i), SUM(e)
+        FROM (
+            {union}
+        )
+        GROUP BY g, d, k, b
+    '''
+
+
+SOURCES = [
+    ('rollups', ('granularity', 'dimension', 'dim_key', 'bucket'), ['rentals', 'income', 'expenses'],
+     _reference_query()),
+]
+
+
+def create_rollups(conn: sqlite3.Connection):
+    """Создание таблицы временных рядов и триггеров с заполнением по текущим данным"""
+    for statement in TABLES + TRIGGERS:
+        conn.execute(statement)
+    rebuild_rollups(conn)
+
+
+def rebuild_rollups(conn: sqlite3.Connection):
+    """Полный пересчет временных рядов"""
+    rebuild_aggregates(conn, SOURCES)
+
+
+def check_rollups(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Сравнение временных рядов с эталонным расчетом"""
+    return check_aggregates(conn, SOURCES)
+
+
+# === ПЛОТНЫЕ РЯДЫ ===
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S')
+
+
+def _truncate(moment: datetime, granularity: str) -> datetime:
+    """Начало корзины, в которую попадает момент времени"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_bucket(moment: datetime, granularity: str) -> datetime:
+    if granularity == 'hour':
+        return moment + timedelta(hours=1)
+    if granularity == 'day':
+        return moment + timedelta(days=1)
+    if moment.month == 12:
+        return moment.replace(year=moment.year + 1, month=1)
+    return moment.replace(month=moment.month + 1)
+
+
+def iter_buckets(granularity: str, start: str, end: str) -> Iterator[str]:
+    """
+    Корзины, пересекающиеся с полуинтервалом [start, end).
+    Первая корзина может начинаться раньше start, если start не выровнен по ней.
+    """
+    bucket_format = BUCKET_FORMATS[granularity]
+    moment = _truncate(_parse_timestamp(start), granularity)
+    stop = _parse_timestamp(end)
+    while moment < stop:
+        yield moment.strftime(bucket_format)
+        moment = _next_bucket(moment, granularity)
+
+
+def bucket_start(bucket: str, granularity: str) -> str:
+    """Начало корзины в формате дат базы"""
+    if granularity == 'hour':
+        return f'{bucket}:00'
+    if granularity == 'day':
+        return f'{bucket} 00:00:00'
+    return f'{bucket}-01 00:00:00'
+
+
+def dense_series(rows: Dict[str, Dict[str, Any]], buckets: List[str]) -> List[Dict[str, Any]]:
+    """Ряд без пропусков: корзины без данных заполняются нулями"""
+    series = []
+    for bucket in buckets:
+        values = rows.get(bucket)
+        series.append({
+            'bucket': bucket,
+            'rentals': values['rentals'] if values else 0,
+            'income': values['income'] if values else 0.0,
+            'expenses': values['expenses'] if values else 0.0
+        })
+    return series
@@ -0,0 +1,148 @@
+import logging
+import sqlite3
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Полнотекстовый поиск по автомобилям и арендам на FTS5 с токенизатором trigram:
+# он находит любую подстроку от трех символов (часть номера, имени арендатора,
+# персонажа) без полного просмотра таблиц. Индексы - external content таблицы
+# поверх cars и rentals, синхронизируются триггерами в той же транзакции.
+# Если SQLite собран без FTS5, индексы не создаются, а поиск выполняется через LIKE.
+
+# Минимальная длина запроса для триграммного индекса; по более коротким
+# ищутся только автомобили - по префиксу номера или названия
+MIN_TRIGRAM_LENGTH = 3
+
+# Индекс -> (исходная таблица, индексируемые колонки)
+INDEXES = {
+    'search_cars': ('cars', ('name', 'license_plate')),
+    'search_rentals': ('rentals', ('renter', 'character', 'transport'))
+}
+
+
+def _index_statements(index: str, table: str, columns: tuple) -> List[str]:
+    names = ', '.join(columns)
+    new_values = ', '.join(f'NEW.{column}' for column in columns)
+    old_values = ', '.join(f'OLD.{column}' for column in columns)
+    return [
+        f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+            {names}, content='{table}', content_rowid='id', tokenize='trigram'
+        )
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {index} (rowid, {names}) VALUES (NEW.id, {new_values});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.id, {old_values});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE OF {names} ON {table}
+        BEGIN
+            INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO {index} (rowid, {names}) VALUES (NEW.id, {new_values});
+        END
+        ''',
+    ]
+
+
+def fts_available(conn: sqlite3.Connection) -> bool:
+    """Поддерживает ли SQLite FTS5 с токенизатором trigram (SQLite 3.34+)"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(value, tokenize='trigram')")
+        conn.execute('DROP TABLE temp.fts_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_search(conn: sqlite3.Connection):
+    """Создание поисковых индексов и триггеров с заполнением по текущим данным"""
+    if not fts_available(conn):
+        logger.warning("FTS5 недоступен, поиск будет выполняться без индекса")
+        return
+
+    for index, (table, columns) in INDEXES.items():
+        for statement in _index_statements(index, table, columns):
+            conn.execute(statement)
+        conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_cars'"
+    ).fetchone()
+    return row is not None
+
+
+def _match_expression(query: str) -> str:
+    """Запрос как одна фраза FTS5: кавычки экранируются, операторы не интерпретируются"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def _like_pattern(query: str, prefix: bool = False) -> str:
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%' if prefix else f'%{escaped}%'
+
+
+def search_cars(conn: sqlite3.Connection, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Автомобили, название или номер которых содержит query; точное совпадение номера - первым"""
+    exact = conn.execute('SELECT * FROM cars WHERE license_plate = ?', (query.upper(),)).fetchone()
+    cars = [dict(exact)] if exact else []
+
+    if len(query) >= MIN_TRIGRAM_LENGTH and has_search_index(conn):
+        # Сортировка по rowid (сначала новые) не требует ранжирования всех совпадений
+        rows = conn.execute('''
+            SELECT c.* FROM search_cars s
+            JOIN cars c ON c.id = s.rowid
+            WHERE search_cars MATCH ?
+            ORDER BY s.rowid DESC
+            LIMIT ?
+        ''', (_match_expression(query), limit))
+    else:
+        # Короткий запрос - префикс номера или названия
+        pattern = _like_pattern(query, prefix=len(query) < MIN_TRIGRAM_LENGTH)
+        rows = conn.execute('''
+            SELECT * FROM cars
+            WHERE license_plate LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\'
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (pattern, pattern, limit))
+
+    cars.extend(dict(row) for row in rows if not exact or row['id'] != exact['id'])
+    return cars[:limit]
+
+
+def search_rentals(conn: sqlite3.Connection, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Последние аренды, в которых арендатор, персонаж или транспорт содержит query"""
+    if len(query) < MIN_TRIGRAM_LENGTH:
+        # Короткому запросу соответствует большая часть аренд, а проверить
+        # его можно только полным просмотром таблицы
+        return []
+
+    if has_search_index(conn):
+        # Совпадения читаются из индекса в порядке rowid, поэтому LIMIT
+        # не требует сортировки всех найденных аренд
+        rows = conn.execute('''
+            SELECT r.* FROM search_rentals s
+            JOIN rentals r ON r.id = s.rowid
+            WHERE search_rentals MATCH ?
+            ORDER BY s.rowid DESC
+            LIMIT ?
+        ''', (_match_expression(query), limit))
+    else:
+        pattern = _like_pattern(query)
+        rows = conn.execute('''
+            SELECT * FROM rentals
+            WHERE renter LIKE ? ESCAPE '\\' OR character LIKE ? ESCAPE '\\' OR transport LIKE ? ESCAPE '\\'
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (pattern, pattern, pattern, limit))
+    return [dict(row) for row in rows]
@@ -0,0 +1,135 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.async_db import AsyncDatabase, async_db
+
+logger = logging.getLogger(__name__)
+
+
+class RentalWriteQueue:
+    """
+    Очередь отложенной записи аренд.
+    Собирает аренды в течение max_delay секунд или до max_batch штук,
+    сохраняет их одной транзакцией и только после фиксации на диске
+    сообщает каждому ожидающему обработчику результат его аренды.
+    В очереди не больше max_pending аренд: если запись отстает, submit() ждет
+    места. Если фоновая задача завершилась с ошибкой, все ожидающие аренды
+    получают исключение, а следующий submit() запускает задачу заново.
+    """
+
+    def __init__(self, database: AsyncDatabase, max_batch: int = 100, max_delay: float = 0.005,
+                 max_pending: int = 1000):
+        self.database = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max(max_batch, max_pending)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Статистика
+        self.batches = 0
+        self.items = 0
+        self.worker_failures = 0
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_pending)
+            # Фоновая задача обслуживает все чаты: контекст вызвавшего обработчика ей не передается
+            self._worker = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def submit(self, rental_data: Dict[str, Any]) -> bool:
+        """
+        Ставит аренду в очередь и ждет, пока она будет сохранена.
+        RuntimeError - фоновая задача записи завершилась с ошибкой
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rental_data, future))
+        # Пока ждали места в очереди, задача могла завершиться с ошибкой
+        self._ensure_worker()
+        return await future
+
+    async def _run(self):
+        batch: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    return
+
+                batch = [item]
+                if self._queue.empty() and self.max_delay > 0:
+                    await asyncio.sleep(self.max_delay)
+
+                stop = False
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    next_item = self._queue.get_nowait()
+                    if next_item is None:
+                        stop = True
+                        break
+                    batch.append(next_item)
+
+                await self._flush(batch)
+                batch = []
+                if stop:
+                    return
+        except BaseException as e:
+            self.worker_failures += 1
+            logger.error("Очередь записи аренд остановлена: %r", e)
+            self._fail_pending(batch, e)
+            raise
+
+    def _fail_pending(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]], error: BaseException):
+        """Ошибка для текущего пакета и всех аренд, ожидающих в очереди"""
+        pending = list(batch)
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                pending.append(item)
+
+        for _, future in pending:
+            if not future.done():
+                failure = RuntimeError("Очередь записи аренд остановлена")
+                failure.__cause__ = error
+                future.set_exception(failure)
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        """Сохранение пакета и выдача результатов ожидающим обработчикам"""
+        try:
+            results = await self.database.add_rentals([rental_data for rental_data, _ in batch])
+        except Exception as e:
+            logger.error("Ошибка при пакетном сохранении аренд: %s", e)
+            results = [False] * len(batch)
+
+        self.batches += 1
+        self.items += len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика очереди: пакеты, записи и средний размер пакета"""
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch': self.items / self.batches if self.batches else 0,
+            'pending': self._queue.qsize() if self._queue else 0,
+            'max_pending': self.max_pending,
+            'worker_failures': self.worker_failures
+        }
+
+    async def close(self):
+        """Сохраняет все оставшиеся аренды и останавливает очередь"""
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put(None)
+        await self._worker
+
+
+# Глобальная очередь записи аренд
+rental_queue = RentalWriteQueue(async_db)
@@ -1,19 +1,44 @@
+import asyncio
+from datetime import datetime
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, StateFilter
+from html import escape
+from aiogram.types import (
+    Message, CallbackQuery, InlineQuery, InlineQueryResultArticle, InputTextMessageContent,
+    BufferedInputFile, FSInputFile
+)
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from database.models import db
+from database.async_db import async_db
 from config.settings import settings
 from keyboards.admin_keyboards import *
-from utils.reporter import generate_html_report
+from utils.reporter import get_html_report
+from utils.periods import Period, ALL_TIME, resolve_period, parse_custom_period
+from utils.profiler import run_profile, profile_running
 
 router = Router()
 
+# Сколько результатов каждого типа выводится в поиске
+SEARCH_LIMIT = 10
+INLINE_SEARCH_LIMIT = 20
+
+# Длительность профилирования по умолчанию и максимальная, секунды; строк в таблице самых долгих вызовов
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+PROFILE_TOP = 15
+
+# Фоновые задачи профилирования (ссылки нужны, чтобы задачи не удалил сборщик мусора)
+profile_tasks = set()
+
 # Проверка прав администратора
 def is_admin(user_id: int) -> bool:
     return user_id in settings.ADMIN_IDS
 
+# Разбор callback пагинации вида "<prefix><направление>_<курсор>"
+def parse_page_callback(data: str, prefix: str):
+    direction, cursor = data[len(prefix):].split("_", 1)
+    return direction, cursor
+
 # States для FSM
 class CarStates(StatesGroup):
     waiting_for_car_name = State()
@@ -32,6 +57,9 @@ class ExpenseStates(StatesGroup):
     waiting_for_other_cost_amount = State()
     waiting_for_other_cost_description = State()
 
+class ReportStates(StatesGroup):
+    waiting_for_period = State()
+
 # === ОБРАБОТКА КОМАНД ===
 
 @router.message(Command("admin"))
@@ -48,6 +76,124 @@ async def admin_panel(message: Message):
         parse_mode="HTML"
     )
 
+async def send_profile(message: Message, seconds: int):
+    """Профилирование и отправка результатов администратору"""
+    try:
+        result = await run_profile(seconds, PROFILE_TOP)
+    except RuntimeError as e:
+        await message.answer(f"❌ {e}")
+        return
+    
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    table = result.format_top() if result.top else "Вызовов методов базы и обработчиков не было."
+    await message.answer_document(
+        BufferedInputFile(result.collapsed.encode(), filename=f"profile_{stamp}.collapsed"),
+        caption=f"🔥 Стеки за {result.seconds:.0f} с ({result.samples} срезов) для flamegraph.pl или speedscope"
+    )
+    await message.answer_document(
+        BufferedInputFile(table.encode(), filename=f"profile_{stamp}_top.txt"),
+        caption=f"⏱️ Самые долгие методы базы и обработчики (топ {PROFILE_TOP})"
+    )
+
+@router.message(Command("profile"))
+async def profile_command(message: Message, command: CommandObject):
+    """Сэмплирующее профилирование работающего бота на N секунд"""
+    if not is_admin(message.from_user.id):
+        await message.reply("❌ У вас нет доступа к админ-панели.")
+        return
+    
+    args = (command.args or "").strip()
+    if args and not args.isdigit():
+        await message.reply("⏱️ Укажите длительность в секундах: <code>/profile 30</code>", parse_mode="HTML")
+        return
+    seconds = min(int(args or PROFILE_DEFAULT_SECONDS), PROFILE_MAX_SECONDS) or PROFILE_DEFAULT_SECONDS
+    
+    if profile_running():
+        await message.reply("❌ Профилирование уже выполняется.")
+        return
+    
+    await message.reply(f"🔬 Профилирование запущено на {seconds} с. Результаты придут файлами.")
+    # Обработка сообщений чата не ждет окончания профилирования
+    task = asyncio.create_task(send_profile(message, seconds))
+    profile_tasks.add(task)
+    task.add_done_callback(profile_tasks.discard)
+
+def format_search_rental(rental) -> str:
+    """Строка найденной аренды для сообщения"""
+    return (
+        f"📝 {escape(rental['renter'])} → {escape(rental['character'])}: "
+        f"{escape(rental['transport'])} ({escape(rental['license_plate'])}), "
+        f"${rental['price']:,.0f} • {rental['created_at'][:16]}"
+    )
+
+@router.message(Command("find"))
+async def find_command(message: Message, command: CommandObject):
+    """Поиск автомобилей и аренд"""
+    if not is_admin(message.from_user.id):
+        await message.reply("❌ У вас нет доступа к админ-панели.")
+        return
+    
+    query = (command.args or "").strip()
+    if not query:
+        await message.reply(
+            "🔍 Укажите запрос: <code>/find BMW</code>, <code>/find A123</code>, <code>/find Ivan</code>\n"
+            "Аренды ищутся по запросу от 3 символов.",
+            parse_mode="HTML"
+        )
+        return
+    
+    results = await async_db.search(query, SEARCH_LIMIT)
+    cars, rentals = results['cars'], results['rentals']
+    if not cars and not rentals:
+        await message.reply(f"🔍 По запросу «{escape(query)}» ничего не найдено.", parse_mode="HTML")
+        return
+    
+    response = f"🔍 <b>Результаты поиска:</b> {escape(query)}\n\n"
+    response += f"🚗 <b>Автомобили:</b> {len(cars)}\n"
+    if rentals:
+        response += f"\n📊 <b>Последние аренды:</b> {len(rentals)}\n"
+        response += "\n".join(format_search_rental(rental) for rental in rentals)
+    
+    await message.answer(
+        response,
+        reply_markup=get_search_results_keyboard(cars),
+        parse_mode="HTML"
+    )
+
+@router.inline_query()
+async def search_inline_query(inline_query: InlineQuery):
+    """Inline-поиск автомобилей и аренд (@бот запрос)"""
+    query = inline_query.query.strip()
+    if not is_admin(inline_query.from_user.id) or not query:
+        await inline_query.answer([], cache_time=5, is_personal=True)
+        return
+    
+    results = await async_db.search(query, INLINE_SEARCH_LIMIT)
+    articles = []
+    for car in results['cars']:
+        articles.append(InlineQueryResultArticle(
+            id=f"car_{car['id']}",
+            title=f"🚗 {car['name']} ({car['license_plate']})",
+            description=f"Статус: {car['status']} • Аренд: {car.get('total_rentals', 0)} • Доход: ${car.get('total_income', 0):,.0f}",
+            input_message_content=InputTextMessageContent(
+                message_text=f"🚗 {car['name']} ({car['license_plate']})\n"
+                             f"📊 Статус: {car['status']}\n"
+                             f"📈 Доход от аренд: ${car.get('total_income', 0):,.2f}"
+            )
+        ))
+    for rental in results['rentals']:
+        articles.append(InlineQueryResultArticle(
+            id=f"rental_{rental['id']}",
+            title=f"📝 {rental['renter']} → {rental['character']}",
+            description=f"{rental['transport']} ({rental['license_plate']}) • ${rental['price']:,.0f} • {rental['created_at'][:16]}",
+            input_message_content=InputTextMessageContent(
+                message_text=format_search_rental(rental),
+                parse_mode="HTML"
+            )
+        ))
+    
+    await inline_query.answer(articles[:50], cache_time=5, is_personal=True)
+
 # === ОБРАБОТКА CALLBACK-ЗАПРОСОВ ===
 
 @router.callback_query(F.data == "admin_main")
@@ -103,26 +249,25 @@ async def admin_expenses_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "admin_finance")
 async def admin_finance_menu(callback: CallbackQuery):
     """Финансовая статистика"""
-    financial_stats = db.get_financial_stats()
-    expense_stats = db.get_expense_stats()
+    snapshot = await async_db.get_financial_snapshot()
     
     response = (
         "💰 <b>Финансовая статистика</b>\n\n"
-        f"📈 <b>Доход от аренд:</b> ${financial_stats['rental_income']:,.2f}\n"
-        f"💰 <b>Доход от продаж:</b> ${financial_stats['sales_income']:,.2f}\n"
-        f"💵 <b>Общий доход:</b> ${financial_stats['total_income']:,.2f}\n\n"
+        f"📈 <b>Доход от аренд:</b> ${snapshot.rental_income:,.2f}\n"
+        f"💰 <b>Доход от продаж:</b> ${snapshot.sales_income:,.2f}\n"
+        f"💵 <b>Общий доход:</b> ${snapshot.total_income:,.2f}\n\n"
         
-        f"🛠️ <b>Расходы на обслуживание:</b> ${expense_stats['expenses']['maintenance']:,.2f}\n"
-        f"📢 <b>Расходы на рекламу:</b> ${expense_stats['expenses']['advertisement']:,.2f}\n"
-        f"📋 <b>Прочие расходы:</b> ${expense_stats['expenses']['other_costs']:,.2f}\n"
-        f"🚗 <b>Затраты на автомобили:</b> ${expense_stats['expenses']['car_costs']:,.2f}\n"
-        f"💸 <b>Общие расходы:</b> ${expense_stats['expenses']['total']:,.2f}\n\n"
+        f"🛠️ <b>Расходы на обслуживание:</b> ${snapshot.maintenance:,.2f}\n"
+        f"📢 <b>Расходы на рекламу:</b> ${snapshot.advertisement:,.2f}\n"
+        f"📋 <b>Прочие расходы:</b> ${snapshot.other_costs:,.2f}\n"
+        f"🚗 <b>Затраты на автомобили:</b> ${snapshot.car_costs:,.2f}\n"
+        f"💸 <b>Общие расходы:</b> ${snapshot.total_expenses:,.2f}\n\n"
         
-        f"💎 <b>Чистая прибыль:</b> ${financial_stats['net_profit']:,.2f}\n"
-        f"📈 <b>Рентабельность:</b> {financial_stats['profitability']:.1f}%\n\n"
+        f"💎 <b>Чистая прибыль:</b> ${snapshot.net_profit:,.2f}\n"
+        f"📈 <b>Рентабельность:</b> {snapshot.profitability:.1f}%\n\n"
         
-        f"📊 <b>Всего аренд:</b> {financial_stats['total_rentals']}\n"
-        f"🚗 <b>Всего автомобилей:</b> {financial_stats['total_cars']}"
+        f"📊 <b>Всего аренд:</b> {snapshot.total_rentals}\n"
+        f"🚗 <b>Всего автомобилей:</b> {snapshot.total_cars}"
     )
     
     await callback.message.edit_text(
@@ -171,7 +316,7 @@ async def add_car_price(message: Message, state: FSMContext):
         price = float(message.text.replace(',', '').replace(' ', ''))
         data = await state.get_data()
         
-        if db.add_car(data['car_name'], data['car_plate'], price):
+        if await async_db.add_car(data['car_name'], data['car_plate'], price):
             await message.answer(
                 f"✅ <b>Автомобиль успешно добавлен!</b>\n\n"
                 f"🚗 {data['car_name']}\n"
@@ -193,8 +338,8 @@ async def add_car_price(message: Message, state: FSMContext):
 @router.callback_query(F.data == "cars_list")
 async def cars_list_handler(callback: CallbackQuery):
     """Список автомобилей"""
-    cars = db.get_all_cars()
-    if not cars:
+    page = await async_db.get_cars_page()
+    if not page['items']:
         await callback.message.edit_text(
             "📝 Список автомобилей пуст.",
             reply_markup=get_back_to_cars_button()
@@ -203,19 +348,19 @@ async def cars_list_handler(callback: CallbackQuery):
     
     await callback.message.edit_text(
         "🚗 <b>Выберите автомобиль:</b>",
-        reply_markup=get_cars_list_keyboard(cars),
+        reply_markup=get_cars_list_keyboard(page),
         parse_mode="HTML"
     )
 
 @router.callback_query(F.data.startswith("cars_page_"))
 async def cars_list_pagination(callback: CallbackQuery):
     """Пагинация списка автомобилей"""
-    page = int(callback.data.split("_")[2])
-    cars = db.get_all_cars()
+    direction, cursor = parse_page_callback(callback.data, "cars_page_")
+    page = await async_db.get_cars_page(cursor, direction)
     
     await callback.message.edit_text(
         "🚗 <b>Выберите автомобиль:</b>",
-        reply_markup=get_cars_list_keyboard(cars, page),
+        reply_markup=get_cars_list_keyboard(page),
         parse_mode="HTML"
     )
 
@@ -223,12 +368,17 @@ async def cars_list_pagination(callback: CallbackQuery):
 async def car_detail_handler(callback: CallbackQuery):
     """Детали автомобиля"""
     car_id = int(callback.data.split("_")[2])
-    car = db.get_car_by_id(car_id)
+    await show_car_detail(callback, car_id)
+
+async def show_car_detail(callback: CallbackQuery, car_id: int):
+    """Карточка автомобиля в сообщении с кнопками"""
+    profile = await async_db.get_car_profile(car_id)
     
-    if not car:
+    if not profile:
         await callback.answer("❌ Автомобиль не найден")
         return
     
+    car = profile.car
     status_icons = {
         'available': '✅',
         'rented': '🔵',
@@ -244,7 +394,9 @@ async def car_detail_handler(callback: CallbackQuery):
         f"📊 <b>Статус:</b> {car['status']}\n"
         f"💰 <b>Цена покупки:</b> ${car['purchase_price']:,.2f}\n"
         f"📈 <b>Доход от аренд:</b> ${car.get('total_income', 0):,.2f}\n"
-        f"🔢 <b>Количество аренд:</b> {car.get('total_rentals', 0)}"
+        f"🔢 <b>Количество аренд:</b> {car.get('total_rentals', 0)}\n"
+        f"📅 <b>За 30 дней:</b> {profile.rentals_30d} аренд, ${profile.income_30d:,.2f}\n"
+        f"🛠️ <b>Обслуживание:</b> {profile.maintenance_count} на ${profile.maintenance_total:,.2f}"
     )
     
     if car['sale_price']:
@@ -253,6 +405,21 @@ async def car_detail_handler(callback: CallbackQuery):
         response += f"\n💰 <b>Цена продажи:</b> ${car['sale_price']:,.2f}"
         response += f"\n{profit_icon} <b>Прибыль:</b> ${profit:,.2f}"
     
+    if profile.roi is not None:
+        response += f"\n💎 <b>ROI:</b> {profile.roi:,.1f}%"
+    
+    if profile.idle_hours is not None:
+        idle_days, idle_hours = divmod(max(profile.idle_hours, 0), 24)
+        response += f"\n⏳ <b>Простой:</b> {int(idle_days)} д. {int(idle_hours)} ч."
+    
+    if profile.recent_rentals:
+        response += "\n\n📝 <b>Последние аренды:</b>"
+        for rental in profile.recent_rentals:
+            response += (
+                f"\n• {rental['created_at'][:16]} — ${rental['price']:,.0f}, "
+                f"{escape(rental['renter'])} ({rental['duration']})"
+            )
+    
     await callback.message.edit_text(
         response,
         reply_markup=get_car_detail_keyboard(car_id),
@@ -263,7 +430,7 @@ async def car_detail_handler(callback: CallbackQuery):
 async def car_delete_handler(callback: CallbackQuery):
     """Подтверждение удаления автомобиля"""
     car_id = int(callback.data.split("_")[2])
-    car = db.get_car_by_id(car_id)
+    car = await async_db.get_car_by_id(car_id)
     
     if not car:
         await callback.answer("❌ Автомобиль не найден")
@@ -281,9 +448,9 @@ async def car_delete_handler(callback: CallbackQuery):
 async def confirm_car_delete(callback: CallbackQuery):
     """Подтвержденное удаление автомобиля"""
     car_id = int(callback.data.split("_")[3])
-    car = db.get_car_by_id(car_id)
+    car = await async_db.get_car_by_id(car_id)
     
-    if car and db.delete_car(car['license_plate']):
+    if car and await async_db.delete_car(car['license_plate']):
         await callback.message.edit_text(
             f"✅ Автомобиль {car['name']} ({car['license_plate']}) успешно удален.",
             reply_markup=get_back_to_cars_button()
@@ -298,13 +465,13 @@ async def confirm_car_delete(callback: CallbackQuery):
 async def cancel_car_delete(callback: CallbackQuery):
     """Отмена удаления автомобиля"""
     car_id = int(callback.data.split("_")[3])
-    await car_detail_handler(callback)
+    await show_car_detail(callback, car_id)
 
 @router.callback_query(F.data.startswith("car_sell_"))
 async def car_sell_handler(callback: CallbackQuery, state: FSMContext):
     """Начало процесса продажи автомобиля"""
     car_id = int(callback.data.split("_")[2])
-    car = db.get_car_by_id(car_id)
+    car = await async_db.get_car_by_id(car_id)
     
     if not car:
         await callback.answer("❌ Автомобиль не найден")
@@ -328,7 +495,7 @@ async def process_sale_price(message: Message, state: FSMContext):
         sale_price = float(message.text.replace(',', '').replace(' ', ''))
         data = await state.get_data()
         
-        if db.sell_car(data['car_plate'], sale_price):
+        if await async_db.sell_car(data['car_plate'], sale_price):
             await message.answer(
                 f"✅ <b>Автомобиль успешно продан!</b>\n\n"
                 f"💰 Цена продажи: ${sale_price:,.2f}",
@@ -350,9 +517,9 @@ async def process_sale_price(message: Message, state: FSMContext):
 @router.callback_query(F.data == "maintenance_add")
 async def maintenance_add_start(callback: CallbackQuery, state: FSMContext):
     """Начало добавления обслуживания"""
-    cars = db.get_all_cars()
+    page = await async_db.get_cars_page()
     
-    if not cars:
+    if not page['items']:
         await callback.message.edit_text(
             "❌ Нет автомобилей для обслуживания.",
             reply_markup=get_back_button()
@@ -362,7 +529,20 @@ async def maintenance_add_start(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
         "🛠️ <b>Добавление расхода на обслуживание</b>\n\n"
         "Выберите автомобиль:",
-        reply_markup=get_cars_for_maintenance_keyboard(cars),
+        reply_markup=get_cars_for_maintenance_keyboard(page),
+        parse_mode="HTML"
+    )
+
+@router.callback_query(F.data.startswith("maintenance_cars_page_"))
+async def maintenance_cars_pagination(callback: CallbackQuery):
+    """Пагинация выбора автомобиля для обслуживания"""
+    direction, cursor = parse_page_callback(callback.data, "maintenance_cars_page_")
+    page = await async_db.get_cars_page(cursor, direction)
+    
+    await callback.message.edit_text(
+        "🛠️ <b>Добавление расхода на обслуживание</b>\n\n"
+        "Выберите автомобиль:",
+        reply_markup=get_cars_for_maintenance_keyboard(page),
         parse_mode="HTML"
     )
 
@@ -370,7 +550,7 @@ async def maintenance_add_start(callback: CallbackQuery, state: FSMContext):
 async def maintenance_for_car_handler(callback: CallbackQuery, state: FSMContext):
     """Выбор автомобиля для обслуживания"""
     car_id = int(callback.data.split("_")[3])
-    car = db.get_car_by_id(car_id)
+    car = await async_db.get_car_by_id(car_id)
     
     if not car:
         await callback.answer("❌ Автомобиль не найден")
@@ -413,7 +593,7 @@ async def process_maintenance_description(message: Message, state: FSMContext):
     """Получение описания и сохранение обслуживания"""
     data = await state.get_data()
     
-    if db.add_maintenance(data['car_id'], data['maintenance_amount'], message.text):
+    if await async_db.add_maintenance(data['car_id'], data['maintenance_amount'], message.text):
         await message.answer(
             f"✅ <b>Расход на обслуживание добавлен!</b>\n\n"
             f"🚗 {data['car_name']}\n"
@@ -433,39 +613,39 @@ async def process_maintenance_description(message: Message, state: FSMContext):
 @router.callback_query(F.data == "maintenance_list")
 async def maintenance_list_handler(callback: CallbackQuery):
     """Список обслуживания"""
-    maintenance = db.get_all_maintenance()
+    page = await async_db.get_maintenance_page()
     
-    if not maintenance:
+    if not page['items']:
         await callback.message.edit_text(
             "📝 История обслуживания пуста.",
             reply_markup=get_back_button()
         )
         return
     
-    total = db.get_maintenance_total()
+    total = await async_db.get_maintenance_total()
     
     response = f"🛠️ <b>История обслуживания</b>\n\n"
     response += f"<b>Общая сумма: ${total:,.2f}</b>\n\n"
     
     await callback.message.edit_text(
         response,
-        reply_markup=get_maintenance_list_keyboard(maintenance),
+        reply_markup=get_maintenance_list_keyboard(page),
         parse_mode="HTML"
     )
 
 @router.callback_query(F.data.startswith("maintenance_page_"))
 async def maintenance_list_pagination(callback: CallbackQuery):
     """Пагинация списка обслуживания"""
-    page = int(callback.data.split("_")[2])
-    maintenance = db.get_all_maintenance()
-    total = db.get_maintenance_total()
+    direction, cursor = parse_page_callback(callback.data, "maintenance_page_")
+    page = await async_db.get_maintenance_page(cursor, direction)
+    total = await async_db.get_maintenance_total()
     
     response = f"🛠️ <b>История обслуживания</b>\n\n"
     response += f"<b>Общая сумма: ${total:,.2f}</b>\n\n"
     
     await callback.message.edit_text(
         response,
-        reply_markup=get_maintenance_list_keyboard(maintenance, page),
+        reply_markup=get_maintenance_list_keyboard(page),
         parse_mode="HTML"
     )
 
@@ -526,7 +706,7 @@ async def process_advertisement_description(message: Message, state: FSMContext)
     """Сохранение рекламного расхода"""
     data = await state.get_data()
     
-    if db.add_advertisement_cost(data['amount'], message.text):
+    if await async_db.add_advertisement_cost(data['amount'], message.text):
         await message.answer(
             f"✅ <b>Рекламный расход добавлен!</b>\n\n"
             f"💰 ${data['amount']:,.2f}\n"
@@ -545,39 +725,39 @@ async def process_advertisement_description(message: Message, state: FSMContext)
 @router.callback_query(F.data == "list_advertisement_costs")
 async def list_advertisement_costs_handler(callback: CallbackQuery):
     """Список рекламных расходов"""
-    costs = db.get_all_advertisement_costs()
+    page = await async_db.get_advertisement_costs_page()
     
-    if not costs:
+    if not page['items']:
         await callback.message.edit_text(
             "📝 Нет записей о рекламных расходах.",
             reply_markup=get_back_to_expenses_button()
         )
         return
     
-    total = db.get_advertisement_costs_total()
+    total = await async_db.get_advertisement_costs_total()
     
     response = f"📢 <b>Рекламные расходы</b>\n\n"
     response += f"<b>Общая сумма: ${total:,.2f}</b>\n\n"
     
     await callback.message.edit_text(
         response,
-        reply_markup=get_advertisement_costs_keyboard(costs),
+        reply_markup=get_advertisement_costs_keyboard(page),
         parse_mode="HTML"
     )
 
 @router.callback_query(F.data.startswith("advertisement_page_"))
 async def advertisement_costs_pagination(callback: CallbackQuery):
     """Пагинация списка рекламных расходов"""
-    page = int(callback.data.split("_")[2])
-    costs = db.get_all_advertisement_costs()
-    total = db.get_advertisement_costs_total()
+    direction, cursor = parse_page_callback(callback.data, "advertisement_page_")
+    page = await async_db.get_advertisement_costs_page(cursor, direction)
+    total = await async_db.get_advertisement_costs_total()
     
     response = f"📢 <b>Рекламные расходы</b>\n\n"
     response += f"<b>Общая сумма: ${total:,.2f}</b>\n\n"
     
     await callback.message.edit_text(
         response,
-        reply_markup=get_advertisement_costs_keyboard(costs, page),
+        reply_markup=get_advertisement_costs_keyboard(page),
         parse_mode="HTML"
     )
 
@@ -616,7 +796,7 @@ async def process_other_cost_description(message: Message, state: FSMContext):
     """Сохранение прочего расхода"""
     data = await state.get_data()
     
-    if db.add_other_cost(data['amount'], message.text):
+    if await async_db.add_other_cost(data['amount'], message.text):
         await message.answer(
             f"✅ <b>Прочий расход добавлен!</b>\n\n"
             f"💰 ${data['amount']:,.2f}\n"
@@ -635,67 +815,112 @@ async def process_other_cost_description(message: Message, state: FSMContext):
 @router.callback_query(F.data == "list_other_costs")
 async def list_other_costs_handler(callback: CallbackQuery):
     """Список прочих расходов"""
-    costs = db.get_all_other_costs()
+    page = await async_db.get_other_costs_page()
     
-    if not costs:
+    if not page['items']:
         await callback.message.edit_text(
             "📝 Нет записей о прочих расходах.",
             reply_markup=get_back_to_expenses_button()
         )
         return
     
-    total = db.get_other_costs_total()
+    total = await async_db.get_other_costs_total()
     
     response = f"📋 <b>Прочие расходы</b>\n\n"
     response += f"<b>Общая сумма: ${total:,.2f}</b>\n\n"
     
     await callback.message.edit_text(
         response,
-        reply_markup=get_other_costs_keyboard(costs),
+        reply_markup=get_other_costs_keyboard(page),
         parse_mode="HTML"
     )
 
 @router.callback_query(F.data.startswith("other_costs_page_"))
 async def other_costs_pagination(callback: CallbackQuery):
     """Пагинация списка прочих расходов"""
-    page = int(callback.data.split("_")[2])
-    costs = db.get_all_other_costs()
-    total = db.get_other_costs_total()
+    direction, cursor = parse_page_callback(callback.data, "other_costs_page_")
+    page = await async_db.get_other_costs_page(cursor, direction)
+    total = await async_db.get_other_costs_total()
     
     response = f"📋 <b>Прочие расходы</b>\n\n"
     response += f"<b>Общая сумма: ${total:,.2f}</b>\n\n"
     
     await callback.message.edit_text(
         response,
-        reply_markup=get_other_costs_keyboard(costs, page),
+        reply_markup=get_other_costs_keyboard(page),
         parse_mode="HTML"
     )
 
 # === ОТЧЕТЫ ===
 
+async def send_html_report(message: Message, period: Period = ALL_TIME) -> bool:
+    """
+    Отправка HTML отчета за период в чат сообщения.
+    Возвращает True, если отчет взят из кэша без повторной генерации.
+    """
+    # Берем отчет из кэша, если данные не менялись, иначе генерируем заново
+    report, from_cache = await get_html_report(period)
+    
+    # Отправляем файл
+    caption = (f"📊 Полный отчет по аренде транспорта\n"
+               f"📅 Период: {period.title}\n\n"
+               "✅ Включена вся статистика:\n"
+               "• 💰 Доходы и расходы\n"
+               "• 🚗 Статусы автомобилей\n" 
+               "• 🌐 Статистика по серверам\n"
+               "• 🛠️ История обслуживания\n"
+               "• 💸 Детализация расходов")
+    
+    sent = None
+    if report.file_id:
+        # Файл уже загружен в Telegram: отправляем по file_id без повторной загрузки
+        try:
+            sent = await message.answer_document(report.file_id, caption=caption)
+        except Exception:
+            report.file_id = None
+    
+    if sent is None:
+        sent = await message.answer_document(FSInputFile(report.filename), caption=caption)
+        report.file_id = sent.document.file_id
+    
+    return from_cache
+
 @router.callback_query(F.data == "reports_html")
 async def generate_html_report_handler(callback: CallbackQuery):
     """Генерация полного HTML отчета"""
     try:
-        # Генерируем полный HTML отчет
-        filename = await generate_html_report()
-        
-        # Отправляем файл
-        from aiogram.types import FSInputFile
-        document = FSInputFile(filename)
+        if await send_html_report(callback.message):
+            await callback.answer("✅ Данные не изменились, отправлен сохраненный отчет")
+        else:
+            await callback.answer("✅ Полный HTML отчет сгенерирован")
         
-        await callback.message.answer_document(
-            document,
-            caption="📊 Полный отчет по аренде транспорта\n\n"
-                   "✅ Включена вся статистика:\n"
-                   "• 💰 Доходы и расходы\n"
-                   "• 🚗 Статусы автомобилей\n" 
-                   "• 🌐 Статистика по серверам\n"
-                   "• 🛠️ История обслуживания\n"
-                   "• 💸 Детализация расходов"
+    except Exception as e:
+        await callback.message.edit_text(
+            f"❌ Ошибка при генерации отчета: {str(e)}",
+            reply_markup=get_back_button()
         )
-        
-        await callback.answer("✅ Полный HTML отчет сгенерирован")
+
+@router.callback_query(F.data == "reports_period_custom")
+async def report_custom_period_start(callback: CallbackQuery, state: FSMContext):
+    """Запрос произвольного периода отчета"""
+    await callback.message.edit_text(
+        "🗓️ <b>Отчет за период</b>\n\n"
+        "Введите даты начала и конца периода в формате:\n"
+        "<code>01.05.2024 - 31.05.2024</code>",
+        reply_markup=get_back_to_reports_button(),
+        parse_mode="HTML"
+    )
+    await state.set_state(ReportStates.waiting_for_period)
+
+@router.callback_query(F.data.startswith("reports_period_"))
+async def generate_period_report_handler(callback: CallbackQuery):
+    """Генерация HTML отчета за предустановленный период"""
+    period = resolve_period(callback.data[len("reports_period_"):])
+    try:
+        if await send_html_report(callback.message, period):
+            await callback.answer("✅ Данные не изменились, отправлен сохраненный отчет")
+        else:
+            await callback.answer(f"✅ Отчет за период сгенерирован: {period.title}")
         
     except Exception as e:
         await callback.message.edit_text(
@@ -703,6 +928,23 @@ async def generate_html_report_handler(callback: CallbackQuery):
             reply_markup=get_back_button()
         )
 
+@router.message(ReportStates.waiting_for_period)
+async def process_report_period(message: Message, state: FSMContext):
+    """Генерация HTML отчета за введенный период"""
+    period = parse_custom_period(message.text or "")
+    if period is None:
+        await message.reply("❌ Неверный формат периода. Введите даты как 01.05.2024 - 31.05.2024:")
+        return
+    
+    await state.clear()
+    try:
+        await send_html_report(message, period)
+    except Exception as e:
+        await message.answer(
+            f"❌ Ошибка при генерации отчета: {str(e)}",
+            reply_markup=get_back_button()
+        )
+
 # === ОБРАБОТКА ОТМЕНЫ ===
 
 @router.callback_query(F.data.startswith("cancel_"))
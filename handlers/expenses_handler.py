@@ -3,7 +3,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from database.models import db
+from database.async_db import async_db
 from config.settings import settings
 from keyboards.admin_keyboards import *
 
@@ -29,13 +29,13 @@ async def advertisement_expenses_menu(callback: CallbackQuery):
         await callback.answer("❌ У вас нет доступа")
         return
     
-    expenses = db.get_all_advertisement_costs()
-    total = db.get_advertisement_costs_total()
+    expenses = (await async_db.get_advertisement_costs_page(per_page=10))['items']
+    total = await async_db.get_advertisement_costs_total()
     
     response = "📢 <b>Расходы на рекламу и объявления</b>\n\n"
     
     if expenses:
-        for expense in expenses[:10]:  # Показываем последние 10
+        for expense in expenses:  # Показываем последние 10
             response += (
                 f"💰 ${expense['amount']:,.2f}\n"
                 f"📝 {expense['description']}\n"
@@ -98,7 +98,7 @@ async def process_advertisement_description(message: Message, state: FSMContext)
     """Получение описания и сохранение расхода на рекламу"""
     data = await state.get_data()
     
-    if db.add_advertisement_cost(data['amount'], message.text):
+    if await async_db.add_advertisement_cost(data['amount'], message.text):
         await message.answer(
             f"✅ <b>Расход на рекламу добавлен!</b>\n\n"
             f"💰 ${data['amount']:,.2f}\n"
@@ -123,13 +123,13 @@ async def other_expenses_menu(callback: CallbackQuery):
         await callback.answer("❌ У вас нет доступа")
         return
     
-    expenses = db.get_all_other_costs()
-    total = db.get_other_costs_total()
+    expenses = (await async_db.get_other_costs_page(per_page=10))['items']
+    total = await async_db.get_other_costs_total()
     
     response = "📋 <b>Прочие расходы</b>\n\n"
     
     if expenses:
-        for expense in expenses[:10]:  # Показываем последние 10
+        for expense in expenses:  # Показываем последние 10
             response += (
                 f"💰 ${expense['amount']:,.2f}\n"
                 f"📝 {expense['description']}\n"
@@ -192,7 +192,7 @@ async def process_other_cost_description(message: Message, state: FSMContext):
     """Получение описания и сохранение прочего расхода"""
     data = await state.get_data()
     
-    if db.add_other_cost(data['amount'], message.text):
+    if await async_db.add_other_cost(data['amount'], message.text):
         await message.answer(
             f"✅ <b>Прочий расход добавлен!</b>\n\n"
             f"💰 ${data['amount']:,.2f}\n"
@@ -217,27 +217,26 @@ async def admin_finance_menu(callback: CallbackQuery):
         await callback.answer("❌ У вас нет доступа")
         return
     
-    financial_stats = db.get_financial_stats()
-    expense_stats = db.get_expense_stats()
+    snapshot = await async_db.get_financial_snapshot()
     
     response = (
         "💰 <b>Расширенная финансовая статистика</b>\n\n"
-        f"📈 <b>Доход от аренд:</b> ${financial_stats['rental_income']:,.2f}\n"
-        f"💰 <b>Доход от продаж:</b> ${financial_stats['sales_income']:,.2f}\n"
-        f"💵 <b>Общий доход:</b> ${financial_stats['total_income']:,.2f}\n\n"
+        f"📈 <b>Доход от аренд:</b> ${snapshot.rental_income:,.2f}\n"
+        f"💰 <b>Доход от продаж:</b> ${snapshot.sales_income:,.2f}\n"
+        f"💵 <b>Общий доход:</b> ${snapshot.total_income:,.2f}\n\n"
         
-        f"🛠️ <b>Расходы на обслуживание:</b> ${expense_stats['expenses']['maintenance']:,.2f}\n"
-        f"📢 <b>Расходы на рекламу:</b> ${expense_stats['expenses']['advertisement']:,.2f}\n"
-        f"📋 <b>Прочие расходы:</b> ${expense_stats['expenses']['other_costs']:,.2f}\n"
-        f"🚗 <b>Затраты на автомобили:</b> ${expense_stats['expenses']['car_costs']:,.2f}\n"
-        f"💸 <b>Общие расходы:</b> ${expense_stats['expenses']['total']:,.2f}\n\n"
+        f"🛠️ <b>Расходы на обслуживание:</b> ${snapshot.maintenance:,.2f}\n"
+        f"📢 <b>Расходы на рекламу:</b> ${snapshot.advertisement:,.2f}\n"
+        f"📋 <b>Прочие расходы:</b> ${snapshot.other_costs:,.2f}\n"
+        f"🚗 <b>Затраты на автомобили:</b> ${snapshot.car_costs:,.2f}\n"
+        f"💸 <b>Общие расходы:</b> ${snapshot.total_expenses:,.2f}\n\n"
         
-        f"📊 <b>Соотношение расход/доход:</b> {expense_stats['expense_income_ratio']:.1f}%\n"
-        f"💎 <b>Чистая прибыль:</b> ${financial_stats['net_profit']:,.2f}\n"
-        f"📈 <b>Рентабельность:</b> {financial_stats['profitability']:.1f}%\n\n"
+        f"📊 <b>Соотношение расход/доход:</b> {snapshot.expense_income_ratio:.1f}%\n"
+        f"💎 <b>Чистая прибыль:</b> ${snapshot.net_profit:,.2f}\n"
+        f"📈 <b>Рентабельность:</b> {snapshot.profitability:.1f}%\n\n"
         
-        f"📊 <b>Всего аренд:</b> {financial_stats['total_rentals']}\n"
-        f"🚗 <b>Всего автомобилей:</b> {financial_stats['total_cars']}"
+        f"📊 <b>Всего аренд:</b> {snapshot.total_rentals}\n"
+        f"🚗 <b>Всего автомобилей:</b> {snapshot.total_cars}"
     )
     
     keyboard = InlineKeyboardBuilder()
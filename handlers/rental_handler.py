@@ -1,7 +1,12 @@
+import logging
+import time
 from aiogram import Router, F
 from aiogram.types import Message
-from database.models import db
+from database.write_queue import rental_queue
 from utils.parser import parse_rental_message
+from utils.log import bind_log_context
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -11,15 +16,27 @@ async def handle_rental_message(message: Message):
     parsed_data = parse_rental_message(message.text)
     
     if not parsed_data:
+        logger.warning("Не удалось распознать сообщение об аренде")
         await message.reply("❌ Не удалось распознать данные аренды. Проверьте формат сообщения.")
         return
     
-    # Сохраняем в базу данных
-    if db.add_rental(parsed_data):
+    bind_log_context(plate=parsed_data['license_plate'])
+    
+    # Сохраняем в базу данных (пакетная запись, ответ только после фиксации)
+    started = time.perf_counter()
+    try:
+        saved = await rental_queue.submit(parsed_data)
+    except RuntimeError as e:
+        logger.error("Очередь записи недоступна: %s", e)
+        saved = False
+    timing = {'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+    if saved:
+        logger.info("Аренда сохранена", extra=timing)
         await message.reply(
             f"✅ Аренда успешно сохранена!\n"
             f"🚗 {parsed_data['transport']} ({parsed_data['license_plate']})\n"
             f"💰 ${parsed_data['price']} • ⏰ {parsed_data['duration']}"
         )
     else:
+        logger.error("Аренда не сохранена", extra=timing)
         await message.reply("❌ Ошибка при сохранении данных.")
\ No newline at end of file
@@ -1,7 +1,7 @@
 from aiogram import Router
 from aiogram.types import Message, FSInputFile
 from aiogram.filters import Command
-from database.models import db
+from database.async_db import async_db
 from utils.reporter import generate_html_report
 from config.settings import settings
 
@@ -16,7 +16,7 @@ async def handle_stats_command(message: Message):
     
     try:
         # Получаем все аренды
-        rentals = db.get_all_rentals()
+        rentals = await async_db.get_all_rentals()
         
         if not rentals:
             await message.reply("📊 Нет данных об арендах для генерации статистики.")
@@ -30,8 +30,13 @@ def get_reports_menu():
     keyboard = InlineKeyboardBuilder()
     keyboard.add(
         InlineKeyboardButton(text="📊 HTML отчет", callback_data="reports_html"),
+        InlineKeyboardButton(text="📅 Сегодня", callback_data="reports_period_today"),
+        InlineKeyboardButton(text="📅 7 дней", callback_data="reports_period_7d"),
+        InlineKeyboardButton(text="📅 30 дней", callback_data="reports_period_30d"),
+        InlineKeyboardButton(text="🗓️ Свой период", callback_data="reports_period_custom"),
         InlineKeyboardButton(text="🔙 Назад", callback_data="admin_main")
     )
+    keyboard.adjust(1, 3, 1, 1)
     return keyboard.as_markup()
 
 # Меню обслуживания
@@ -90,21 +95,39 @@ def get_back_to_cars_button():
     keyboard.add(InlineKeyboardButton(text="🔙 Назад", callback_data="admin_cars"))
     return keyboard.as_markup()
 
+# Кнопка "Назад" к меню отчетов
+def get_back_to_reports_button():
+    keyboard = InlineKeyboardBuilder()
+    keyboard.add(InlineKeyboardButton(text="🔙 Назад", callback_data="admin_reports"))
+    return keyboard.as_markup()
+
 # Кнопка "Назад" к меню расходов
 def get_back_to_expenses_button():
     keyboard = InlineKeyboardBuilder()
     keyboard.add(InlineKeyboardButton(text="🔙 Назад", callback_data="admin_expenses"))
     return keyboard.as_markup()
 
+# Кнопки навигации для keyset-пагинации: в callback передается курсор соседней страницы
+def get_pagination_buttons(page, prefix):
+    navigation_buttons = []
+    if page['has_prev']:
+        navigation_buttons.append(InlineKeyboardButton(
+            text="⬅️ Назад", 
+            callback_data=f"{prefix}_p_{page['prev_cursor']}"
+        ))
+    
+    if page['has_next']:
+        navigation_buttons.append(InlineKeyboardButton(
+            text="Вперед ➡️", 
+            callback_data=f"{prefix}_n_{page['next_cursor']}"
+        ))
+    return navigation_buttons
+
 # Клавиатура для списка автомобилей
-def get_cars_list_keyboard(cars, page=0, per_page=5):
+def get_cars_list_keyboard(page):
     keyboard = InlineKeyboardBuilder()
     
-    start_idx = page * per_page
-    end_idx = start_idx + per_page
-    paginated_cars = cars[start_idx:end_idx]
-    
-    for car in paginated_cars:
+    for car in page['items']:
         status_icons = {
             'available': '✅',
             'rented': '🔵',
@@ -119,19 +142,7 @@ def get_cars_list_keyboard(cars, page=0, per_page=5):
         ))
     
     # Пагинация
-    navigation_buttons = []
-    if page > 0:
-        navigation_buttons.append(InlineKeyboardButton(
-            text="⬅️ Назад", 
-            callback_data=f"cars_page_{page-1}"
-        ))
-    
-    if end_idx < len(cars):
-        navigation_buttons.append(InlineKeyboardButton(
-            text="Вперед ➡️", 
-            callback_data=f"cars_page_{page+1}"
-        ))
-    
+    navigation_buttons = get_pagination_buttons(page, "cars_page")
     if navigation_buttons:
         keyboard.add(*navigation_buttons)
     
@@ -139,6 +150,28 @@ def get_cars_list_keyboard(cars, page=0, per_page=5):
     keyboard.adjust(1)
     return keyboard.as_markup()
 
+# Клавиатура результатов поиска: найденные автомобили
+def get_search_results_keyboard(cars):
+    keyboard = InlineKeyboardBuilder()
+    
+    for car in cars:
+        status_icons = {
+            'available': '✅',
+            'rented': '🔵',
+            'sold': '💰',
+            'maintenance': '🛠️'
+        }
+        icon = status_icons.get(car['status'], '❓')
+        
+        keyboard.add(InlineKeyboardButton(
+            text=f"{icon} {car['name']} ({car['license_plate']})",
+            callback_data=f"car_detail_{car['id']}"
+        ))
+    
+    keyboard.add(InlineKeyboardButton(text="🔙 В админ-панель", callback_data="admin_main"))
+    keyboard.adjust(1)
+    return keyboard.as_markup()
+
 # Клавиатура для деталей автомобиля
 def get_car_detail_keyboard(car_id):
     keyboard = InlineKeyboardBuilder()
@@ -170,33 +203,17 @@ def get_sell_car_keyboard(car_id):
     return keyboard.as_markup()
 
 # Клавиатура для выбора автомобиля для обслуживания
-def get_cars_for_maintenance_keyboard(cars, page=0, per_page=5):
+def get_cars_for_maintenance_keyboard(page):
     keyboard = InlineKeyboardBuilder()
     
-    start_idx = page * per_page
-    end_idx = start_idx + per_page
-    paginated_cars = cars[start_idx:end_idx]
-    
-    for car in paginated_cars:
+    for car in page['items']:
         keyboard.add(InlineKeyboardButton(
             text=f"{car['name']} ({car['license_plate']})",
             callback_data=f"maintenance_for_car_{car['id']}"
         ))
     
     # Пагинация
-    navigation_buttons = []
-    if page > 0:
-        navigation_buttons.append(InlineKeyboardButton(
-            text="⬅️ Назад", 
-            callback_data=f"maintenance_cars_page_{page-1}"
-        ))
-    
-    if end_idx < len(cars):
-        navigation_buttons.append(InlineKeyboardButton(
-            text="Вперед ➡️", 
-            callback_data=f"maintenance_cars_page_{page+1}"
-        ))
-    
+    navigation_buttons = get_pagination_buttons(page, "maintenance_cars_page")
     if navigation_buttons:
         keyboard.add(*navigation_buttons)
     
@@ -205,33 +222,17 @@ def get_cars_for_maintenance_keyboard(cars, page=0, per_page=5):
     return keyboard.as_markup()
 
 # Клавиатура для истории обслуживания
-def get_maintenance_list_keyboard(maintenance_records, page=0, per_page=5):
+def get_maintenance_list_keyboard(page):
     keyboard = InlineKeyboardBuilder()
     
-    start_idx = page * per_page
-    end_idx = start_idx + per_page
-    paginated_records = maintenance_records[start_idx:end_idx]
-    
-    for record in paginated_records:
+    for record in page['items']:
         keyboard.add(InlineKeyboardButton(
             text=f"${record['amount']} - {record['description'][:30]}",
             callback_data=f"maintenance_detail_{record['id']}"
         ))
     
     # Пагинация
-    navigation_buttons = []
-    if page > 0:
-        navigation_buttons.append(InlineKeyboardButton(
-            text="⬅️ Назад", 
-            callback_data=f"maintenance_page_{page-1}"
-        ))
-    
-    if end_idx < len(maintenance_records):
-        navigation_buttons.append(InlineKeyboardButton(
-            text="Вперед ➡️", 
-            callback_data=f"maintenance_page_{page+1}"
-        ))
-    
+    navigation_buttons = get_pagination_buttons(page, "maintenance_page")
     if navigation_buttons:
         keyboard.add(*navigation_buttons)
     
@@ -240,33 +241,17 @@ def get_maintenance_list_keyboard(maintenance_records, page=0, per_page=5):
     return keyboard.as_markup()
 
 # Клавиатура для рекламных расходов
-def get_advertisement_costs_keyboard(costs, page=0, per_page=5):
+def get_advertisement_costs_keyboard(page):
     keyboard = InlineKeyboardBuilder()
     
-    start_idx = page * per_page
-    end_idx = start_idx + per_page
-    paginated_costs = costs[start_idx:end_idx]
-    
-    for cost in paginated_costs:
+    for cost in page['items']:
         keyboard.add(InlineKeyboardButton(
             text=f"${cost['amount']} - {cost['description'][:30]}",
             callback_data=f"advertisement_detail_{cost['id']}"
         ))
     
     # Пагинация
-    navigation_buttons = []
-    if page > 0:
-        navigation_buttons.append(InlineKeyboardButton(
-            text="⬅️ Назад", 
-            callback_data=f"advertisement_page_{page-1}"
-        ))
-    
-    if end_idx < len(costs):
-        navigation_buttons.append(InlineKeyboardButton(
-            text="Вперед ➡️", 
-            callback_data=f"advertisement_page_{page+1}"
-        ))
-    
+    navigation_buttons = get_pagination_buttons(page, "advertisement_page")
     if navigation_buttons:
         keyboard.add(*navigation_buttons)
     
@@ -275,33 +260,17 @@ def get_advertisement_costs_keyboard(costs, page=0, per_page=5):
     return keyboard.as_markup()
 
 # Клавиатура для прочих расходов
-def get_other_costs_keyboard(costs, page=0, per_page=5):
+def get_other_costs_keyboard(page):
     keyboard = InlineKeyboardBuilder()
     
-    start_idx = page * per_page
-    end_idx = start_idx + per_page
-    paginated_costs = costs[start_idx:end_idx]
-    
-    for cost in paginated_costs:
+    for cost in page['items']:
         keyboard.add(InlineKeyboardButton(
             text=f"${cost['amount']} - {cost['description'][:30]}",
             callback_data=f"other_cost_detail_{cost['id']}"
         ))
     
     # Пагинация
-    navigation_buttons = []
-    if page > 0:
-        navigation_buttons.append(InlineKeyboardButton(
-            text="⬅️ Назад", 
-            callback_data=f"other_costs_page_{page-1}"
-        ))
-    
-    if end_idx < len(costs):
-        navigation_buttons.append(InlineKeyboardButton(
-            text="Вперед ➡️", 
-            callback_data=f"other_costs_page_{page+1}"
-        ))
-    
+    navigation_buttons = get_pagination_buttons(page, "other_costs_page")
     if navigation_buttons:
         keyboard.add(*navigation_buttons)
     
@@ -1,26 +1,115 @@
 import asyncio
-import logging
-from aiogram import Bot, Dispatcher
+import signal
+from aiogram import Bot
 from aiogram.fsm.storage.memory import MemoryStorage
 from config.settings import settings
-from handlers.rental_handler import router as rental_router
-from handlers.admin_handler import router as admin_router
+from utils.log import LogContextMiddleware, parse_sampling, setup_logging
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+# Модуль импортируется заново в каждом процессе пула отчетов (spawn),
+# поэтому база, очереди и логирование создаются только при запуске бота
+
+def get_stop_event() -> asyncio.Event:
+    """Событие остановки по SIGINT/SIGTERM (в режиме polling сигналы обрабатывает aiogram)"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: остановка по KeyboardInterrupt
+            pass
+    return stop_event
 
 async def main():
+    from database.async_db import async_db
+    from database.write_queue import rental_queue
+    from database.fsm_storage import SQLiteStorage
+    from utils.report_store import report_store
+    from utils.report_pool import report_pool
+    from utils.webhook import run_webhook
+    from utils.scheduler import UpdateScheduler, ScheduledDispatcher
+    from utils.metrics import metrics
+    from utils.metrics_server import MetricsServer, instrument_router
+    from handlers.rental_handler import router as rental_router
+    from handlers.admin_handler import router as admin_router
+    
     # Инициализация бота и диспетчера
     bot = Bot(token=settings.BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    if settings.FSM_STORAGE == 'memory':
+        storage = MemoryStorage()
+    else:
+        storage = SQLiteStorage(
+            async_db,
+            state_ttl=settings.FSM_STATE_TTL_HOURS * 3600,
+            flush_interval=settings.FSM_FLUSH_INTERVAL
+        )
+    # Параллельная обработка обновлений с сохранением порядка внутри чата
+    scheduler = UpdateScheduler(
+        max_concurrency=settings.UPDATE_MAX_CONCURRENCY,
+        max_pending=settings.UPDATE_MAX_PENDING
+    )
+    dp = ScheduledDispatcher(storage=storage, scheduler=scheduler)
     
     # Регистрация роутеров
     dp.include_router(rental_router)
     dp.include_router(admin_router)
     
+    # Метрики: время обработчиков и запросов, состояние пулов и очередей
+    instrument_router(rental_router)
+    instrument_router(admin_router)
+    # Имя обработчика, чат и пользователь во всех записях лога во время обработки
+    log_middleware = LogContextMiddleware()
+    instrument_router(rental_router, log_middleware)
+    instrument_router(admin_router, log_middleware)
+    metrics.register_stats('bot_db_pool', async_db.database.pool.get_stats)
+    metrics.register_stats('bot_db_cache', async_db.database.cache.get_stats)
+    metrics.register_stats('bot_rental_queue', rental_queue.get_stats)
+    metrics.register_stats('bot_report_pool', report_pool.get_stats)
+    metrics.register_stats('bot_report_store', report_store.get_stats)
+    metrics.register_stats('bot_scheduler', scheduler.get_stats)
+    if isinstance(storage, SQLiteStorage):
+        metrics.register_stats('bot_fsm_storage', storage.get_stats)
+    metrics_server = MetricsServer()
+    if settings.METRICS_PORT:
+        await metrics_server.start(settings.METRICS_HOST, settings.METRICS_PORT)
+    
+    # Фоновая очистка старых отчетов
+    report_store.start()
+    
     # Запуск бота
-    await dp.start_polling(bot)
+    try:
+        if settings.BOT_MODE == 'webhook':
+            await run_webhook(
+                dp, bot,
+                url=settings.WEBHOOK_URL,
+                path=settings.WEBHOOK_PATH,
+                secret=settings.WEBHOOK_SECRET,
+                host=settings.WEBHOOK_HOST,
+                port=settings.WEBHOOK_PORT,
+                backlog=settings.WEBHOOK_BACKLOG,
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                stop_event=get_stop_event()
+            )
+        else:
+            # getUpdates не работает, пока у бота установлен вебхук
+            await bot.delete_webhook()
+            # Задачи создает планировщик; polling ждет, пока он примет обновление
+            await dp.start_polling(bot, handle_as_tasks=False)
+    finally:
+        # Принятые обновления дорабатываются при остановке диспетчера (emit_shutdown)
+        await metrics_server.close()
+        await report_store.close()
+        report_pool.close()
+        await rental_queue.close()
+        # Несохраненные состояния FSM записываются до закрытия базы
+        await storage.close()
+        async_db.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # Логирование настраивается до подключения к базе, чтобы в лог попали миграции.
+    # Записи выводит отдельный поток, поэтому вывод не блокирует цикл событий
+    log_listener = setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, parse_sampling(settings.LOG_SAMPLING))
+    try:
+        asyncio.run(main())
+    finally:
+        log_listener.stop()
\ No newline at end of file
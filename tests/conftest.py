@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Настройки читаются из окружения при импорте config.settings
+os.environ.setdefault('ADMIN_IDS', '1')
+os.environ.setdefault('BOT_TOKEN', '123456:test-token')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Модули бота создают rentals.db и каталог отчетов в текущем каталоге при импорте
+os.chdir(tempfile.mkdtemp(prefix='bot_tests_'))
@@ -0,0 +1,73 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from database.aggregates import main as aggregates_main
+from database.models import Database
+from utils.periods import DB_FORMAT, resolve_period
+
+
+def make_rental(i: int) -> dict:
+    return {
+        'server': f'Server {i % 2}',
+        'character': f'Character_{i}',
+        'transport': 'Sultan',
+        'license_plate': f'AB{i % 3}',
+        'price': 100.0 * (i + 1),
+        'duration': '2 ч.',
+        'renter': f'Renter_{i}'
+    }
+
+
+def make_database(name: str) -> Database:
+    database = Database(name, pool_size=1, cache_ttl=0)
+    for i in range(4):
+        database.add_rental(make_rental(i))
+    car_id = database.get_all_cars()[0]['id']
+    database.add_maintenance(car_id, 50, 'Масло')
+    database.add_maintenance(car_id, 70, 'Шины')
+    database.add_advertisement_cost(30, 'Баннер')
+    database.add_other_cost(20, 'Аренда гаража')
+    database.add_other_cost(5, 'Штраф')
+    return database
+
+
+def test_expense_writes_update_expense_aggregate():
+    database = make_database('aggregates_writes.db')
+    with database.pool.connection() as conn:
+        conn.execute('DELETE FROM other_costs WHERE amount = 5')
+        rows = {
+            (row['category']): (row['count'], row['amount'])
+            for row in conn.execute('SELECT category, SUM(count) AS count, SUM(amount) AS amount '
+                                    'FROM stats_expenses GROUP BY category')
+        }
+    assert rows == {'maintenance': (2, 120.0), 'advertisement': (1, 30.0), 'other_costs': (1, 20.0)}
+    assert database.verify_aggregates()['drift'] == []
+    assert database.get_other_costs_total() == 20.0
+    database.close()
+
+
+def test_period_snapshot_matches_source_tables():
+    database = make_database('aggregates_snapshot.db')
+    period = resolve_period('7d')
+    # Та же граница, сдвинутая на секунду, считается по исходным таблицам
+    end = datetime.strptime(period.end, DB_FORMAT) - timedelta(seconds=1)
+    from_rollups = database.get_financial_snapshot(period.start, period.end)
+    from_sources = database.get_financial_snapshot(period.start, end.strftime(DB_FORMAT))
+    assert from_rollups == from_sources
+    assert from_rollups.rental_income == 1000.0 and from_rollups.total_rentals == 4
+    assert (from_rollups.maintenance, from_rollups.advertisement, from_rollups.other_costs) == (120.0, 30.0, 25.0)
+    assert database.get_financial_snapshot() == from_rollups
+    database.close()
+
+
+def test_verify_command_repairs_expense_drift(capsys):
+    make_database('aggregates_cli.db').close()
+    conn = sqlite3.connect('aggregates_cli.db')
+    conn.execute("UPDATE stats_expenses SET amount = 0 WHERE category = 'advertisement'")
+    conn.commit()
+    conn.close()
+
+    assert aggregates_main(['--verify', '--db', 'aggregates_cli.db']) == 1
+    assert aggregates_main(['--verify', '--repair', '--db', 'aggregates_cli.db']) == 0
+    assert aggregates_main(['--verify', '--db', 'aggregates_cli.db']) == 0
+    assert 'stats_expenses' in capsys.readouterr().out
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import threading
+import time
+
+from benchmarks.event_loop_latency import LOCK_HOLD, hold_write_lock, make_rental, ticker
+from database.async_db import AsyncDatabase
+from database.models import Database
+
+
+def test_blocked_write_does_not_stall_event_loop():
+    db_path = os.path.abspath('event_loop_latency.db')
+    async_db = AsyncDatabase(Database(db_path, pool_size=2, cache_ttl=0))
+
+    async def scenario():
+        lags = []
+        stop = asyncio.Event()
+        tick_task = asyncio.create_task(ticker(stop, lags))
+
+        # Сторонняя транзакция держит блокировку записи: add_rental ждет ее в потоке пула
+        started = threading.Event()
+        locker = threading.Thread(target=hold_write_lock, args=(db_path, started))
+        locker.start()
+        await asyncio.to_thread(started.wait)
+
+        begin = time.perf_counter()
+        saved = await async_db.add_rental(make_rental(1))
+        elapsed = time.perf_counter() - begin
+
+        stop.set()
+        await tick_task
+        locker.join()
+        return saved, elapsed, lags
+
+    try:
+        saved, elapsed, lags = asyncio.run(scenario())
+    finally:
+        async_db.close()
+
+    assert saved
+    # Запись действительно ждала блокировку
+    assert elapsed >= LOCK_HOLD / 2
+    # Пока запись ждала, цикл событий продолжал тикать (тик раз в 1 мс)
+    assert len(lags) >= 20
+    assert max(lags) < LOCK_HOLD / 2
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import threading
+
+import pytest
+
+from database.connection import ConnectionPool
+
+
+def test_pool_timeout_raises_descriptive_error():
+    pool = ConnectionPool(os.path.join(tempfile.mkdtemp(), 'pool.db'), max_size=1, timeout=0.05)
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.connection():
+            acquired.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    acquired.wait()
+    try:
+        with pytest.raises(TimeoutError, match='Нет свободного соединения'):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        holder.join()
+
+    # После освобождения соединение снова выдается
+    with pool.connection() as conn:
+        assert conn.execute('SELECT 1').fetchone()[0] == 1
+    assert pool.get_stats()['timeouts'] == 1
+    pool.close()
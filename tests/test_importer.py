@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+
+from database.models import Database
+from utils import importer
+
+RENTAL = (
+    'Сервер: {server}\n'
+    'Персонаж: Ivan_Petrov\n'
+    'Транспорт: Sultan\n'
+    'Номер транспорта: AB{server}\n'
+    'Цена: $1,000\n'
+    'Длительность: 2 часа\n'
+    'Арендатор: Petr_Ivanov\n'
+)
+
+
+def chat(name: str, servers, start: int):
+    return {
+        'name': name,
+        'type': 'private_group',
+        'messages': [
+            {
+                'id': start + index,
+                'type': 'message',
+                'date': '2024-01-05T14:03:22',
+                'date_unixtime': str(1704463402 + start + index),
+                'text': RENTAL.format(server=server)
+            }
+            for index, server in enumerate(servers)
+        ] + [{'id': start + 100, 'type': 'service', 'action': 'pin_message', 'text': ''}]
+    }
+
+
+def write_export(directory: str) -> str:
+    # Полная выгрузка Telegram Desktop: сообщения лежат в chats.list[*].messages
+    export = {
+        'about': 'export',
+        'chats': {'about': 'chats', 'list': [chat('Аренды 1', [1, 2], 0), chat('Аренды 2', [3], 1000)]}
+    }
+    path = os.path.join(directory, 'result.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(export, file, ensure_ascii=False, indent=1)
+    return path
+
+
+def test_json_export_reads_every_chat(monkeypatch):
+    path = write_export(tempfile.mkdtemp())
+    expected = [RENTAL.format(server=server) for server in (1, 2, 3)]
+
+    assert [text for text, _ in importer.iter_json_messages(path)] == expected
+
+    # Те же сообщения при разбиении файла на маленькие блоки
+    read_chunks = importer.read_chunks
+    monkeypatch.setattr(importer, 'read_chunks', lambda path: read_chunks(path, chunk_size=7))
+    assert [text for text, _ in importer.iter_json_messages(path)] == expected
+
+
+def test_import_writes_to_database_given_by_option():
+    directory = tempfile.mkdtemp()
+    path = write_export(directory)
+    db_path = os.path.join(directory, 'history.db')
+
+    assert importer.main([path, '--db', db_path]) == 0
+
+    database = Database(db_path, pool_size=1, cache_ttl=0)
+    try:
+        assert sorted(rental['server'] for rental in database.get_all_rentals()) == ['1', '2', '3']
+    finally:
+        database.close()
@@ -0,0 +1,63 @@
+from benchmarks.parser_benchmark import legacy_parse, make_corpus
+from utils.parser import parse_rental_message
+
+MESSAGE = (
+    'Сервер: 5\n'
+    'Персонаж: Ivan_Petrov\n'
+    'Транспорт: Sultan\n'
+    'Номер транспорта: AB123\n'
+    'Цена: $2,000\n'
+    'Длительность: 3 часа\n'
+    'Арендатор: Petr_Ivanov\n'
+)
+
+
+def test_parses_all_fields():
+    assert parse_rental_message(MESSAGE) == {
+        'server': '5',
+        'character': 'Ivan_Petrov',
+        'transport': 'Sultan',
+        'license_plate': 'AB123',
+        'price': 2000.0,
+        'duration': '3 часа',
+        'renter': 'Petr_Ivanov'
+    }
+
+
+def test_empty_field_does_not_take_next_line():
+    text = MESSAGE.replace('Сервер: 5', 'Сервер:')
+    assert parse_rental_message(text) is None
+
+
+def test_empty_field_keeps_next_label():
+    # Пустое поле не должно поглощать подпись следующей строки
+    text = MESSAGE.replace('Сервер: 5\n', 'Сервер:\n') + 'Сервер: 7\n'
+    result = parse_rental_message(text)
+    assert result is not None
+    assert result['server'] == '7'
+    assert result['character'] == 'Ivan_Petrov'
+
+
+def test_empty_field_with_trailing_whitespace_is_rejected():
+    assert parse_rental_message(MESSAGE.replace('Сервер: 5', 'Сервер: ')) is None
+    assert parse_rental_message(MESSAGE.replace('Арендатор: Petr_Ivanov', 'Арендатор: \t')) is None
+
+
+# Битые и нестандартные сообщения, на которых результат должен совпадать с прежним парсером
+MALFORMED = [
+    MESSAGE.replace('$2,000', 'abc'),
+    MESSAGE.replace('$2,000', '$'),
+    MESSAGE.replace('$2,000', '2 000'),
+    MESSAGE.replace('\n', ' '),
+    MESSAGE.replace('\n', ' ', 3),
+    MESSAGE.replace('AB123', 'ab123'),
+    MESSAGE.replace('Номер транспорта: ', 'Номер транспорта: x'),
+    MESSAGE + 'Сервер: 9\n',
+    'Сервер: 5',
+    '',
+]
+
+
+def test_matches_legacy_parser_on_benchmark_corpus():
+    for text in make_corpus(2000) + MALFORMED:
+        assert parse_rental_message(text) == legacy_parse(text), text
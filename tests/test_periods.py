@@ -0,0 +1,93 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.models import Database
+from utils.periods import DB_FORMAT, resolve_period, utc_now
+
+
+@pytest.fixture
+def vladivostok_time(monkeypatch):
+    """Сервер в часовом поясе UTC+10"""
+    monkeypatch.setenv('TZ', 'Asia/Vladivostok')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def stored_dates(database: Database):
+    with database.pool.connection() as conn:
+        return [
+            conn.execute('SELECT purchase_date FROM cars').fetchone()[0],
+            conn.execute('SELECT maintenance_date FROM maintenance').fetchone()[0],
+            conn.execute('SELECT advertisement_date FROM advertisement_costs').fetchone()[0],
+            conn.execute('SELECT cost_date FROM other_costs').fetchone()[0],
+        ]
+
+
+def test_operation_dates_are_written_in_utc(vladivostok_time):
+    database = Database('periods_utc.db', pool_size=1, cache_ttl=0)
+    database.add_car('Sultan', 'AB1', 1000)
+    database.add_maintenance(database.get_all_cars()[0]['id'], 50, 'Масло')
+    database.add_advertisement_cost(30, 'Баннер')
+    database.add_other_cost(20, 'Гараж')
+
+    now = utc_now()
+    for value in stored_dates(database):
+        assert abs(datetime.strptime(value, DB_FORMAT) - now) < timedelta(minutes=1)
+
+    # Границы "сегодня" в UTC: расходы попадают в период вместе с арендами
+    today = resolve_period('today', now)
+    snapshot = database.get_financial_snapshot(*today.key)
+    assert (snapshot.maintenance, snapshot.advertisement, snapshot.other_costs, snapshot.car_costs) == (
+        50.0, 30.0, 20.0, 1000.0
+    )
+    database.close()
+
+
+def test_migration_converts_local_dates_to_utc(vladivostok_time):
+    database = Database('periods_migration.db', pool_size=1, cache_ttl=0)
+    database.add_advertisement_cost(30, 'Баннер')
+    database.close()
+
+    # База до миграции 12: дата записана по местному времени
+    conn = sqlite3.connect('periods_migration.db')
+    conn.execute("UPDATE advertisement_costs SET advertisement_date = '2024-05-01 05:00:00'")
+    conn.execute('PRAGMA user_version = 11')
+    conn.commit()
+    conn.close()
+
+    database = Database('periods_migration.db', pool_size=1, cache_ttl=0)
+    with database.pool.connection() as conn:
+        assert conn.execute('SELECT advertisement_date FROM advertisement_costs').fetchone()[0] == \
+            '2024-04-30 19:00:00'
+    assert database.verify_aggregates()['drift'] == []
+    database.close()
+
+
+@pytest.fixture
+def los_angeles_time(monkeypatch):
+    """Сервер в часовом поясе позади UTC"""
+    monkeypatch.setenv('TZ', 'America/Los_Angeles')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_rollup_series_ends_with_current_utc_bucket(los_angeles_time):
+    database = Database('periods_series.db', pool_size=1, cache_ttl=0)
+    database.add_rental({
+        'server': '1', 'character': 'A', 'transport': 'Sultan', 'license_plate': 'AB1',
+        'price': 100, 'duration': '2 ч.', 'renter': 'B'
+    })
+    database.add_advertisement_cost(30, 'Баннер')
+
+    series = database.get_rollup_series('hour')
+    # Доход и расход текущего часа в одной последней корзине
+    assert series[-1]['bucket'] == utc_now().strftime('%Y-%m-%d %H:00')
+    assert (series[-1]['income'], series[-1]['expenses']) == (100, 30)
+    database.close()
@@ -0,0 +1,56 @@
+import asyncio
+
+from database.write_queue import RentalWriteQueue
+
+
+class BlockingDatabase:
+    """Сохраняет пакеты аренд только после release.set()"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.batches = []
+
+    async def add_rentals(self, rentals):
+        await self.release.wait()
+        self.batches.append(len(rentals))
+        return [True] * len(rentals)
+
+
+def test_submit_waits_for_room_when_queue_is_full():
+    async def run():
+        database = BlockingDatabase()
+        queue = RentalWriteQueue(database, max_batch=1, max_delay=0, max_pending=2)
+        tasks = [asyncio.create_task(queue.submit({'id': index})) for index in range(6)]
+        await asyncio.sleep(0.01)
+        # Одна аренда в записи, две в очереди, остальные ждут места
+        pending = queue.get_stats()['pending']
+        database.release.set()
+        results = await asyncio.gather(*tasks)
+        await queue.close()
+        return pending, results, database.batches
+
+    pending, results, batches = asyncio.run(run())
+    assert pending == 2
+    assert results == [True] * 6
+    assert sum(batches) == 6
+
+
+def test_worker_failure_fails_pending_submits():
+    async def run():
+        database = BlockingDatabase()
+        queue = RentalWriteQueue(database, max_batch=1, max_delay=0, max_pending=2)
+        tasks = [asyncio.create_task(queue.submit({'id': index})) for index in range(3)]
+        await asyncio.sleep(0.01)
+        queue._worker.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Следующая аренда запускает задачу записи заново
+        database.release.set()
+        saved = await queue.submit({'id': 3})
+        await queue.close()
+        return results, saved, queue.get_stats()
+
+    results, saved, stats = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert saved is True
+    assert stats['worker_failures'] == 1
@@ -0,0 +1,142 @@
+from html import escape
+from typing import List, Sequence, Tuple
+
+# Графики для HTML отчетов в виде встроенного SVG: без JS-библиотек в каждом
+# файле отчета и без импорта matplotlib в процессе бота. Координаты считаются
+# один раз на весь ряд, каждый ряд выводится одним элементом (polyline / path),
+# поэтому размер графика почти не зависит от числа точек.
+
+WIDTH = 760
+PAD_LEFT = 70
+PAD_RIGHT = 20
+PAD_TOP = 20
+PAD_BOTTOM = 40
+
+PALETTE = ['#27ae60', '#e74c3c', '#3498db', '#f39c12', '#9b59b6', '#1abc9c', '#34495e', '#e67e22']
+
+# Сколько столбцов выводится в столбчатой диаграмме, остальное объединяется в "Другие"
+MAX_BARS = 12
+
+FONT = 'font-family="Segoe UI, Tahoma, sans-serif" font-size="11" fill="#555"'
+
+
+def format_amount(value: float) -> str:
+    """Короткая подпись суммы: 1.2K, 3.4M"""
+    value = float(value)
+    for limit, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if abs(value) >= limit:
+            return f'${value / limit:.1f}{suffix}'
+    return f'${value:.0f}'
+
+
+def _svg(height: int, body: List[str]) -> str:
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {height}" '
+        f'width="100%" style="max-width:{WIDTH}px">' + ''.join(body) + '</svg>'
+    )
+
+
+def line_chart(labels: Sequence[str], series: Sequence[Tuple[str, str, Sequence[float]]],
+               height: int = 240) -> str:
+    """
+    Линейный график нескольких рядов с общей осью X.
+    series - список (название, цвет, значения), значения выровнены по labels.
+    """
+    count = len(labels)
+    if not count or not series:
+        return ''
+
+    plot_width = WIDTH - PAD_LEFT - PAD_RIGHT
+    plot_height = height - PAD_TOP - PAD_BOTTOM
+    bottom = PAD_TOP + plot_height
+    top_value = max((max(values, default=0) for _, _, values in series), default=0) or 1
+    scale = plot_height / top_value
+    step = plot_width / max(count - 1, 1)
+
+    # Координаты X общие для всех рядов
+    xs = [f'{PAD_LEFT + index * step:.1f}' for index in range(count)]
+
+    body = [
+        f'<line x1="{PAD_LEFT}" y1="{bottom}" x2="{WIDTH - PAD_RIGHT}" y2="{bottom}" stroke="#ccc"/>',
+        f'<line x1="{PAD_LEFT}" y1="{PAD_TOP}" x2="{WIDTH - PAD_RIGHT}" y2="{PAD_TOP}" stroke="#eee"/>',
+        f'<text x="{PAD_LEFT - 6}" y="{PAD_TOP + 4}" text-anchor="end" {FONT}>{format_amount(top_value)}</text>',
+        f'<text x="{PAD_LEFT - 6}" y="{bottom + 4}" text-anchor="end" {FONT}>$0</text>',
+    ]
+
+    for name, color, values in series:
+        points = ' '.join(
+            f'{x},{bottom - max(value, 0) * scale:.1f}' for x, value in zip(xs, values)
+        )
+        body.append(f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{points}"/>')
+
+    # Подписи оси X: первая, средняя и последняя корзины
+    for index in sorted({0, count // 2, count - 1}):
+        anchor = 'start' if index == 0 else 'end' if index == count - 1 else 'middle'
+        body.append(
+            f'<text x="{xs[index]}" y="{bottom + 16}" text-anchor="{anchor}" {FONT}>{escape(labels[index])}</text>'
+        )
+
+    # Легенда
+    x = PAD_LEFT
+    for name, color, _ in series:
+        body.append(f'<rect x="{x}" y="{height - 14}" width="10" height="10" fill="{color}"/>')
+        body.append(f'<text x="{x + 14}" y="{height - 5}" {FONT}>{escape(name)}</text>')
+        x += 20 + 7 * len(name)
+
+    return _svg(height, body)
+
+
+def bar_chart(items: Sequence[Tuple[str, float]], color: str = PALETTE[2], row_height: int = 22) -> str:
+    """Горизонтальная столбчатая диаграмма (подпись, значение), по убыванию значения"""
+    items = sorted(items, key=lambda item: item[1], reverse=True)
+    if len(items) > MAX_BARS:
+        rest = sum(value for _, value in items[MAX_BARS - 1:])
+        items = items[:MAX_BARS - 1] + [('Другие', rest)]
+    if not items:
+        return ''
+
+    label_width = 130
+    plot_width = WIDTH - label_width - 90
+    height = len(items) * row_height + 10
+    top_value = max(value for _, value in items) or 1
+    scale = plot_width / top_value
+    bar_height = row_height - 6
+
+    # Все столбцы - один path
+    path = ''.join(
+        f'M{label_width},{5 + index * row_height}h{max(value, 0) * scale:.1f}v{bar_height}H{label_width}z'
+        for index, (_, value) in enumerate(items)
+    )
+    body = [f'<path d="{path}" fill="{color}"/>']
+    for index, (label, value) in enumerate(items):
+        y = 5 + index * row_height + bar_height - 4
+        body.append(
+            f'<text x="{label_width - 6}" y="{y}" text-anchor="end" {FONT}>{escape(str(label)[:20])}</text>'
+            f'<text x="{label_width + max(value, 0) * scale + 6:.1f}" y="{y}" {FONT}>{format_amount(value)}</text>'
+        )
+    return _svg(height, body)
+
+
+def breakdown_chart(items: Sequence[Tuple[str, float]], height: int = 70) -> str:
+    """Структура суммы: одна полоса, разделенная на доли, с легендой"""
+    items = [(label, value) for label, value in items if value > 0]
+    total = sum(value for _, value in items)
+    if not total:
+        return ''
+
+    plot_width = WIDTH - PAD_RIGHT
+    body = []
+    x = 0.0
+    legend_x = 0
+    for index, (label, value) in enumerate(items):
+        color = PALETTE[(index + 1) % len(PALETTE)]
+        width = value / total * plot_width
+        body.append(f'<rect x="{x:.1f}" y="0" width="{width:.1f}" height="28" fill="{color}"/>')
+        x += width
+
+        caption = f'{label}: {value / total * 100:.1f}%'
+        body.append(f'<rect x="{legend_x}" y="{height - 24}" width="10" height="10" fill="{color}"/>')
+        body.append(f'<text x="{legend_x + 14}" y="{height - 15}" {FONT}>{escape(caption)}</text>')
+        legend_x += 30 + 7 * len(caption)
+
+    return _svg(height, body)
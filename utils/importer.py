@@ -0,0 +1,340 @@
+"""
+Импорт исторических аренд из выгрузок чатов Telegram.
+
+Поддерживаются выгрузки Telegram Desktop в JSON (result.json) и HTML
+(messages*.html), а также простой текстовый лог, где сообщения разделены
+пустыми строками. Файл читается потоково блоками фиксированного размера,
+поэтому потребление памяти не зависит от размера выгрузки.
+
+Запуск: python -m utils.importer <файл> [<файл> ...] [--format json|html|text] [--batch-size N]
+        [--db rentals.db]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from database.models import Database
+from utils.parser import parse_rental_message
+from utils.periods import DB_FORMAT
+
+CHUNK_SIZE = 1024 * 1024
+BATCH_SIZE = 5000
+
+# Начало массива сообщений чата и сколько символов конца блока хранится при его поиске
+MESSAGES_START = re.compile(r'"messages"\s*:\s*\[')
+MESSAGES_START_TAIL = 256
+
+# Сообщение выгрузки: (текст, дата UTC в формате БД или None)
+Message = Tuple[str, Optional[str]]
+
+
+def to_db_date(moment: datetime) -> str:
+    """Дата в формате БД по UTC, как CURRENT_TIMESTAMP в SQLite"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime(DB_FORMAT)
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Чтение файла блоками фиксированного размера"""
+    with open(path, 'r', encoding='utf-8') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _json_text(text: Any) -> str:
+    """Текст сообщения JSON-выгрузки: строка или список строк и сущностей"""
+    if isinstance(text, str):
+        return text
+    return ''.join(part if isinstance(part, str) else part.get('text', '') for part in text)
+
+
+def iter_json_messages(path: str) -> Iterator[Message]:
+    """
+    Потоковый разбор result.json: элементы массивов "messages" декодируются
+    по одному через raw_decode, в памяти держится только текущий блок.
+    В выгрузке одного чата массив один, в полной выгрузке - по массиву
+    на каждый чат из chats.list (и left_chats.list).
+    """
+    decoder = json.JSONDecoder()
+    chunks = read_chunks(path)
+    buffer = ''
+    pos = 0
+
+    while True:
+        # Ищем начало следующего массива сообщений
+        match = MESSAGES_START.search(buffer, pos)
+        if match is None:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            # Хвост блока оставляем: ключ может оказаться на границе блоков
+            buffer = buffer[max(pos, len(buffer) - MESSAGES_START_TAIL):] + chunk
+            pos = 0
+            continue
+        pos = match.end()
+
+        while True:
+            # Пропускаем разделители между элементами
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                pos += 1
+                break
+
+            try:
+                if pos >= len(buffer):
+                    raise ValueError('buffer exhausted')
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # Элемент не поместился в буфер: дочитываем следующий блок
+                chunk = next(chunks, None)
+                if chunk is None:
+                    if buffer[pos:].strip():
+                        raise ValueError(f'Файл {path} обрывается посреди сообщения')
+                    return
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            pos = end
+            if isinstance(item, dict) and item.get('type', 'message') == 'message':
+                yield _json_text(item.get('text', '')), _json_date(item)
+
+
+def _json_date(item: Dict[str, Any]) -> Optional[str]:
+    """
+    Дата сообщения JSON-выгрузки. Поле date записано в часовом поясе
+    экспортировавшего без смещения, поэтому берется date_unixtime
+    (есть в выгрузках новых версий Telegram Desktop)
+    """
+    unixtime = item.get('date_unixtime')
+    if unixtime is not None:
+        try:
+            return to_db_date(datetime.fromtimestamp(int(unixtime), timezone.utc))
+        except (TypeError, ValueError, OverflowError, OSError):
+            pass
+    date = item.get('date')
+    return date.replace('T', ' ') if date else None
+
+
+class _TelegramHTMLParser(HTMLParser):
+    """
+    Разбор HTML-выгрузки Telegram Desktop: из каждого div.message
+    берутся текст (div.text) и дата (title у div.date).
+    Готовые сообщения накапливаются в self.messages до вызова drain().
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.messages: List[Message] = []
+        self._date: Optional[str] = None
+        self._text_parts: List[str] = []
+        self._text_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._text_depth:
+            if tag == 'br':
+                self._text_parts.append('\n')
+            elif tag == 'div':
+                self._text_depth += 1
+            return
+
+        if tag != 'div':
+            return
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if 'message' in classes:
+            self._flush()
+        elif 'date' in classes and attrs.get('title'):
+            self._date = self._parse_date(attrs['title'])
+        elif 'text' in classes:
+            self._text_depth = 1
+
+    def handle_endtag(self, tag):
+        if self._text_depth and tag == 'div':
+            self._text_depth -= 1
+
+    def handle_data(self, data):
+        if self._text_depth:
+            self._text_parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def drain(self) -> List[Message]:
+        messages, self.messages = self.messages, []
+        return messages
+
+    def _flush(self):
+        if self._text_parts:
+            self.messages.append((''.join(self._text_parts).strip(), self._date))
+        self._text_parts = []
+        self._date = None
+
+    @staticmethod
+    def _parse_date(title: str) -> Optional[str]:
+        # Формат выгрузки: "05.01.2024 14:03:22 UTC+03:00", дата переводится в UTC
+        try:
+            return to_db_date(datetime.strptime(title.strip(), '%d.%m.%Y %H:%M:%S UTC%z'))
+        except ValueError:
+            pass
+        # Старые выгрузки без смещения
+        try:
+            return to_db_date(datetime.strptime(title[:19], '%d.%m.%Y %H:%M:%S'))
+        except ValueError:
+            return None
+
+
+def iter_html_messages(path: str) -> Iterator[Message]:
+    """Потоковый разбор HTML-выгрузки"""
+    parser = _TelegramHTMLParser()
+    for chunk in read_chunks(path):
+        parser.feed(chunk)
+        yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+
+def iter_text_messages(path: str) -> Iterator[Message]:
+    """Текстовый лог: сообщения разделены пустыми строками, даты нет"""
+    lines: List[str] = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                lines.append(line)
+            elif lines:
+                yield ''.join(lines), None
+                lines = []
+    if lines:
+        yield ''.join(lines), None
+
+
+READERS = {
+    'json': iter_json_messages,
+    'html': iter_html_messages,
+    'text': iter_text_messages
+}
+
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        return 'json'
+    if extension in ('.html', '.htm'):
+        return 'html'
+    return 'text'
+
+
+def message_hash(text: str, date: Optional[str], position: Optional[str] = None) -> str:
+    """
+    Ключ дедупликации: одно и то же сообщение из разных выгрузок дает один хэш.
+    У сообщений без даты (текстовый лог) одинаковый текст не означает повтор,
+    поэтому в ключ входит позиция сообщения в файле
+    """
+    if date is None and position is not None:
+        return hashlib.sha1(f"{position}\n{text}".encode('utf-8')).hexdigest()
+    return hashlib.sha1(f"{date or ''}\n{text}".encode('utf-8')).hexdigest()
+
+
+class ImportStats:
+    """Счетчики импорта и пропускная способность"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.messages = 0
+        self.parsed = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.cars_created = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        elapsed = self.elapsed or 1e-9
+        return (
+            f"сообщений: {self.messages}, аренд: {self.parsed}, импортировано: {self.imported}, "
+            f"дубликатов: {self.duplicates}, новых автомобилей: {self.cars_created} | "
+            f"{elapsed:.1f} с, {self.messages / elapsed:,.0f} сообщений/с"
+        )
+
+
+def parse_messages(messages: Iterable[Message], stats: ImportStats,
+                   source: str = '') -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Разбор сообщений: остаются только аренды, дата сообщения становится датой аренды.
+    source - имя файла, для сообщений без даты ключ строится по имени и номеру сообщения
+    """
+    for index, (text, date) in enumerate(messages):
+        stats.messages += 1
+        rental_data = parse_rental_message(text)
+        if rental_data is None:
+            continue
+        stats.parsed += 1
+        if date:
+            rental_data['created_at'] = date
+        yield message_hash(text, date, f"{source}#{index}"), rental_data
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_file(database, path: str, file_format: Optional[str] = None,
+                batch_size: int = BATCH_SIZE, stats: Optional[ImportStats] = None) -> ImportStats:
+    """Импорт одного файла выгрузки пачками по batch_size аренд на транзакцию"""
+    stats = stats or ImportStats()
+    reader = READERS[file_format or detect_format(path)]
+
+    messages = parse_messages(reader(path), stats, os.path.basename(path))
+    for batch in batched(messages, batch_size):
+        result = database.import_rentals(batch)
+        stats.imported += result['imported']
+        stats.duplicates += result['duplicates']
+        stats.cars_created += result['cars_created']
+        print(f"{os.path.basename(path)}: {stats.summary()}")
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Импорт исторических аренд из выгрузок чатов')
+    parser.add_argument('files', nargs='+', help='Файлы выгрузки (JSON, HTML или текст)')
+    parser.add_argument('--format', choices=sorted(READERS), help='Формат файлов (по умолчанию по расширению)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Аренд в одной транзакции')
+    parser.add_argument('--db', default='rentals.db', help='Файл базы данных')
+    args = parser.parse_args(argv)
+
+    database = Database(args.db, pool_size=1, cache_ttl=0)
+    stats = ImportStats()
+    try:
+        for path in args.files:
+            import_file(database, path, args.format, args.batch_size, stats)
+    finally:
+        database.close()
+
+    print(f"Импорт завершен: {stats.summary()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
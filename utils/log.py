@@ -0,0 +1,198 @@
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+# Поля контекста текущего обработчика: handler, chat_id, user_id, plate
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar('log_context', default={})
+
+# Атрибуты, которые есть у любой LogRecord; остальные пришли через extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+handler_logger = logging.getLogger('handlers')
+
+
+def bind_log_context(**fields: Any) -> contextvars.Token:
+    """Добавляет поля в контекст логирования текущей задачи"""
+    return _context.set({**_context.get(), **fields})
+
+
+@contextmanager
+def log_context(**fields: Any):
+    """Поля контекста логирования на время блока"""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """Разбор настройки вида "database.models.rentals=0.1,aiogram.event=0.01" """
+    rates = {}
+    for item in value.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """Копирует контекст обработчика в запись в потоке, где она создана"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        if context:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживание болтливых логгеров: для логгера (и его потомков) с долей
+    rate пропускается каждая round(1 / rate)-я запись ниже WARNING.
+    Предупреждения и ошибки не прореживаются. В оставленную запись
+    добавляется sample_rate, чтобы при анализе можно было восстановить объем.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, Optional[Tuple[Any, int, float]]] = {}
+
+    def _sampler(self, name: str) -> Optional[Tuple[Any, int, float]]:
+        sampler = self._counters.get(name, False)
+        if sampler is not False:
+            return sampler
+        sampler = None
+        prefix = name
+        while prefix:
+            rate = self.rates.get(prefix)
+            if rate is not None:
+                every = round(1 / rate) if rate > 0 else 0
+                sampler = (itertools.count(), every, rate)
+                break
+            prefix = prefix.rpartition('.')[0]
+        self._counters[name] = sampler
+        return sampler
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        sampler = self._sampler(record.name)
+        if sampler is None:
+            return True
+        counter, every, rate = sampler
+        if every == 0 or next(counter) % every:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Постановка записи в очередь без форматирования: сообщение и трассировка
+    превращаются в строки, а JSON собирается в потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON: время, уровень, логгер, сообщение, контекст и extra-поля"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = 'INFO', fmt: str = 'json',
+                  sampling: Optional[Dict[str, float]] = None) -> logging.handlers.QueueListener:
+    """
+    Настройка логирования: записи ставятся в очередь, а форматирование и
+    запись в stdout выполняет отдельный поток QueueListener, поэтому цикл
+    событий не блокируется на выводе. Возвращает запущенный listener,
+    при остановке бота его нужно остановить (stop), чтобы дописать очередь.
+    """
+    stream = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware роутера: имя обработчика, чат и пользователь
+    попадают во все записи, сделанные во время обработки (в том числе
+    из потоков базы данных), а по завершении пишется запись с длительностью.
+    """
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        handler_object = data.get('handler')
+        chat = data.get('event_chat')
+        user = data.get('event_from_user')
+        token = bind_log_context(
+            handler=getattr(handler_object.callback, '__name__', None) if handler_object else None,
+            chat_id=chat.id if chat else None,
+            user_id=user.id if user else None
+        )
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            if handler_logger.isEnabledFor(logging.DEBUG):
+                handler_logger.debug(
+                    "Обработка завершена",
+                    extra={'duration_ms': round((time.perf_counter() - started) * 1000, 3)}
+                )
+            _context.reset(token)
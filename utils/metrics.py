@@ -0,0 +1,273 @@
+import functools
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм длительностей, секунды
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Границы корзин размеров, байты
+SIZE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class CounterChild:
+    """Значение счетчика для одного набора меток"""
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class HistogramChild:
+    """
+    Гистограмма для одного набора меток. Корзины выделяются при создании,
+    наблюдение только увеличивает счетчик корзины и сумму.
+    """
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя корзина - значения больше всех границ (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric:
+    """Общая часть счетчиков и гистограмм: набор значений по меткам"""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """
+        Значение для набора меток. Результат стоит получить один раз и
+        сохранить: повторный поиск по меткам на горячем пути не нужен.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'{self.name}: ожидались метки {self.labelnames}')
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        """Увеличение счетчика без меток"""
+        self.labels().inc(amount)
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}'
+            for key, child in self._items()
+        ]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = TIME_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """Наблюдение для гистограммы без меток"""
+        self.labels().observe(value)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """Текущие (число наблюдений, сумма) по наборам меток"""
+        result = {}
+        for key, child in self._items():
+            with child._lock:
+                result[key] = (sum(child.counts), child.sum)
+        return result
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        bucket_labels = self.labelnames + ('le',)
+        for key, child in self._items():
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(bucket_labels, key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик бота в текстовом формате Prometheus.
+    Кроме счетчиков и гистограмм в выдачу попадают числовые поля get_stats()
+    зарегистрированных компонентов (пул соединений, кэш, очереди) как gauge.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._stats: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = TIME_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_stats(self, prefix: str, get_stats: Callable[[], Dict[str, Any]]):
+        """Числовые поля get_stats() публикуются как gauge <prefix>_<поле>"""
+        self._stats[prefix] = get_stats
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            stats = list(self._stats.items())
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        for prefix, get_stats in stats:
+            try:
+                values = get_stats()
+            except Exception as e:
+                logger.error("Ошибка получения метрик %s: %s", prefix, e)
+                continue
+            for field, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f'{prefix}_{field}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Глобальный реестр метрик
+metrics = MetricsRegistry()
+
+DB_QUERY_SECONDS = metrics.histogram(
+    'bot_db_query_seconds', 'Время выполнения методов Database', ('method',)
+)
+HANDLER_SECONDS = metrics.histogram(
+    'bot_handler_seconds', 'Время работы обработчиков сообщений и кнопок', ('handler',)
+)
+HANDLER_ERRORS = metrics.counter(
+    'bot_handler_errors_total', 'Исключения в обработчиках', ('handler',)
+)
+PARSER_MESSAGES = metrics.counter(
+    'bot_parser_messages_total', 'Разобранные сообщения об аренде', ('result',)
+)
+REPORT_SECONDS = metrics.histogram(
+    'bot_report_build_seconds', 'Время построения HTML отчета'
+)
+REPORT_BYTES = metrics.histogram(
+    'bot_report_size_bytes', 'Размер сохраненного HTML отчета', buckets=SIZE_BUCKETS
+)
+
+
+def timed(histogram: Histogram, *labels: str) -> Callable:
+    """Замеряет время каждого вызова функции в гистограмме с фиксированными метками"""
+    def decorator(func: Callable) -> Callable:
+        child = histogram.labels(*labels)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def instrumented(histogram: Histogram) -> Callable:
+    """
+    Декоратор класса: оборачивает все публичные методы в timed(),
+    метка - имя метода. Метки разрешаются один раз при создании класса.
+    """
+    def decorator(cls: type) -> type:
+        for name, attribute in list(vars(cls).items()):
+            if name.startswith('_') or not inspect.isfunction(attribute):
+                continue
+            setattr(cls, name, timed(histogram, name)(attribute))
+        return cls
+    return decorator
+
@@ -0,0 +1,85 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+from aiogram import BaseMiddleware, Router
+from aiogram.types import TelegramObject
+
+from utils.metrics import MetricsRegistry, metrics, HANDLER_SECONDS, HANDLER_ERRORS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware роутера: время работы и исключения каждого обработчика.
+    Метки обработчика вычисляются при первом вызове и запоминаются.
+    """
+
+    def __init__(self):
+        self._children: Dict[Callable, tuple] = {}
+
+    def _children_for(self, callback: Callable) -> tuple:
+        children = self._children.get(callback)
+        if children is None:
+            name = getattr(callback, '__name__', repr(callback))
+            children = self._children[callback] = (HANDLER_SECONDS.labels(name), HANDLER_ERRORS.labels(name))
+        return children
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        handler_object = data.get('handler')
+        if handler_object is None:
+            return await handler(event, data)
+
+        seconds, errors = self._children_for(handler_object.callback)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - started)
+
+
+def instrument_router(router: Router, middleware: Optional[BaseMiddleware] = None):
+    """
+    Подключение middleware (по умолчанию замеров обработчиков) ко всем
+    типам событий роутера и его вложенных роутеров
+    """
+    middleware = middleware or HandlerMetricsMiddleware()
+    for name, observer in router.observers.items():
+        if name != 'error':
+            observer.middleware(middleware)
+    for sub_router in router.sub_routers:
+        instrument_router(sub_router, middleware)
+
+
+class MetricsServer:
+    """Локальный HTTP-эндпоинт /metrics в текстовом формате Prometheus"""
+
+    def __init__(self, registry: MetricsRegistry = metrics, path: str = '/metrics'):
+        self.registry = registry
+        self.path = path
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    async def start(self, host: str = '127.0.0.1', port: int = 9100):
+        app = web.Application()
+        app.router.add_get(self.path, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        logger.info("Метрики доступны на http://%s:%s%s", host, port, self.path)
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
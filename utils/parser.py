@@ -1,44 +1,82 @@
 import re
 from typing import Dict, Optional
 
+from utils.metrics import PARSER_MESSAGES
+
+# Поля сообщения: подпись в тексте -> ключ результата
+FIELDS = {
+    'Сервер': 'server',
+    'Персонаж': 'character',
+    'Транспорт': 'transport',
+    'Номер транспорта': 'license_plate',
+    'Цена': 'price',
+    'Длительность': 'duration',
+    'Арендатор': 'renter'
+}
+
+REQUIRED_FIELDS = tuple(FIELDS.values())
+
+# Одно регулярное выражение на все подписи: сообщение просматривается за один проход.
+# Совпадает только подпись, поэтому подписи внутри значения другого поля
+# (все поля в одной строке) тоже находятся, как и при поиске каждого поля отдельно
+LABEL_PATTERN = re.compile(
+    r'(' + '|'.join(re.escape(label) for label in FIELDS) + r'):'
+)
+
+# Значения полей после подписи. Текстовое значение берется до конца строки
+# и должно быть непустым: у пустого поля не захватывается следующая строка
+TEXT_PATTERN = re.compile(r'[ \t]*(\S.*)')
+LICENSE_PLATE_PATTERN = re.compile(r'[ \t]*([A-Z0-9]+)')
+# Цена разбирается как и прежде: пробельные символы после подписи и "$"
+# могут захватывать перевод строки, цена без цифр дает 0
+PRICE_PATTERN = re.compile(r'\s*\$?\s*([\d\s,]+)')
+DIGITS_PATTERN = re.compile(r'\d+')
+
+# Шаблон значения для каждого поля
+VALUE_PATTERNS = dict.fromkeys(FIELDS.values(), TEXT_PATTERN)
+VALUE_PATTERNS['license_plate'] = LICENSE_PLATE_PATTERN
+VALUE_PATTERNS['price'] = PRICE_PATTERN
+
+PARSED = PARSER_MESSAGES.labels('ok')
+NOT_PARSED = PARSER_MESSAGES.labels('failed')
+
+
+def parse_price(value: str) -> float:
+    """Преобразует цену вида "2 000", "$2,000" в число"""
+    # Убираем пробелы и запятые, затем преобразуем в число
+    price_cleaned = value.replace(' ', '').replace(',', '')
+    try:
+        return float(price_cleaned)
+    except ValueError:
+        # Если не удалось преобразовать (например, неразрывный пробел), извлекаем цифры
+        numbers = DIGITS_PATTERN.findall(value)
+        if numbers:
+            return float(''.join(numbers))
+        return 0
+
+
 def parse_rental_message(text: str) -> Optional[Dict]:
     """
     Парсит сообщение о аренде транспорта и возвращает структурированные данные
     """
-    patterns = {
-        'server': r'Сервер:\s*(.+)',
-        'character': r'Персонаж:\s*(.+)',
-        'transport': r'Транспорт:\s*(.+)',
-        'license_plate': r'Номер транспорта:\s*([A-Z0-9]+)',
-        'price': r'Цена:\s*\$?\s*([\d\s,]+)',
-        'duration': r'Длительность:\s*(.+)',
-        'renter': r'Арендатор:\s*(.+)'
-    }
-    
     result = {}
-    
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text)
-        if match:
-            result[key] = match.group(1).strip()
-    
-    # Преобразуем цену в число (исправляем проблему с пробелами)
-    if 'price' in result:
-        # Убираем пробелы и запятые, затем преобразуем в число
-        price_cleaned = result['price'].replace(' ', '').replace(',', '')
-        try:
-            result['price'] = float(price_cleaned)
-        except ValueError:
-            # Если не удалось преобразовать, попробуем извлечь цифры
-            numbers = re.findall(r'\d+', result['price'])
-            if numbers:
-                result['price'] = float(''.join(numbers))
-            else:
-                result['price'] = 0
+
+    for match in LABEL_PATTERN.finditer(text):
+        key = FIELDS[match.group(1)]
+        if key in result:
+            # Как и раньше, учитывается первое вхождение поля с подходящим значением
+            continue
+
+        value_match = VALUE_PATTERNS[key].match(text, match.end())
+        if value_match is None:
+            continue
+        value = value_match.group(1).strip()
+        result[key] = parse_price(value) if key == 'price' else value
     
     # Проверяем, что все обязательные поля найдены
-    required_fields = ['server', 'character', 'transport', 'license_plate', 'price', 'duration', 'renter']
-    if all(field in result for field in required_fields):
+    if len(result) == len(REQUIRED_FIELDS):
+        PARSED.inc()
         return result
-    
-    return None
\ No newline at end of file
+
+    NOT_PARSED.inc()
+    return None
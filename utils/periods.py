@@ -0,0 +1,82 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Формат дат в базе: CURRENT_TIMESTAMP SQLite, время UTC
+DB_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def utc_now() -> datetime:
+    """Текущее время UTC без часового пояса - в тех же часах, что CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def db_now() -> str:
+    """Текущее время для записи в колонки дат базы"""
+    return utc_now().strftime(DB_FORMAT)
+
+
+CUSTOM_PERIOD_PATTERN = re.compile(r'(\d{2}\.\d{2}\.\d{4})\s*[-–—]\s*(\d{2}\.\d{2}\.\d{4})')
+
+
+@dataclass(frozen=True)
+class Period:
+    """Отчетный период - полуинтервал [start, end) в формате дат базы"""
+    start: Optional[str] = None
+    end: Optional[str] = None
+    title: str = 'За все время'
+
+    @property
+    def is_all_time(self) -> bool:
+        return self.start is None and self.end is None
+
+    @property
+    def key(self):
+        return self.start, self.end
+
+
+ALL_TIME = Period()
+
+# Предустановленные периоды: код в callback -> количество дней (0 - только сегодня)
+PRESETS = {
+    'today': (0, 'Сегодня'),
+    '7d': (7, 'Последние 7 дней'),
+    '30d': (30, 'Последние 30 дней')
+}
+
+
+def resolve_period(code: str, now: Optional[datetime] = None) -> Period:
+    """Период по коду из меню отчетов; границы выравниваются по началу суток"""
+    if code not in PRESETS:
+        return ALL_TIME
+
+    days, title = PRESETS[code]
+    now = now or utc_now()
+    tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    start = tomorrow - timedelta(days=max(days, 1))
+    return Period(start.strftime(DB_FORMAT), tomorrow.strftime(DB_FORMAT), title)
+
+
+def parse_custom_period(text: str) -> Optional[Period]:
+    """
+    Разбор периода вида "01.05.2024 - 31.05.2024" (обе даты включительно).
+    Возвращает None, если формат неверный или начало позже конца.
+    """
+    match = CUSTOM_PERIOD_PATTERN.fullmatch(text.strip())
+    if not match:
+        return None
+
+    try:
+        start = datetime.strptime(match.group(1), '%d.%m.%Y')
+        last_day = datetime.strptime(match.group(2), '%d.%m.%Y')
+    except ValueError:
+        return None
+
+    if start > last_day:
+        return None
+
+    return Period(
+        start.strftime(DB_FORMAT),
+        (last_day + timedelta(days=1)).strftime(DB_FORMAT),
+        f'{match.group(1)} - {match.group(2)}'
+    )
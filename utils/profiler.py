@@ -0,0 +1,150 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+
+from utils.metrics import Histogram, DB_QUERY_SECONDS, HANDLER_SECONDS
+
+# Интервал опроса стеков по умолчанию, секунды (100 раз в секунду)
+SAMPLE_INTERVAL = 0.01
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик: отдельный поток раз в interval секунд
+    снимает стеки всех потоков процесса (цикл событий, потоки базы данных)
+    и считает одинаковые стеки. Работающий код не инструментируется,
+    поэтому накладные расходы не зависят от числа вызовов.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Dict[Tuple[int, Tuple[CodeType, ...]], int] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._remember_threads()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._remember_threads()
+
+    def _remember_threads(self):
+        for thread in threading.enumerate():
+            self._thread_names[thread.ident] = thread.name
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                key = (ident, self._walk(frame))
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self.samples += 1
+
+    @staticmethod
+    def _walk(frame: Optional[FrameType]) -> Tuple[CodeType, ...]:
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        return tuple(codes)
+
+    def collapsed(self) -> str:
+        """
+        Стеки в формате collapsed: "поток;функция;...;функция число".
+        Подходит для flamegraph.pl, speedscope и inferno.
+        """
+        labels: Dict[CodeType, str] = {}
+
+        def label(code: CodeType) -> str:
+            text = labels.get(code)
+            if text is None:
+                text = labels[code] = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            return text
+
+        lines = []
+        for (ident, codes), count in sorted(self._stacks.items(), key=lambda item: -item[1]):
+            frames = [self._thread_names.get(ident, f'thread-{ident}')]
+            frames.extend(label(code) for code in codes)
+            lines.append(f"{';'.join(frames)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+@dataclass
+class ProfileResult:
+    seconds: float
+    samples: int
+    # Стеки для flamegraph
+    collapsed: str
+    # Самые долгие методы Database и обработчики за время профилирования
+    top: List[Tuple[str, int, float]]
+
+    def format_top(self) -> str:
+        """Таблица: метка, вызовов, всего и в среднем, мс"""
+        lines = [f"{'Метод / обработчик':<48} {'Вызовов':>8} {'Всего, мс':>11} {'Среднее, мс':>12}"]
+        for name, calls, total in self.top:
+            lines.append(f"{name:<48} {calls:>8} {total * 1000:>11.1f} {total * 1000 / calls:>12.2f}")
+        return '\n'.join(lines)
+
+
+def _deltas(prefix: str, histogram: Histogram,
+            before: Dict[Tuple[str, ...], Tuple[int, float]]) -> List[Tuple[str, int, float]]:
+    rows = []
+    for key, (count, total) in histogram.snapshot().items():
+        start_count, start_total = before.get(key, (0, 0.0))
+        if count > start_count:
+            rows.append((f"{prefix}:{','.join(key)}", count - start_count, total - start_total))
+    return rows
+
+
+_profile_lock = threading.Lock()
+
+
+def profile_running() -> bool:
+    return _profile_lock.locked()
+
+
+async def run_profile(seconds: float, top: int = 15, interval: float = SAMPLE_INTERVAL) -> ProfileResult:
+    """
+    Профилирование работающего бота в течение seconds секунд:
+    стеки всех потоков и приращения гистограмм методов Database и обработчиков.
+    Одновременно выполняется только одно профилирование.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("Профилирование уже выполняется")
+    try:
+        db_before = DB_QUERY_SECONDS.snapshot()
+        handlers_before = HANDLER_SECONDS.snapshot()
+        sampler = StackSampler(interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+
+        rows = _deltas('db', DB_QUERY_SECONDS, db_before) + _deltas('handler', HANDLER_SECONDS, handlers_before)
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return ProfileResult(
+            seconds=time.perf_counter() - started,
+            samples=sampler.samples,
+            collapsed=await asyncio.to_thread(sampler.collapsed),
+            top=rows[:top]
+        )
+    finally:
+        _profile_lock.release()
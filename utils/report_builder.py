@@ -0,0 +1,207 @@
+import os
+from datetime import datetime
+from typing import Any, Dict
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from database.models import Database
+from utils.periods import Period, ALL_TIME, DB_FORMAT
+from utils.charts import line_chart, bar_chart, breakdown_chart, PALETTE
+
+# Модуль выполняется в процессах пула отчетов и не должен импортировать
+# глобальное состояние бота (database.async_db, хранилище и пул отчетов):
+# процесс открывает только собственное соединение с базой для чтения
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+# Сколько записей выводится в разделах отчета
+RECENT_RENTALS_LIMIT = 15
+RECENT_MAINTENANCE_LIMIT = 10
+
+# Периоды до TREND_DAILY_MAX_DAYS дней показываются в динамике по дням, длиннее - по месяцам
+TREND_DAILY_MAX_DAYS = 62
+
+# Размер буфера при потоковой записи отчета в файл
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# Шаблоны компилируются один раз на процесс; байткод кэшируется на диске
+# (во временном каталоге), поэтому после перезапуска они не разбираются заново
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=False
+)
+
+def write_stream(filename: str, stream) -> None:
+    """Запись сгенерированного шаблона в файл блоками по WRITE_BUFFER_SIZE"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        buffer = []
+        size = 0
+        for chunk in stream:
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= WRITE_BUFFER_SIZE:
+                f.write(''.join(buffer))
+                buffer = []
+                size = 0
+        if buffer:
+            f.write(''.join(buffer))
+
+# === ПОСТРОЕНИЕ ОТЧЕТА В ПРОЦЕССЕ ПУЛА ===
+
+# Соединения процесса-обработчика с базой, только для чтения
+_worker_databases: Dict[str, Database] = {}
+
+def get_worker_database(db_path: str) -> Database:
+    database = _worker_databases.get(db_path)
+    if database is None:
+        database = Database(db_path, pool_size=1, cache_ttl=0, read_only=True)
+        _worker_databases[db_path] = database
+    return database
+
+def build_html_report(db_path: str, filename: str, period: Period = ALL_TIME) -> str:
+    """Точка входа процесса-обработчика: собирает данные и рендерит отчет в файл"""
+    database = get_worker_database(db_path)
+    template = environment.get_template('full_report.html')
+    write_stream(filename, template.generate(collect_report_data(database, period)))
+    return filename
+
+def build_report_charts(trend, server_stats, expenses) -> Dict[str, str]:
+    """
+    SVG графики отчета. Отдельно не кэшируются: отчет по той же версии данных
+    и периоду повторно не строится (ReportCache в основном процессе)
+    """
+    labels = [point['bucket'] for point in trend]
+    return {
+        'trend': line_chart(labels, [
+            ('Доход', PALETTE[0], [point['income'] for point in trend]),
+            ('Расходы', PALETTE[1], [point['expenses'] for point in trend])
+        ]),
+        'servers': bar_chart([(server, data.get('income', 0)) for server, data in server_stats.items()]),
+        'expenses': breakdown_chart(expenses)
+    }
+
+def get_trend_granularity(period: Period) -> str:
+    """Гранулярность раздела динамики для периода отчета"""
+    if period.start is None or period.end is None:
+        return 'month'
+    start = datetime.strptime(period.start, DB_FORMAT)
+    end = datetime.strptime(period.end, DB_FORMAT)
+    return 'day' if (end - start).days <= TREND_DAILY_MAX_DAYS else 'month'
+
+def collect_report_data(database: Database, period: Period = ALL_TIME) -> Dict[str, Any]:
+    """Данные для шаблона отчета; доходы, расходы и списки ограничены периодом"""
+    start, end = period.key
+    
+    # Получаем только те записи, которые выводятся в отчете
+    rentals = database.get_recent_rentals(RECENT_RENTALS_LIMIT, start, end)
+    maintenance = database.get_recent_maintenance(RECENT_MAINTENANCE_LIMIT, start, end)
+    maintenance_count = database.get_maintenance_count(start, end)
+    
+    # Получаем финансовую статистику одним запросом
+    snapshot = database.get_financial_snapshot(start, end)
+    server_stats = database.get_server_stats(start, end)
+    transport_stats = database.get_transport_stats(start, end)
+    cars_stats = database.get_cars_stats()
+    
+    # Основная статистика
+    total_income = snapshot.rental_income
+    total_sales = snapshot.sales_income
+    total_revenue = snapshot.total_income
+    net_profit = snapshot.net_profit
+    profitability = snapshot.profitability
+    rentals_count = snapshot.total_rentals
+    
+    # Динамика доходов и расходов из временных рядов
+    trend_granularity = get_trend_granularity(period)
+    trend = database.get_rollup_series(trend_granularity, start=start, end=end)
+    
+    # Расходы
+    maintenance_total = snapshot.maintenance
+    advertisement_total = snapshot.advertisement
+    other_costs_total = snapshot.other_costs
+    car_costs_total = snapshot.car_costs
+    total_expenses = snapshot.total_expenses
+    
+    # Проценты расходов
+    maintenance_percent = snapshot.expense_percent(maintenance_total)
+    advertisement_percent = snapshot.expense_percent(advertisement_total)
+    other_costs_percent = snapshot.expense_percent(other_costs_total)
+    car_costs_percent = snapshot.expense_percent(car_costs_total)
+    expense_income_ratio = snapshot.expense_income_ratio
+    
+    # Статистика по автомобилям
+    total_cars = cars_stats.get('total_cars', 0)
+    status_stats = cars_stats.get('status_stats', {})
+    cars_total_income = cars_stats.get('total_income', 0)
+    cars_total_rentals = cars_stats.get('total_rentals', 0)
+    if not period.is_all_time:
+        # Счетчики в cars накоплены за все время, за период берем данные аренд
+        cars_total_income = snapshot.rental_income
+        cars_total_rentals = snapshot.total_rentals
+    
+    # Графики
+    charts = build_report_charts(trend, server_stats, [
+        ('Обслуживание', maintenance_total),
+        ('Реклама', advertisement_total),
+        ('Прочие', other_costs_total),
+        ('Автомобили', car_costs_total)
+    ])
+    
+    # Статистика по серверам
+    servers_income = 0
+    servers_count = 0
+    for server_data in server_stats.values():
+        servers_income += server_data.get('income', 0)
+        servers_count += server_data.get('count', 0)
+    
+    # Статистика по транспорту
+    transport_income = 0
+    transport_count = 0
+    for transport_data in transport_stats.values():
+        transport_income += transport_data.get('income', 0)
+        transport_count += transport_data.get('count', 0)
+    
+    return dict(
+        current_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        period_title=period.title,
+        # Основные метрики
+        total_income=total_income,
+        total_sales=total_sales,
+        total_revenue=total_revenue,
+        net_profit=net_profit,
+        profitability=profitability,
+        total_expenses=total_expenses,
+        expense_income_ratio=expense_income_ratio,
+        total_cars=total_cars,
+        cars_total_income=cars_total_income,
+        cars_total_rentals=cars_total_rentals,
+        
+        # Расходы
+        maintenance_total=maintenance_total,
+        advertisement_total=advertisement_total,
+        other_costs_total=other_costs_total,
+        car_costs_total=car_costs_total,
+        maintenance_percent=maintenance_percent,
+        advertisement_percent=advertisement_percent,
+        other_costs_percent=other_costs_percent,
+        car_costs_percent=car_costs_percent,
+        
+        # Статистика
+        server_stats=server_stats,
+        transport_stats=transport_stats,
+        status_stats=status_stats,
+        trend=trend,
+        trend_granularity=trend_granularity,
+        charts=charts,
+        
+        # Данные
+        rentals=rentals,
+        rentals_count=rentals_count,
+        maintenance=maintenance,
+        maintenance_count=maintenance_count,
+        
+        # Суммарные счетчики
+        servers_income=servers_income,
+        servers_count=servers_count,
+        transport_income=transport_income,
+        transport_count=transport_count
+    )
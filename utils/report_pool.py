@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from config.settings import settings
+
+
+class ReportPool:
+    """
+    Построение отчетов в отдельных процессах.
+    Рендеринг больших таблиц нагружает процессор и в основном процессе
+    задерживал бы обработку остальных сообщений. Одновременно строится
+    не более max_workers отчетов, а одинаковые запросы, пришедшие во время
+    построения, получают результат уже выполняющейся задачи.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        # Метрики
+        self.builds = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: дочерние процессы не наследуют потоки и соединения SQLite родителя
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    async def build(self, func: Callable, *args) -> Any:
+        """Выполнение func(*args) в процессе пула с ограничением параллелизма"""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self._get_executor(), func, *args)
+            except Exception:
+                self.failures += 1
+                raise
+            self.builds += 1
+            return result
+
+    async def coalesce(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет factory() или присоединяется к уже выполняющейся задаче с тем же ключом.
+        Отмена одного из ожидающих не отменяет общую задачу.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+
+            def forget(_, key=key, task=task):
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+            task.add_done_callback(forget)
+
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика построения отчетов"""
+        return {
+            'max_workers': self.max_workers,
+            'in_flight': len(self._inflight),
+            'builds': self.builds,
+            'coalesced': self.coalesced,
+            'failures': self.failures
+        }
+
+    def close(self):
+        """Остановка процессов пула"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+report_pool = ReportPool(settings.REPORT_WORKERS)
@@ -0,0 +1,170 @@
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+REPORT_EXTENSIONS = ('.html', '.html.gz')
+
+
+class ReportStore:
+    """
+    Каталог сгенерированных отчетов с ограничением по количеству, размеру и возрасту.
+    Лишние файлы удаляются после каждого сохранения и периодически в фоне.
+    Самый новый отчет не удаляется никогда, чтобы его можно было отправить повторно.
+    """
+
+    def __init__(self, directory: str, max_count: int = 20, max_bytes: int = 100 * 1024 * 1024,
+                 max_age: float = 7 * 24 * 3600, compress: bool = False,
+                 cleanup_interval: float = 3600):
+        self.directory = directory
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.cleanup_interval = cleanup_interval
+        self._task: Optional[asyncio.Task] = None
+        self._remove_listeners: List[Callable[[List[str]], None]] = []
+
+        # Метрики
+        self.saved = 0
+        self.removed = 0
+        self.removed_bytes = 0
+
+    def path_for(self, filename: str) -> str:
+        """Путь для нового отчета внутри каталога хранилища"""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, filename)
+
+    def on_remove(self, listener: Callable[[List[str]], None]):
+        """
+        Подписка на удаление отчетов политикой хранения: listener получает
+        список удаленных путей и вызывается в цикле событий
+        """
+        self._remove_listeners.append(listener)
+
+    async def _cleanup(self) -> Dict[str, Any]:
+        result = await asyncio.to_thread(self.cleanup)
+        if result['paths']:
+            for listener in self._remove_listeners:
+                listener(result['paths'])
+        return result
+
+    async def save(self, path: str) -> str:
+        """
+        Фиксирует записанный отчет: при необходимости сжимает его и
+        применяет политику хранения. Возвращает итоговый путь к файлу.
+        """
+        if self.compress:
+            path = await asyncio.to_thread(self._compress, path)
+        self.saved += 1
+        await self._cleanup()
+        return path
+
+    @staticmethod
+    def _compress(path: str) -> str:
+        compressed = path + '.gz'
+        with open(path, 'rb') as source, gzip.open(compressed, 'wb', compresslevel=6) as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+        return compressed
+
+    def cleanup(self) -> Dict[str, Any]:
+        """Удаляет отчеты сверх лимитов, начиная с самых старых; возвращает счетчики и удаленные пути"""
+        try:
+            entries = [
+                entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(REPORT_EXTENSIONS)
+            ]
+        except FileNotFoundError:
+            return {'removed': 0, 'removed_bytes': 0, 'paths': []}
+
+        files = sorted(
+            ((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries),
+            reverse=True
+        )
+        now = time.time()
+        kept_count = 0
+        kept_bytes = 0
+        removed = 0
+        removed_bytes = 0
+        paths = []
+
+        for index, (mtime, size, path) in enumerate(files):
+            keep = index == 0 or (
+                kept_count < self.max_count
+                and kept_bytes + size <= self.max_bytes
+                and now - mtime <= self.max_age
+            )
+            if keep:
+                kept_count += 1
+                kept_bytes += size
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            removed_bytes += size
+            paths.append(path)
+
+        self.removed += removed
+        self.removed_bytes += removed_bytes
+        return {'removed': removed, 'removed_bytes': removed_bytes, 'paths': paths}
+
+    async def _cleanup_loop(self):
+        while True:
+            try:
+                await self._cleanup()
+            except Exception as e:
+                logger.error("Ошибка очистки отчетов: %s", e)
+            await asyncio.sleep(self.cleanup_interval)
+
+    def start(self):
+        """Запуск фоновой очистки; вызывается из работающего event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._cleanup_loop())
+
+    async def close(self):
+        """Остановка фоновой очистки"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Количество и объем хранимых отчетов, счетчики удалений"""
+        count = 0
+        size = 0
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(REPORT_EXTENSIONS):
+                    count += 1
+                    size += entry.stat().st_size
+        return {
+            'directory': self.directory,
+            'count': count,
+            'bytes': size,
+            'saved': self.saved,
+            'removed': self.removed,
+            'removed_bytes': self.removed_bytes
+        }
+
+
+report_store = ReportStore(
+    settings.REPORTS_DIR,
+    max_count=settings.REPORTS_MAX_COUNT,
+    max_bytes=int(settings.REPORTS_MAX_SIZE_MB * 1024 * 1024),
+    max_age=settings.REPORTS_MAX_AGE_HOURS * 3600,
+    compress=settings.REPORTS_GZIP,
+    cleanup_interval=settings.REPORTS_CLEANUP_INTERVAL
+)
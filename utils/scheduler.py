@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних времен ожидания и обработки хранится для перцентилей
+WAIT_WINDOW = 10000
+
+
+@dataclass
+class ChatQueue:
+    """Очередь обновлений одного чата: обрабатываются строго по одному в порядке поступления"""
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    depth: int = 0
+
+
+class UpdateScheduler:
+    """
+    Планировщик обработки обновлений.
+    Обновление принимается в очередь своего чата и обрабатывается в фоне:
+    разные чаты обрабатываются параллельно, но не более max_concurrency
+    одновременно, а сообщения одного чата - последовательно, поэтому
+    подтверждения аренд приходят в том же порядке, что и сообщения.
+    Если принято max_pending необработанных обновлений, прием новых ждет
+    освобождения места: polling перестает забирать обновления у Telegram,
+    а вебхук - подтверждать запросы.
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_pending: int = 1000):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(self.max_concurrency, max_pending)
+
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._admission = asyncio.Semaphore(self.max_pending)
+        self._chats: Dict[Hashable, ChatQueue] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._waits = deque(maxlen=WAIT_WINDOW)
+        self._durations = deque(maxlen=WAIT_WINDOW)
+
+        # Метрики
+        self.accepted = 0
+        self.completed = 0
+        self.failures = 0
+        self.running = 0
+        self.throttled = 0
+        self.throttled_time = 0.0
+
+    @property
+    def saturated(self) -> bool:
+        """Принято max_pending необработанных обновлений: submit() будет ждать"""
+        return self._admission.locked()
+
+    async def submit(self, key: Optional[Hashable], process: Callable[[], Awaitable[Any]]):
+        """
+        Постановка обработки в очередь чата key (None - без очереди).
+        Возвращается сразу после приема; ждет, только если очередь переполнена.
+        """
+        if self._admission.locked():
+            self.throttled += 1
+            started = time.perf_counter()
+            await self._admission.acquire()
+            self.throttled_time += time.perf_counter() - started
+        else:
+            await self._admission.acquire()
+
+        queue = None
+        if key is not None:
+            queue = self._chats.get(key)
+            if queue is None:
+                queue = self._chats[key] = ChatQueue()
+            queue.depth += 1
+
+        self.accepted += 1
+        task = asyncio.create_task(self._run(process, key, queue, time.perf_counter()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, process: Callable[[], Awaitable[Any]], key: Optional[Hashable],
+                   queue: Optional[ChatQueue], accepted_at: float):
+        try:
+            if queue is not None:
+                await queue.lock.acquire()
+            try:
+                async with self._slots:
+                    started = time.perf_counter()
+                    self._waits.append(started - accepted_at)
+                    self.running += 1
+                    try:
+                        await process()
+                        self.completed += 1
+                    finally:
+                        self.running -= 1
+                        self._durations.append(time.perf_counter() - started)
+            finally:
+                if queue is not None:
+                    queue.lock.release()
+        except Exception as e:
+            self.failures += 1
+            logger.exception("Ошибка при обработке обновления: %s", e)
+        finally:
+            if queue is not None:
+                queue.depth -= 1
+                if queue.depth == 0 and self._chats.get(key) is queue:
+                    del self._chats[key]
+            self._admission.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Глубина очередей, время ожидания и обработки (мс) и счетчики обновлений"""
+        waits = sorted(self._waits)
+        durations = sorted(self._durations)
+
+        def percentile(samples: list, fraction: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+        return {
+            'max_concurrency': self.max_concurrency,
+            'running': self.running,
+            'pending': len(self._tasks),
+            'queued': len(self._tasks) - self.running,
+            'chats': len(self._chats),
+            'max_chat_depth': max((queue.depth for queue in self._chats.values()), default=0),
+            'accepted': self.accepted,
+            'completed': self.completed,
+            'failures': self.failures,
+            'throttled': self.throttled,
+            'throttled_time_ms': self.throttled_time * 1000,
+            'wait_p50_ms': percentile(waits, 0.5),
+            'wait_p99_ms': percentile(waits, 0.99),
+            'processing_p50_ms': percentile(durations, 0.5),
+            'processing_p99_ms': percentile(durations, 0.99)
+        }
+
+    async def close(self, timeout: float = 30.0):
+        """Ожидание обработки принятых обновлений, не дольше timeout секунд"""
+        if self._tasks:
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+
+def update_queue_key(update: Update) -> Optional[Hashable]:
+    """Очередь обновления: чат, а для событий без чата (inline-запросы) - пользователь"""
+    chat, user, _ = UserContextMiddleware.resolve_event_context(update)
+    if chat is not None:
+        return chat.id
+    if user is not None:
+        return 'user', user.id
+    return None
+
+
+class ScheduledDispatcher(Dispatcher):
+    """
+    Dispatcher, который передает обновления планировщику до всех middleware.
+    Обработка обновления целиком (ErrorsMiddleware, состояние FSM, роутеры)
+    выполняется в очереди чата, поэтому следующее сообщение чата видит
+    состояние, установленное обработчиком предыдущего, а исключения
+    доходят до обработчиков ошибок роутеров.
+    """
+
+    def __init__(self, *args: Any, scheduler: UpdateScheduler, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        process = functools.partial(super().feed_update, bot, update, **kwargs)
+        await self.scheduler.submit(update_queue_key(update), process)
+
+    async def emit_shutdown(self, *args: Any, **kwargs: Any) -> None:
+        # Принятые обновления дорабатываются, пока открыты сессия бота и хранилище FSM
+        await self.scheduler.close()
+        await super().emit_shutdown(*args, **kwargs)
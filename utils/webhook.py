@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import secrets
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.types import Update
+
+from utils.scheduler import ScheduledDispatcher
+
+logger = logging.getLogger(__name__)
+
+# Заголовок, в котором Telegram передает secret_token вебхука
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """
+    Прием обновлений Telegram через вебхук на aiohttp.
+    Обновление передается планировщику диспетчера (ScheduledDispatcher) и
+    запрос подтверждается сразу после приема в очередь чата: Telegram не ждет
+    обработчиков и не повторяет доставку. Параллелизм обработки и число
+    принятых обновлений ограничивает планировщик; пока его очередь
+    заполнена, новые запросы получают 503 и Telegram доставит их повторно позже.
+    Время ожидания и обработки обновлений - в UpdateScheduler.get_stats().
+    """
+
+    def __init__(self, dispatcher: ScheduledDispatcher, bot: Bot, path: str = '/webhook',
+                 secret: Optional[str] = None):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.path = path
+        self.secret = secret
+        self._runner: Optional[web.AppRunner] = None
+
+        # Метрики
+        self.received = 0
+        self.rejected = 0
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and not secrets.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={'bot': self.bot})
+        except Exception:
+            return web.Response(status=400)
+
+        # Между проверкой и приемом нет точек переключения: место в очереди не займет другой запрос
+        if self.dispatcher.scheduler.saturated:
+            self.rejected += 1
+            return web.Response(status=503)
+
+        self.received += 1
+        await self.dispatcher.feed_update(self.bot, update)
+        return web.Response()
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080, backlog: int = 1024):
+        """Запуск HTTP-сервера; backlog - очередь соединений, ожидающих accept"""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port, backlog=backlog)
+        await site.start()
+
+    async def close(self):
+        """
+        Остановка приема запросов. Принятые обновления дорабатывает
+        планировщик при остановке диспетчера (emit_shutdown).
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Принятые и отклоненные (503) обновления"""
+        return {
+            'received': self.received,
+            'rejected': self.rejected
+        }
+
+
+async def run_webhook(dispatcher: ScheduledDispatcher, bot: Bot, url: str, path: str = '/webhook',
+                      secret: Optional[str] = None, host: str = '0.0.0.0', port: int = 8080,
+                      backlog: int = 1024, max_connections: int = 64,
+                      stop_event: Optional[asyncio.Event] = None):
+    """
+    Регистрация вебхука в Telegram и работа до установки stop_event.
+    Вебхук при остановке не удаляется: пришедшие за время перезапуска
+    обновления Telegram доставит новому процессу.
+    max_connections - сколько соединений Telegram одновременно открывает к вебхуку.
+    """
+    server = WebhookServer(dispatcher, bot, path, secret)
+    stop_event = stop_event or asyncio.Event()
+
+    await dispatcher.emit_startup(bot=bot)
+    await server.start(host, port, backlog)
+    await bot.set_webhook(
+        url.rstrip('/') + path,
+        secret_token=secret,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=min(max_connections, 100)
+    )
+    logger.info("Вебхук запущен на %s:%s%s", host, port, path)
+
+    try:
+        await stop_event.wait()
+    finally:
+        await server.close()
+        await dispatcher.emit_shutdown(bot=bot)
+        await bot.session.close()